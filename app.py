@@ -1,4 +1,6 @@
 import os
+import click
+import threading
 from flask import Flask
 from flask_migrate import Migrate
 from flask_restful import Api
@@ -18,7 +20,7 @@ from resources.saved_events import SaveEvent, MySavedEvents
 
 
 from resources.admin_users import AllUsers, BanOrUnbanUser, UpdateUserRole
-from resources.admin_dashboard import AdminDashboard, AdminReports, AdminAuditLogs
+from resources.admin_dashboard import AdminDashboard, AdminReports, AdminAuditLogs, AdminAuditStats, AdminCacheStats
 
 
 from resources.orders import CreateOrder, ConfirmPayment, MyOrders, SingleOrder
@@ -32,11 +34,12 @@ from resources.profile import MyProfile, UpdateProfile
 
 from resources.profile_events import MyUpcomingEvents, MyPastEvents, PastEventDetail, UpcomingEventDetail
 
-from resources.attendees import EventAttendees,CheckInAttendee, CheckOutAttendee
+from resources.attendees import EventAttendees,CheckInAttendee, CheckOutAttendee, CheckInByCode, BulkCheckIn, CheckInManifest, CheckInSync, CheckInStreamToken, CheckInCounterStream
+from resources.exports import DataExport
 
 from resources.attendee_profile import UpcomingAttendeeEvents, PastAttendeeEvents
 
-from resources.payment import PaymentResource, PaymentCallbackResource, CheckPaymentResource
+from resources.payment import PaymentResource, PaymentCallbackResource, CheckPaymentResource, PaymentStatusResource, PaymentLatencyResource
 
 from resources.admin_analytics import (
     AdminSummary,
@@ -46,6 +49,15 @@ from resources.admin_analytics import (
     TopEventsByRevenue
 )
 
+from utils.holds import release_expired_holds, start_hold_sweeper
+from utils.payment_queue import PaymentWorkerPool, start_payment_workers
+from utils.logger import audit_writer
+from utils.cache import result_cache
+from utils.ticket_filter import ticket_filters
+from utils.checkin_counters import checkin_counter_hub, rebuild_checkin_counters
+from utils.audit_partitions import ensure_partitions, archive_partitions, AUDIT_RETAIN_MONTHS
+from utils.rollups import rebuild_sales_rollups
+
 load_dotenv()
 
 
@@ -64,6 +76,10 @@ app.config['CLOUDINARY_API_SECRET'] = os.getenv('CLOUDINARY_API_SECRET', 'defaul
 
 
 db.init_app(app)
+audit_writer.init_app(app)
+result_cache.init_app(app)
+ticket_filters.init_app(app)
+checkin_counter_hub.init_app(app)
 bcrypt = Bcrypt(app)
 jwt = JWTManager(app)
 migrate = Migrate(app, db)
@@ -80,7 +96,8 @@ CORS(app,
             "https://ticksy-frontend.vercel.app",
         ],
         "methods": ["GET", "PATCH", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "allow_headers": ["Content-Type", "Authorization"],
+        "expose_headers": ["X-Next-Cursor"]
     }
 })
 
@@ -107,6 +124,8 @@ api.add_resource(UpdateUserRole, "/admin/users/<int:id>/role")
 api.add_resource(AdminDashboard, "/admin/dashboard")
 api.add_resource(AdminReports, "/admin/reports")
 api.add_resource(AdminAuditLogs, "/admin/logs")
+api.add_resource(AdminAuditStats, "/admin/logs/stats")
+api.add_resource(AdminCacheStats, "/admin/cache/stats")
 
 
 
@@ -156,10 +175,19 @@ api.add_resource(PastAttendeeEvents, "/attendee/past-events")
 api.add_resource(EventAttendees, '/organizer/events/<int:event_id>/attendees')
 api.add_resource(CheckInAttendee, "/organizer/checkin/<int:pass_id>")
 api.add_resource(CheckOutAttendee, "/organizer/checkout/<int:pass_id>")
+api.add_resource(CheckInByCode, "/organizer/checkin/code/<string:ticket_code>")
+api.add_resource(BulkCheckIn, "/organizer/events/<int:event_id>/checkin")
+api.add_resource(CheckInManifest, "/organizer/events/<int:event_id>/manifest")
+api.add_resource(CheckInSync, "/organizer/events/<int:event_id>/checkin/sync")
+api.add_resource(CheckInStreamToken, "/organizer/events/<int:event_id>/checkin/stream-token")
+api.add_resource(CheckInCounterStream, "/organizer/events/<int:event_id>/checkin/stream")
+api.add_resource(DataExport, "/exports/<string:dataset>")
 
 api.add_resource(PaymentResource, "/payments")
 api.add_resource(PaymentCallbackResource, "/payments/callback")
 api.add_resource(CheckPaymentResource, "/payments/check/<string:checkout_request_id>")
+api.add_resource(PaymentStatusResource, "/payments/status/<string:order_id>")
+api.add_resource(PaymentLatencyResource, "/admin/payments/latency")
 
 
 
@@ -172,5 +200,65 @@ api.add_resource(TopEventsByRevenue, '/admin/analytics/top-events-by-revenue')
 
 
 
+@app.cli.command("release-expired-holds")
+def release_expired_holds_command():
+    """Expire abandoned pending orders and release their seats."""
+    count = release_expired_holds()
+    print(f"Released {count} expired holds")
+
+
+@app.cli.command("payment-worker")
+def payment_worker_command():
+    """Run a dedicated STK push worker pool in the foreground."""
+    PaymentWorkerPool(app).start().join()
+
+
+@app.cli.command("maintain-audit-logs")
+@click.option("--archive-dir", default=lambda: os.getenv("AUDIT_ARCHIVE_DIR", os.path.join(app.instance_path, "audit_archive")))
+@click.option("--retain-months", default=AUDIT_RETAIN_MONTHS, show_default=True)
+def maintain_audit_logs_command(archive_dir, retain_months):
+    """Create upcoming audit_logs partitions and archive expired ones."""
+    for name in ensure_partitions():
+        print(f"Created partition {name}")
+    for name in archive_partitions(archive_dir, retain_months=retain_months):
+        print(f"Archived partition {name} to {archive_dir}")
+
+
+@app.cli.command("rebuild-sales-rollups")
+def rebuild_sales_rollups_command():
+    """Recompute sales_daily_rollups from every paid order."""
+    count = rebuild_sales_rollups()
+    print(f"Wrote {count} sales rollup rows")
+
+
+@app.cli.command("rebuild-checkin-counters")
+def rebuild_checkin_counters_command():
+    """Recompute event_checkin_counters from event_passes."""
+    count = rebuild_checkin_counters()
+    print(f"Wrote {count} check-in counter rows")
+
+
+_workers_started = False
+_workers_lock = threading.Lock()
+
+
+@app.before_request
+def start_background_workers():
+    """
+    Start this process's payment workers with its first request. Doing it
+    at import would also start them for `flask db upgrade` and the other
+    CLI commands, and twice under `flask payment-worker`.
+    """
+    global _workers_started
+    if _workers_started or os.getenv("BACKGROUND_WORKERS", "true").lower() != "true":
+        return
+    with _workers_lock:
+        if _workers_started:
+            return
+        _workers_started = True
+    start_hold_sweeper(app)
+    start_payment_workers(app)
+
+
 if __name__ == "__main__":
     app.run(debug=True)
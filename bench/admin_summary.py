@@ -0,0 +1,97 @@
+# bench/admin_summary.py
+#
+# Round trips and latency of the admin platform summary. The per-count
+# queries the dashboard used to run are timed against platform_summary(),
+# then /admin/dashboard and /admin/analytics/summary are requested end to
+# end. The result cache is disabled so every request hits the database.
+#
+#     BENCH_DATABASE_URI=... python -m bench.admin_summary [events]
+import os
+import sys
+
+os.environ["CACHE_TTL_SCALE"] = "0"
+
+from datetime import date  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+
+from bench.common import (  # noqa: E402
+    app, db, reset_schema, make_user, make_event, auth_header, percentile, Timer, print_table
+)
+from models import User, Event, Ticket, SalesDailyRollup  # noqa: E402
+from utils.query_counter import count_queries  # noqa: E402
+from utils.summary import platform_summary  # noqa: E402
+
+EVENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+REQUESTS = 200
+STATUSES = ("approved", "pending", "rejected")
+
+
+def legacy_summary():
+    """The dashboard's summary before platform_summary: one query per figure."""
+    return {
+        "total_users": User.query.count(),
+        "total_events": Event.query.count(),
+        "active_events": Event.query.filter_by(status="approved").count(),
+        "pending_events": Event.query.filter_by(status="pending").count(),
+        "rejected_events": Event.query.filter_by(status="rejected").count(),
+        "total_tickets": Ticket.query.count(),
+        "total_revenue": db.session.query(func.coalesce(func.sum(SalesDailyRollup.revenue), 0)).scalar(),
+    }
+
+
+def measure(call):
+    """Queries issued by one call, and p50/p95 milliseconds over REQUESTS calls."""
+    with count_queries() as queries:
+        call()
+
+    timings = []
+    for _ in range(REQUESTS):
+        with Timer() as timer:
+            call()
+        timings.append(timer.seconds * 1000)
+    return [queries.count, f"{percentile(timings, 50):.2f}", f"{percentile(timings, 95):.2f}"]
+
+
+def seed():
+    organizer = make_user("organizer")
+    for n in range(EVENTS):
+        event = make_event(organizer, tickets=(("Regular", 1000, 100), ("VIP", 5000, 20)), title=f"Event {n}")
+        event.status = STATUSES[n % len(STATUSES)]
+        for ticket in event.tickets:
+            db.session.add(SalesDailyRollup(
+                day=date.today(), ticket_type=ticket.type, units=1, revenue=ticket.price,
+                orders=1, event_id=event.id, ticket_id=ticket.id,
+            ))
+        db.session.commit()
+    return make_user("admin")
+
+
+def main():
+    with app.app_context():
+        reset_schema()
+        admin = seed()
+
+        if legacy_summary() != platform_summary():
+            sys.exit("platform_summary and the per-count queries disagree")
+
+        def in_session(summary):
+            def call():
+                summary()
+                db.session.rollback()
+            return call
+
+        rows = [
+            ["per-count queries"] + measure(in_session(legacy_summary)),
+            ["platform_summary"] + measure(in_session(platform_summary)),
+        ]
+
+        client = app.test_client()
+        headers = auth_header(admin)
+        for path in ("/admin/dashboard", "/admin/analytics/summary"):
+            rows.append([path] + measure(lambda: client.get(path, headers=headers)))
+
+    print_table(["summary", "queries", "p50 ms", "p95 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
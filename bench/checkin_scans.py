@@ -0,0 +1,61 @@
+# bench/checkin_scans.py
+#
+# Gate check-in throughput: scans/s through the bulk endpoint at a few
+# batch sizes and gate counts, against one request per scan.
+#
+#     BENCH_DATABASE_URI=... python -m bench.checkin_scans [passes]
+import sys
+import threading
+
+from bench.common import app, reset_schema, make_user, make_event, seed_passes, auth_header, Timer, print_table
+
+PASSES = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+SINGLE_SCANS = 1000
+
+
+def run_gates(event_id, headers, codes, batch_size, gates, action="checkin"):
+    """Split `codes` over `gates` threads, each posting batches of `batch_size`."""
+    def gate(share):
+        client = app.test_client()
+        for start in range(0, len(share), batch_size):
+            response = client.post(
+                f"/organizer/events/{event_id}/checkin",
+                json={"codes": share[start:start + batch_size], "action": action}, headers=headers,
+            )
+            assert response.status_code == 200, response.get_json()
+
+    threads = [threading.Thread(target=gate, args=(codes[n::gates],)) for n in range(gates)]
+    with Timer() as timer:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return timer.seconds
+
+
+def main():
+    with app.app_context():
+        reset_schema()
+        organizer = make_user("organizer")
+        event = make_event(organizer)
+        codes = seed_passes(make_user("attendee"), event.tickets[0], PASSES)
+        event_id, headers = event.id, auth_header(organizer)
+
+        rows = []
+        client = app.test_client()
+        with Timer() as timer:
+            for code in codes[:SINGLE_SCANS]:
+                client.patch(f"/organizer/checkin/code/{code}?event_id={event_id}", headers=headers)
+        rows.append(["single", 1, SINGLE_SCANS, round(SINGLE_SCANS / timer.seconds)])
+
+        for batch_size, gates in ((100, 1), (500, 1), (500, 4), (1000, 8)):
+            # Check everyone out again so every run flips the same passes
+            run_gates(event_id, headers, codes, 1000, 1, action="checkout")
+            seconds = run_gates(event_id, headers, codes, batch_size, gates)
+            rows.append([f"bulk {batch_size}", gates, len(codes), round(len(codes) / seconds)])
+
+    print_table(["mode", "gates", "scans", "scans/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# bench/common.py
+#
+# Shared setup for the benchmark scripts. They run against a scratch
+# Postgres database whose schema is dropped and recreated, so never point
+# BENCH_DATABASE_URI at a real one:
+#
+#     BENCH_DATABASE_URI=postgresql+psycopg2://localhost/ticksy_bench python -m bench.checkin_scans
+import os
+import sys
+import time
+import uuid
+import tempfile
+from datetime import datetime, timedelta
+
+BENCH_DATABASE_URI = os.getenv("BENCH_DATABASE_URI", "")
+if not BENCH_DATABASE_URI.startswith("postgresql"):
+    sys.exit("Set BENCH_DATABASE_URI to a scratch Postgres database")
+
+os.environ["DATABASE_URI"] = BENCH_DATABASE_URI
+os.environ["BACKGROUND_WORKERS"] = "false"
+os.environ.setdefault("AUDIT_SPOOL_DIR", tempfile.mkdtemp(prefix="bench-audit-spool-"))
+os.environ.setdefault("TICKET_FILTER_ENABLED", "true")
+os.environ.setdefault("TICKET_FILTER_DIR", tempfile.mkdtemp(prefix="bench-ticket-filters-"))
+
+from app import app  # noqa: E402
+from models import db, User, Event, Ticket, Order, OrderItem  # noqa: E402
+from utils.audit_partitions import ensure_partitions  # noqa: E402
+from utils.passes import mint_passes  # noqa: E402
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+MINT_ORDER_SIZE = 500
+
+
+def reset_schema():
+    db.drop_all()
+    db.create_all()
+    ensure_partitions()
+    db.session.commit()
+
+
+def make_user(role, n=0):
+    user = User(
+        first_name=role.title(), last_name="Bench", email=f"{role}{n}@example.com",
+        phone=f"07{abs(hash((role, n))) % 10 ** 8:08d}", password="x", role=role,
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def make_event(organizer, tickets=(("Regular", 1000, 10 ** 7),), title="Bench Event"):
+    start = datetime.utcnow() + timedelta(days=7)
+    event = Event(
+        title=title, description="d", location="Nairobi", category="Music",
+        start_time=start, end_time=start + timedelta(hours=4),
+        organizer_id=organizer.id, status="approved", is_approved=True,
+    )
+    db.session.add(event)
+    db.session.flush()
+    for ticket_type, price, quantity in tickets:
+        db.session.add(Ticket(type=ticket_type, price=price, quantity=quantity, sold=0, event_id=event.id))
+    db.session.commit()
+    return event
+
+
+def make_order(attendee, ticket, quantity, status="pending"):
+    order = Order(
+        order_id=uuid.uuid4().hex[:12].upper(), attendee_id=attendee.id,
+        total_amount=ticket.price * quantity, status=status,
+    )
+    db.session.add(order)
+    db.session.add(OrderItem(
+        order=order, ticket_id=ticket.id, quantity=quantity,
+        temp_attendee_data=[
+            {"first_name": "Guest", "last_name": str(i), "email": f"guest{i}@example.com", "phone": "0711111111"}
+            for i in range(quantity)
+        ],
+    ))
+    ticket.sold = (ticket.sold or 0) + quantity
+    db.session.commit()
+    return order
+
+
+def seed_passes(attendee, ticket, count):
+    """Mint `count` paid passes on `ticket`; returns their codes."""
+    codes = []
+    while len(codes) < count:
+        order = make_order(attendee, ticket, min(MINT_ORDER_SIZE, count - len(codes)), status="paid")
+        codes.extend(code for _, code, _ in mint_passes(order))
+        db.session.commit()
+    return codes
+
+
+def auth_header(user):
+    return {"Authorization": "Bearer " + create_access_token(identity=str(user.id))}
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.started
+        return False
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(v)) for v in column) for column in zip(headers, *rows)]
+    for row in [headers] + rows:
+        print("  ".join(str(v).rjust(w) for v, w in zip(row, widths)))
@@ -0,0 +1,58 @@
+# bench/create_order.py
+#
+# POST /orders: SQL statements per request and latency percentiles as the
+# cart grows from one ticket type to many.
+#
+#     BENCH_DATABASE_URI=... python -m bench.create_order [requests per size]
+import sys
+import time
+
+from bench.common import app, reset_schema, make_user, make_event, auth_header, percentile, print_table
+from utils.query_counter import count_queries
+
+CART_SIZES = (1, 5, 20, 50)
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+
+def cart(ticket_ids):
+    return [
+        {
+            "ticket_id": ticket_id,
+            "quantity": 2,
+            "attendees": [
+                {"first_name": "Guest", "last_name": str(n), "email": f"guest{n}@example.com", "phone": "0711111111"}
+                for n in range(2)
+            ],
+        }
+        for ticket_id in ticket_ids
+    ]
+
+
+def main():
+    with app.app_context():
+        reset_schema()
+        organizer = make_user("organizer")
+        event = make_event(organizer, tickets=[(f"Tier {n}", 100 + n, 10 ** 7) for n in range(max(CART_SIZES))])
+        ticket_ids = [t.id for t in event.tickets]
+        headers = auth_header(make_user("attendee"))
+        client = app.test_client()
+
+        rows = []
+        for size in CART_SIZES:
+            body = {"phone": "254700000001", "tickets": cart(ticket_ids[:size])}
+            with count_queries() as queries:
+                assert client.post("/orders", json=body, headers=headers).status_code == 202
+
+            latencies = []
+            for _ in range(REQUESTS):
+                started = time.perf_counter()
+                client.post("/orders", json=body, headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+            rows.append([size, queries.count, f"{percentile(latencies, 50):.1f}", f"{percentile(latencies, 95):.1f}"])
+
+    print_table(["ticket types", "queries", "p50 ms", "p95 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
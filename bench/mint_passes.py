@@ -0,0 +1,61 @@
+# bench/mint_passes.py
+#
+# Passes minted per second by utils.passes.mint_passes, against the
+# per-attendee ORM objects the payment callback used to add, for a few
+# order sizes. Every order is committed, as in the callback.
+#
+#     BENCH_DATABASE_URI=... python -m bench.mint_passes [passes per size]
+import sys
+import uuid
+
+from bench.common import app, db, reset_schema, make_user, make_event, make_order, Timer, print_table
+from models import EventPass, Order
+from utils.passes import mint_passes
+
+ORDER_SIZES = (1, 10, 100, 1000)
+PASSES = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+MAX_ORDERS = 1000
+
+
+def orm_mint(order):
+    """The callback's loop before mint_passes: one EventPass object per attendee."""
+    for item in order.order_items:
+        for att in item.temp_attendee_data or []:
+            db.session.add(EventPass(
+                ticket_code=str(uuid.uuid4())[:8].upper(),
+                attendee_first_name=att["first_name"],
+                attendee_last_name=att["last_name"],
+                attendee_email=att["email"],
+                attendee_phone=att["phone"],
+                order_item=item,
+            ))
+
+
+def passes_per_second(mint, order_ids, size):
+    with Timer() as timer:
+        for order_id in order_ids:
+            mint(Order.query.get(order_id))
+            db.session.commit()
+    return round(len(order_ids) * size / timer.seconds)
+
+
+def main():
+    with app.app_context():
+        reset_schema()
+        attendee = make_user("attendee")
+        ticket = make_event(make_user("organizer")).tickets[0]
+
+        rows = []
+        for size in ORDER_SIZES:
+            count = max(1, min(PASSES // size, MAX_ORDERS))
+            # Fresh orders for each path, created up front so only minting is timed
+            bulk = [make_order(attendee, ticket, size).id for _ in range(count)]
+            legacy = [make_order(attendee, ticket, size).id for _ in range(count)]
+            rows.append([size, count * size, passes_per_second(orm_mint, legacy, size),
+                         passes_per_second(mint_passes, bulk, size)])
+
+    print_table(["order size", "passes", "ORM passes/s", "mint_passes passes/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
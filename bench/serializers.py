@@ -0,0 +1,70 @@
+# bench/serializers.py
+#
+# Rows serialized per second by utils.serializers.compile_serializer,
+# against SerializerMixin.to_dict(only=...) on the same loaded events. Only
+# serialization is timed: the rows and their relationships are loaded once
+# up front, and both paths must produce the same dicts.
+#
+#     BENCH_DATABASE_URI=... python -m bench.serializers [events]
+import sys
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from bench.common import app, db, reset_schema, make_user, make_event, Timer, print_table
+from models import Event
+from resources.events import EVENT_LIST_FIELDS
+from utils.serializers import compile_serializer
+
+EVENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+REPEATS = 5
+
+FIELD_SETS = (
+    ("event list", EVENT_LIST_FIELDS),
+    ("event + tickets", EVENT_LIST_FIELDS + (
+        "tickets.id", "tickets.type", "tickets.price", "tickets.quantity", "tickets.sold",
+    )),
+)
+
+
+def rows_per_second(serialize, rows):
+    """Best of REPEATS passes over `rows`."""
+    best = None
+    for _ in range(REPEATS):
+        with Timer() as timer:
+            for row in rows:
+                serialize(row)
+        best = timer.seconds if best is None else min(best, timer.seconds)
+    return round(len(rows) / best)
+
+
+def main():
+    with app.app_context():
+        reset_schema()
+        organizer = make_user("organizer")
+        for n in range(EVENTS):
+            make_event(organizer, tickets=(("Regular", 1000, 100), ("VIP", 5000, 20)), title=f"Event {n}")
+
+        rows = (
+            Event.query
+            .options(joinedload(Event.organizer), selectinload(Event.tickets))
+            .order_by(Event.id)
+            .all()
+        )
+
+        table = []
+        for label, fields in FIELD_SETS:
+            compiled = compile_serializer(Event, fields)
+            if [compiled(e) for e in rows] != [e.to_dict(only=fields) for e in rows]:
+                sys.exit(f"compile_serializer and to_dict disagree for {label}")
+
+            legacy = rows_per_second(lambda e: e.to_dict(only=fields), rows)
+            fast = rows_per_second(compiled, rows)
+            table.append([label, len(rows), legacy, fast, f"{fast / legacy:.1f}x"])
+
+        db.session.rollback()
+
+    print_table(["fields", "rows", "to_dict rows/s", "compiled rows/s", "speedup"], table)
+
+
+if __name__ == "__main__":
+    main()
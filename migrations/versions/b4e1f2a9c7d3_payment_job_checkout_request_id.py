@@ -0,0 +1,35 @@
+"""payment job checkout request id
+
+Revision ID: b4e1f2a9c7d3
+Revises: 5c03fb08342e
+Create Date: 2026-10-18 21:05:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e1f2a9c7d3'
+down_revision = '5c03fb08342e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payment_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('checkout_request_id', sa.String(), nullable=True))
+        batch_op.create_unique_constraint(batch_op.f('uq_payment_jobs_checkout_request_id'), ['checkout_request_id'])
+
+    # Accepted pushes already carry their CheckoutRequestID in the stored response
+    op.execute("""
+        UPDATE payment_jobs
+        SET checkout_request_id = response ->> 'CheckoutRequestID'
+        WHERE status = 'sent' AND response ->> 'ResponseCode' = '0'
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('payment_jobs', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('uq_payment_jobs_checkout_request_id'), type_='unique')
+        batch_op.drop_column('checkout_request_id')
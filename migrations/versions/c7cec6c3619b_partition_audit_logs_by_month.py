@@ -0,0 +1,127 @@
+"""partition audit_logs by month
+
+Revision ID: c7cec6c3619b
+Revises: 327ff5b30ba5
+Create Date: 2026-10-18 13:41:09.905127
+
+"""
+from datetime import date, datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7cec6c3619b'
+down_revision = '327ff5b30ba5'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+COPY_BATCH = 50000
+COLUMNS = "id, timestamp, user_id, action, target_type, target_id, status, ip_address, extra_data"
+INDEXES = (
+    ("ix_audit_logs_timestamp", "timestamp"),
+    ("ix_audit_logs_user_id_timestamp", "user_id, timestamp"),
+    ("ix_audit_logs_target_type_target_id", "target_type, target_id"),
+)
+
+
+def _add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # Keep the id sequence alive when the old table is dropped
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_legacy")
+    op.execute("ALTER TABLE audit_logs_legacy RENAME CONSTRAINT pk_audit_logs TO pk_audit_logs_legacy")
+    op.execute("ALTER TABLE audit_logs_legacy RENAME CONSTRAINT fk_audit_logs_user_id_users TO fk_audit_logs_legacy_user_id_users")
+
+    op.execute("""
+        CREATE TABLE audit_logs (
+            id INTEGER NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            user_id INTEGER,
+            action VARCHAR(255) NOT NULL,
+            target_type VARCHAR(100),
+            target_id INTEGER,
+            status VARCHAR(50) NOT NULL,
+            ip_address VARCHAR(100),
+            extra_data JSON,
+            CONSTRAINT pk_audit_logs PRIMARY KEY (id, timestamp),
+            CONSTRAINT fk_audit_logs_user_id_users FOREIGN KEY (user_id) REFERENCES users (id)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+
+    # One partition per month from the oldest row to a few months ahead,
+    # plus a default partition so an insert never fails for lack of one
+    oldest = bind.execute(sa.text("SELECT min(timestamp) FROM audit_logs_legacy")).scalar()
+    today = datetime.utcnow()
+    month = date((oldest or today).year, (oldest or today).month, 1)
+    last = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+
+    partitions = []
+    while month <= last:
+        upper = _add_months(month, 1)
+        name = f"audit_logs_y{month.year:04d}m{month.month:02d}"
+        op.execute(
+            f"CREATE TABLE {name} PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        partitions.append(name)
+        month = upper
+    partitions.append("audit_logs_default")
+    op.execute("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT")
+
+    # The swap above commits on its own; new audit rows go to the partitioned
+    # table from here on while the history is copied over in short batches.
+    # Indexes are built after the copy, per partition and concurrently, then
+    # attached to the parent's index.
+    last_id = bind.execute(sa.text("SELECT max(id) FROM audit_logs_legacy")).scalar() or 0
+    with op.get_context().autocommit_block():
+        for after in range(0, last_id, COPY_BATCH):
+            op.execute(
+                f"INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM audit_logs_legacy "
+                f"WHERE id > {after} AND id <= {after + COPY_BATCH}"
+            )
+
+        for index, columns in INDEXES:
+            op.execute(f"CREATE INDEX {index} ON ONLY audit_logs ({columns})")
+            for name in partitions:
+                partition_index = index.replace("audit_logs", name, 1)
+                op.execute(f"CREATE INDEX CONCURRENTLY {partition_index} ON {name} ({columns})")
+                op.execute(f"ALTER INDEX {index} ATTACH PARTITION {partition_index}")
+
+        op.execute("DROP TABLE audit_logs_legacy")
+
+
+def downgrade():
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_partitioned")
+    op.execute("ALTER TABLE audit_logs_partitioned RENAME CONSTRAINT pk_audit_logs TO pk_audit_logs_partitioned")
+    op.execute("ALTER TABLE audit_logs_partitioned RENAME CONSTRAINT fk_audit_logs_user_id_users TO fk_audit_logs_partitioned_user_id_users")
+    op.drop_index('ix_audit_logs_timestamp', table_name='audit_logs_partitioned')
+    op.drop_index('ix_audit_logs_user_id_timestamp', table_name='audit_logs_partitioned')
+    op.drop_index('ix_audit_logs_target_type_target_id', table_name='audit_logs_partitioned')
+
+    op.create_table('audit_logs',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('audit_logs_id_seq')"), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('action', sa.String(length=255), nullable=False),
+    sa.Column('target_type', sa.String(length=100), nullable=True),
+    sa.Column('target_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('ip_address', sa.String(length=100), nullable=True),
+    sa.Column('extra_data', sa.JSON(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_audit_logs_user_id_users')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_audit_logs'))
+    )
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+
+    op.execute(f"INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM audit_logs_partitioned")
+    op.execute("DROP TABLE audit_logs_partitioned CASCADE")
@@ -78,6 +78,9 @@ class User(db.Model, SerializerMixin):
 
 class Order(db.Model, SerializerMixin):
     __tablename__ = "orders"
+    __table_args__ = (
+        db.Index("ix_orders_status_created_at", "status", "created_at"),
+    )
     serialize_rules = ("-attendee.orders", "-order_items.order")
 
     id = db.Column(db.Integer, primary_key=True)
@@ -85,14 +88,42 @@ class Order(db.Model, SerializerMixin):
     status = db.Column(db.String, default="pending")
     mpesa_receipt = db.Column(db.String)
     total_amount = db.Column(db.Float, nullable=False)
+    checkout_request_id = db.Column(db.String, unique=True)
     created_at = db.Column(db.DateTime, default=datetime.now)
 
     attendee_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     attendee = db.relationship("User", back_populates="orders")
     order_items = db.relationship("OrderItem", back_populates="order", cascade="all, delete")
+    payment_jobs = db.relationship("PaymentJob", back_populates="order", cascade="all, delete")
+
+class PaymentJob(db.Model, SerializerMixin):
+    __tablename__ = "payment_jobs"
+    __table_args__ = (
+        db.Index("ix_payment_jobs_status_created_at", "status", "created_at"),
+    )
+    serialize_rules = ("-order.payment_jobs",)
+
+    id = db.Column(db.Integer, primary_key=True)
+    phone = db.Column(db.String(20), nullable=False)
+    amount = db.Column(db.Integer, nullable=False)
+    description = db.Column(db.String(255))
+    status = db.Column(db.String(20), default="queued", nullable=False)  # queued, processing, sent, failed, unknown
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    response = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    # Set when Daraja accepts the push; callbacks are matched to the job by it
+    checkout_request_id = db.Column(db.String, unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False)
+    order = db.relationship("Order", back_populates="payment_jobs")
 
 class OrderItem(db.Model, SerializerMixin):
     __tablename__ = "order_items"
+    __table_args__ = (
+        db.Index("ix_order_items_ticket_id", "ticket_id"),
+    )
     serialize_rules = ("-order.order_items", "-ticket.order_items")
 
     id = db.Column(db.Integer, primary_key=True)
@@ -107,8 +138,23 @@ class OrderItem(db.Model, SerializerMixin):
 
     event_passes = db.relationship("EventPass", back_populates="order_item", cascade="all, delete-orphan")
 
+class ProcessedCallback(db.Model, SerializerMixin):
+    __tablename__ = "processed_callbacks"
+    serialize_rules = ("-order",)
+
+    id = db.Column(db.Integer, primary_key=True)
+    checkout_request_id = db.Column(db.String, unique=True, nullable=False)
+    result_code = db.Column(db.Integer)
+    processed_at = db.Column(db.DateTime, default=datetime.now)
+
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=True)
+    order = db.relationship("Order")
+
 class EventPass(db.Model, SerializerMixin):
     __tablename__ = "event_passes"
+    __table_args__ = (
+        db.Index("ix_event_passes_order_item_id", "order_item_id"),
+    )
     serialize_rules = ("-order_item.event_passes",)
 
     id = db.Column(db.Integer, primary_key=True)
@@ -118,15 +164,26 @@ class EventPass(db.Model, SerializerMixin):
     attendee_email = db.Column(db.String(150), nullable=False)
     attendee_phone = db.Column(db.String(20), nullable=False)
     att_status = db.Column(db.Boolean, default=False)
+    # Event version at the pass's last change, for manifest delta sync (utils/manifest.py)
+    sync_version = db.Column(db.BigInteger, nullable=False, server_default="0")
+    status_changed_at = db.Column(db.DateTime, nullable=True)
 
     order_item_id = db.Column(db.Integer, db.ForeignKey("order_items.id"), nullable=False)
     order_item = db.relationship("OrderItem", back_populates="event_passes")
 class AuditLog(db.Model, SerializerMixin):
     __tablename__ = "audit_logs"
+    # Range-partitioned by month on timestamp (see utils/audit_partitions.py),
+    # so the partition key has to be part of the primary key.
+    __table_args__ = (
+        db.Index("ix_audit_logs_timestamp", "timestamp"),
+        db.Index("ix_audit_logs_user_id_timestamp", "user_id", "timestamp"),
+        db.Index("ix_audit_logs_target_type_target_id", "target_type", "target_id"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
     serialize_rules = ("-user.logs",)
 
-    id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
     action = db.Column(db.String(255), nullable=False)
     target_type = db.Column(db.String(100), nullable=True)
@@ -141,6 +198,91 @@ class AuditLog(db.Model, SerializerMixin):
 
 
 
+class EventPassVersion(db.Model, SerializerMixin):
+    """
+    Per-event counter bumped by every transaction that creates or changes
+    passes. Writers hold the row lock until commit, so versions become
+    visible in order.
+    """
+    __tablename__ = "event_pass_versions"
+
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class EventCheckinCounter(db.Model, SerializerMixin):
+    """Checked-in passes per ticket, kept in step by the check-in engine (utils/checkin_counters.py)."""
+    __tablename__ = "event_checkin_counters"
+    __table_args__ = (
+        db.Index("ix_event_checkin_counters_event_id", "event_id"),
+    )
+
+    ticket_id = db.Column(db.Integer, db.ForeignKey("tickets.id", ondelete="CASCADE"), primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
+    checked_in = db.Column(db.Integer, default=0, nullable=False)
+
+
+class SalesDailyRollup(db.Model, SerializerMixin):
+    """Paid ticket sales per (day, ticket), maintained by utils/rollups.py."""
+    __tablename__ = "sales_daily_rollups"
+    __table_args__ = (
+        db.UniqueConstraint("day", "ticket_id"),
+        db.Index("ix_sales_daily_rollups_event_id_day", "event_id", "day"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    ticket_type = db.Column(db.String, nullable=False)
+    category = db.Column(db.String)
+    units = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Float, default=0, nullable=False)
+    orders = db.Column(db.Integer, default=0, nullable=False)
+
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
+    ticket_id = db.Column(db.Integer, db.ForeignKey("tickets.id", ondelete="CASCADE"), nullable=False)
+
+
+class SalesHourlyRollup(db.Model, SerializerMixin):
+    """
+    Paid sales per (hour, event) for time-series charts, see
+    utils/timeseries.py. An order with tickets to two events counts once in
+    each event's `orders`.
+    """
+    __tablename__ = "sales_hourly_rollups"
+    __table_args__ = (
+        db.UniqueConstraint("hour", "event_id"),
+        db.Index("ix_sales_hourly_rollups_event_id_hour", "event_id", "hour"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    hour = db.Column(db.DateTime, nullable=False)
+    units = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Float, default=0, nullable=False)
+    orders = db.Column(db.Integer, default=0, nullable=False)
+
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
+
+
+class SalesHourlyOrders(db.Model, SerializerMixin):
+    """
+    Paid orders per hour, counted once each however many events they span,
+    for time-series charts (see utils/timeseries.py). organizer_id 0 holds
+    the platform-wide count. Each count is spread over a few `slot` rows
+    so concurrent callbacks don't all wait on the platform-wide row;
+    readers sum the slots.
+    """
+    __tablename__ = "sales_hourly_orders"
+    __table_args__ = (
+        db.UniqueConstraint("organizer_id", "hour", "slot"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    hour = db.Column(db.DateTime, nullable=False)
+    organizer_id = db.Column(db.Integer, nullable=False)
+    slot = db.Column(db.SmallInteger, nullable=False)
+    orders = db.Column(db.Integer, default=0, nullable=False)
+
+
 class SavedEvent(db.Model, SerializerMixin):
     __tablename__ = "saved_events"
     serialize_rules = ("-user.saved_events", "-event.saved_events")
@@ -186,6 +328,9 @@ class Ticket(db.Model, SerializerMixin):
 
 class Event(db.Model, SerializerMixin):
     __tablename__= "events"
+    __table_args__ = (
+        db.Index("ix_events_status_start_time", "status", "start_time"),
+    )
     serialize_rules = (
         "-organizer.events",
         "-tickets.event",
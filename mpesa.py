@@ -1,14 +1,137 @@
 import os
-import base64
-import requests
+import time
+import threading
 
 from requests.auth import HTTPBasicAuth
 from datetime import datetime
 
 from dotenv import load_dotenv
+from utils.daraja import get_transport, stk_timestamp, stk_password, parse_response
 
 load_dotenv()
 
+MPESA_BASE_URL = os.environ.get("MPESA_BASE_URL", "https://sandbox.safaricom.co.ke")
+TOKEN_REFRESH_MARGIN = int(os.environ.get("MPESA_TOKEN_REFRESH_MARGIN", 300))
+
+
+class AccessTokenCache:
+    """
+    Process-wide cache for one set of Daraja credentials.
+
+    A token is reused until `expires_in` runs out. Inside the last
+    `refresh_margin` seconds callers still get the cached token while a
+    single background thread fetches the next one. When there is no usable
+    token, concurrent callers queue on one lock, so a burst of checkouts
+    costs exactly one OAuth round trip. A token Daraja rejects with 401 is
+    dropped with invalidate() (see authorized_post).
+    """
+
+    def __init__(self, base_url, consumer_key, consumer_secret, refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.base_url = base_url
+        self.consumer_key = consumer_key
+        self.consumer_secret = consumer_secret
+        self.refresh_margin = refresh_margin
+        self._token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self):
+        token, expires_at = self._token, self._expires_at
+        now = time.monotonic()
+
+        if token and now < expires_at - self.refresh_margin:
+            return token
+
+        if token and now < expires_at:
+            self._refresh_in_background()
+            return token
+
+        with self._lock:
+            if self._token and time.monotonic() < self._expires_at:
+                return self._token
+            return self._refresh()
+
+    def invalidate(self, token=None):
+        """Forget the cached token, or only `token` if it is still the cached one."""
+        with self._lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._expires_at = 0
+
+    def _fetch(self):
+        res = get_transport(self.base_url).get(
+            "/oauth/v1/generate?grant_type=client_credentials",
+            endpoint="oauth",
+            idempotent=True,
+            auth=HTTPBasicAuth(self.consumer_key, self.consumer_secret),
+        )
+        res.raise_for_status()
+        data = res.json()
+        if not isinstance(data, dict) or not data.get("access_token"):
+            raise ValueError(f"Daraja OAuth response has no access_token: {data!r}")
+        return data["access_token"], int(data.get("expires_in", 3599))
+
+    def _refresh(self):
+        # Caller holds self._lock
+        token, expires_in = self._fetch()
+        self._token = token
+        self._expires_at = time.monotonic() + expires_in
+        return token
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh():
+            try:
+                with self._lock:
+                    if time.monotonic() < self._expires_at - self.refresh_margin:
+                        return
+                    self._refresh()
+            except Exception:
+                # The old token is still valid; the next caller will retry
+                pass
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, name="mpesa-token-refresh", daemon=True).start()
+
+
+_token_caches = {}
+_token_caches_lock = threading.Lock()
+
+
+def get_token_cache(consumer_key, consumer_secret, base_url=MPESA_BASE_URL):
+    key = (base_url, consumer_key, consumer_secret)
+    with _token_caches_lock:
+        cache = _token_caches.get(key)
+        if cache is None:
+            cache = _token_caches[key] = AccessTokenCache(base_url, consumer_key, consumer_secret)
+        return cache
+
+
+def authorized_post(token_cache, path, endpoint, **kwargs):
+    """
+    POST to Daraja with a token from `token_cache`. A 401 means the token
+    was revoked or expired early and Daraja refused the call without acting
+    on it, so the token is dropped and the call is made once more with a
+    fresh one. Even an STK push is safe to resend then.
+    """
+    transport = get_transport(token_cache.base_url)
+    headers = dict(kwargs.pop("headers", None) or {})
+
+    for attempt in (1, 2):
+        token = token_cache.get()
+        headers["Authorization"] = f"Bearer {token}"
+        response = transport.post(path, endpoint, headers=headers, **kwargs)
+        if response.status_code != 401 or attempt == 2:
+            return response
+        token_cache.invalidate(token)
+
+
 class Mpesa:
     consumer_key = None
     consumer_secret = None
@@ -21,25 +144,17 @@ class Mpesa:
         self.timestamp =datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     def get_access_token(self):
-        res = requests.get(
-            "https://sandbox.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials",
-            auth=HTTPBasicAuth(self.consumer_key, self.consumer_secret),
-        )
-        data = res.json()
-        return data["access_token"]
+        return get_token_cache(self.consumer_key, self.consumer_secret).get()
     
     def generate_password(self, timestamp):
-        password_str = self.business_short_code + os.environ.get("SAF_PASS_KEY") + timestamp
-        encoded_password = base64.b64encode(password_str.encode()).decode("utf-8")
-
-        return encoded_password
+        return stk_password(self.business_short_code, os.environ.get("SAF_PASS_KEY"), timestamp)
     
     def make_stk_push(self, data):
         amount = data["amount"]
         phone = data["phone"]
         desc = data["description"]
 
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        timestamp = stk_timestamp()
         encoded_password = self.generate_password(timestamp)
 
         body = {  
@@ -56,20 +171,17 @@ class Mpesa:
             "TransactionDesc":desc
         }
 
-        token = self.get_access_token()
-
-        response = requests.post(
-            "https://sandbox.safaricom.co.ke/mpesa/stkpush/v1/processrequest",
+        response = authorized_post(
+            get_token_cache(self.consumer_key, self.consumer_secret),
+            "/mpesa/stkpush/v1/processrequest",
+            endpoint="stkpush",
             json=body,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {token}"
-            }
+            headers={"Content-Type": "application/json"}
         )
-        return response.json()
+        return parse_response(response)
     
     def check_transaction(self, checkout_request_id):
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        timestamp = stk_timestamp()
         password = self.generate_password(timestamp)
 
         data = {    
@@ -79,14 +191,12 @@ class Mpesa:
             "CheckoutRequestID": checkout_request_id,    
         }
 
-        token = self.get_access_token()
-
-        response = requests.post(
-            "https://sandbox.safaricom.co.ke/mpesa/stkpushquery/v1/query",
+        response = authorized_post(
+            get_token_cache(self.consumer_key, self.consumer_secret),
+            "/mpesa/stkpushquery/v1/query",
+            endpoint="stkpushquery",
+            idempotent=True,
             json=data,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {token}"
-            }
+            headers={"Content-Type": "application/json"}
         )
-        return response.json()
\ No newline at end of file
+        return parse_response(response)
\ No newline at end of file
@@ -2,11 +2,22 @@
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask import request
-from models import db, User, Event, Ticket, Order, OrderItem
-from sqlalchemy import func, extract
+from models import db, User, Event, SalesDailyRollup
+from sqlalchemy import func
 from datetime import datetime
-import calendar
 from utils.logger import log_action
+from utils.cache import result_cache
+from utils.summary import cached_platform_summary
+from utils.timeseries import (
+    sales_timeseries, bucket_start, bucket_count, GRANULARITIES, DEFAULT_SPAN, MAX_POINTS
+)
+
+# Seconds each payload may be served from the cache (writes invalidate sooner)
+CACHE_TTLS = {
+    "revenue_by_ticket_type": 60,
+    "top_event_types": 300,
+    "top_events_by_revenue": 60,
+}
 
 
 class AdminSummary(Resource):
@@ -16,16 +27,13 @@ class AdminSummary(Resource):
         if not admin or admin.role != "admin":
             return {"message": "Admins only."}, 403
 
-        users = User.query.count()
-        events = Event.query.count()
-        tickets = Ticket.query.count()
-        revenue = db.session.query(func.coalesce(func.sum(Order.total_amount), 0)).scalar()
+        summary = cached_platform_summary()
 
         return {
-            "total_users": users,
-            "total_events": events,
-            "total_tickets": tickets,
-            "total_revenue": revenue
+            "total_users": summary["total_users"],
+            "total_events": summary["total_events"],
+            "total_tickets": summary["total_tickets"],
+            "total_revenue": summary["total_revenue"]
         }, 200
 
 
@@ -38,27 +46,28 @@ class TicketSalesTrends(Resource):
         if not admin or admin.role != "admin":
             return {"message": "Admins only."}, 403
 
+        granularity = request.args.get("granularity", "month")
+        if granularity not in GRANULARITIES:
+            return {"message": f"granularity must be one of {', '.join(GRANULARITIES)}."}, 400
+
         try:
-           
-            results = (
-                db.session.query(
-                    extract("month", Event.start_time).label("month"),
-                    func.sum(OrderItem.quantity).label("sales")
-                )
-                .join(OrderItem.ticket)
-                .join(Ticket.event)
-                .group_by("month")
-                .order_by("month")
-                .all()
+            end = datetime.fromisoformat(request.args["end"]) if request.args.get("end") else datetime.now()
+            start = (
+                datetime.fromisoformat(request.args["start"]) if request.args.get("start")
+                else end - DEFAULT_SPAN[granularity]
             )
+            event_id = int(request.args["event_id"]) if request.args.get("event_id") else None
+            organizer_id = int(request.args["organizer_id"]) if request.args.get("organizer_id") else None
+        except ValueError:
+            return {"message": "Invalid start, end, event_id or organizer_id."}, 400
 
-            trends = [
-                {
-                    "month": calendar.month_abbr[int(month)],
-                    "sales": int(sales)
-                }
-                for month, sales in results
-            ]
+        if start >= end:
+            return {"message": "start must be before end."}, 400
+        if bucket_count(bucket_start(start, granularity), end, granularity) > MAX_POINTS:
+            return {"message": f"Range too large, at most {MAX_POINTS} {granularity} buckets."}, 400
+
+        try:
+            trends = sales_timeseries(granularity, start, end, event_id=event_id, organizer_id=organizer_id)
 
             log_action(
                 user_id=admin_id,
@@ -87,44 +96,64 @@ class TicketSalesTrends(Resource):
 class RevenueByTicketType(Resource):
     @jwt_required()
     def get(self):
-        data = db.session.query(
-            Ticket.type,
-            func.coalesce(func.sum(OrderItem.quantity * Ticket.price), 0).label('revenue')
-        ).join(OrderItem).group_by(Ticket.type).all()
+        return result_cache.get_or_compute(
+            "analytics:revenue-by-ticket-type", _revenue_by_ticket_type,
+            ttl=CACHE_TTLS["revenue_by_ticket_type"], tags=("sales",)
+        ), 200
 
-        return [
-            {"type": ticket_type, "revenue": revenue}
-            for ticket_type, revenue in data
-        ], 200
+
+def _revenue_by_ticket_type():
+    data = db.session.query(
+        SalesDailyRollup.ticket_type,
+        func.coalesce(func.sum(SalesDailyRollup.revenue), 0).label('revenue')
+    ).group_by(SalesDailyRollup.ticket_type).all()
+
+    return [
+        {"type": ticket_type, "revenue": revenue}
+        for ticket_type, revenue in data
+    ]
 
 
 class TopEventTypes(Resource):
     @jwt_required()
     def get(self):
-        data = db.session.query(
-            Event.category,
-            func.count(Event.id).label('count')
-        ).group_by(Event.category).order_by(func.count(Event.id).desc()).limit(5).all()
+        return result_cache.get_or_compute(
+            "analytics:top-event-types", _top_event_types,
+            ttl=CACHE_TTLS["top_event_types"], tags=("events",)
+        ), 200
+
+
+def _top_event_types():
+    data = db.session.query(
+        Event.category,
+        func.count(Event.id).label('count')
+    ).group_by(Event.category).order_by(func.count(Event.id).desc()).limit(5).all()
 
-        return [
-            {"category": category or "Uncategorized", "count": count}
-            for category, count in data
-        ], 200
+    return [
+        {"category": category or "Uncategorized", "count": count}
+        for category, count in data
+    ]
 
 
 class TopEventsByRevenue(Resource):
     @jwt_required()
     def get(self):
-        data = db.session.query(
-            Event.title,
-            func.sum(OrderItem.quantity * Ticket.price).label('revenue')
-        ).join(Ticket, Ticket.event_id == Event.id)\
-         .join(OrderItem, OrderItem.ticket_id == Ticket.id)\
-         .group_by(Event.title)\
-         .order_by(func.sum(OrderItem.quantity * Ticket.price).desc())\
-         .limit(5).all()
-
-        return [
-            {"title": title, "revenue": revenue}
-            for title, revenue in data
-        ], 200
+        return result_cache.get_or_compute(
+            "analytics:top-events-by-revenue", _top_events_by_revenue,
+            ttl=CACHE_TTLS["top_events_by_revenue"], tags=("events", "sales")
+        ), 200
+
+
+def _top_events_by_revenue():
+    revenue = func.sum(SalesDailyRollup.revenue).label('revenue')
+    data = db.session.query(Event.title, revenue)\
+     .select_from(SalesDailyRollup)\
+     .join(Event, Event.id == SalesDailyRollup.event_id)\
+     .group_by(SalesDailyRollup.event_id, Event.title)\
+     .order_by(revenue.desc())\
+     .limit(5).all()
+
+    return [
+        {"title": title, "revenue": revenue}
+        for title, revenue in data
+    ]
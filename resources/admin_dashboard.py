@@ -1,9 +1,18 @@
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask import request
-from models import User, Event, Report, AuditLog, Order, db
-from utils.logger import log_action
-from sqlalchemy import func
+from models import User, Event, Report, AuditLog, db
+from utils.logger import log_action, audit_writer
+from utils.cache import result_cache
+from utils.summary import cached_platform_summary
+from utils.pagination import parse_limit, decode_cursor, keyset_page, InvalidCursor
+from utils.streaming import stream_rows, ndjson_response, csv_response
+from sqlalchemy import select, tuple_
+from datetime import datetime
+
+# Seconds the dashboard payload may be served from the cache (writes invalidate sooner)
+DASHBOARD_CACHE_TTL = 15
+
 
 class AdminDashboard(Resource):
     @jwt_required()
@@ -12,16 +21,10 @@ class AdminDashboard(Resource):
         if not admin or admin.role != "admin":
             return {"message": "Admins only."}, 403
 
-        total_users = User.query.count()
-        total_events = Event.query.count()
-        active_events = Event.query.filter_by(status="approved").count()
-        pending_events = Event.query.filter_by(status="pending").count()
-        rejected_events = Event.query.filter_by(status="rejected").count()
-
-        total_revenue = db.session.query(func.coalesce(func.sum(Order.total_amount), 0)).scalar()
-
-        recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
-        recent_events = Event.query.order_by(Event.created_at.desc()).limit(5).all()
+        summary = cached_platform_summary()
+        recent = result_cache.get_or_compute(
+            "dashboard:recent", _recent_activity, ttl=DASHBOARD_CACHE_TTL, tags=("users", "events")
+        )
 
         log_action(
             user_id=admin.id,
@@ -34,23 +37,32 @@ class AdminDashboard(Resource):
 
         return {
             "summary": {
-                "total_users": total_users,
-                "total_events": total_events,
-                "active_events": active_events,
-                "pending_events": pending_events,
-                "rejected_events": rejected_events,
-                "total_revenue": total_revenue,
+                "total_users": summary["total_users"],
+                "total_events": summary["total_events"],
+                "active_events": summary["active_events"],
+                "pending_events": summary["pending_events"],
+                "rejected_events": summary["rejected_events"],
+                "total_revenue": summary["total_revenue"],
             },
-            "recent_users": [
-                u.to_dict(only=("id", "first_name", "last_name", "email", "role", "created_at"))
-                for u in recent_users
-            ],
-            "recent_events": [
-                e.to_dict(only=("id", "title", "status", "start_time", "location", "created_at"))
-                for e in recent_events
-            ]
+            **recent
         }, 200
 
+
+def _recent_activity():
+    recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
+    recent_events = Event.query.order_by(Event.created_at.desc()).limit(5).all()
+
+    return {
+        "recent_users": [
+            u.to_dict(only=("id", "first_name", "last_name", "email", "role", "created_at"))
+            for u in recent_users
+        ],
+        "recent_events": [
+            e.to_dict(only=("id", "title", "status", "start_time", "location", "created_at"))
+            for e in recent_events
+        ]
+    }
+
 class AdminReports(Resource):
     @jwt_required()
     def get(self):
@@ -74,6 +86,62 @@ class AdminReports(Resource):
             for r in reports
         ], 200
 
+AUDIT_LOG_COLUMNS = (
+    "id", "user_id", "user_name", "action", "target_type", "target_id",
+    "status", "ip_address", "timestamp", "extra_data"
+)
+
+
+def _audit_log_query(args):
+    """
+    Build the audit log SELECT for the filters in `args`, newest first.
+    User names come from one outer join instead of a lazy load per row.
+    Raises ValueError for malformed filter values.
+    """
+    query = (
+        select(
+            AuditLog.id, AuditLog.user_id, AuditLog.action, AuditLog.target_type,
+            AuditLog.target_id, AuditLog.status, AuditLog.ip_address,
+            AuditLog.timestamp, AuditLog.extra_data,
+            User.first_name, User.last_name
+        )
+        .outerjoin(User, User.id == AuditLog.user_id)
+    )
+
+    if args.get("user_id"):
+        query = query.where(AuditLog.user_id == int(args["user_id"]))
+    if args.get("action"):
+        query = query.where(AuditLog.action.ilike(f"%{args['action']}%"))
+    if args.get("target_type"):
+        query = query.where(AuditLog.target_type == args["target_type"])
+    if args.get("target_id"):
+        query = query.where(AuditLog.target_id == int(args["target_id"]))
+    if args.get("status"):
+        query = query.where(AuditLog.status == args["status"])
+    # Bounding the time range also lets Postgres skip whole monthly partitions
+    if args.get("since"):
+        query = query.where(AuditLog.timestamp >= datetime.fromisoformat(args["since"]))
+    if args.get("until"):
+        query = query.where(AuditLog.timestamp < datetime.fromisoformat(args["until"]))
+
+    return query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())
+
+
+def _audit_log_row(row):
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "user_name": f"{row.first_name} {row.last_name}" if row.user_id and row.first_name else "System",
+        "action": row.action,
+        "target_type": row.target_type,
+        "target_id": row.target_id,
+        "status": row.status,
+        "ip_address": row.ip_address,
+        "timestamp": row.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+        "extra_data": row.extra_data
+    }
+
+
 class AdminAuditLogs(Resource):
     @jwt_required()
     def get(self):
@@ -81,32 +149,62 @@ class AdminAuditLogs(Resource):
         if not admin or admin.role != "admin":
             return {"message": "Admins only."}, 403
 
-        logs = AuditLog.query.order_by(AuditLog.timestamp.desc()).limit(100).all()
+        try:
+            query = _audit_log_query(request.args)
+        except ValueError:
+            return {"message": "Invalid filter value."}, 400
+
+        export_format = request.args.get("format")
+        if export_format and export_format not in ("ndjson", "csv"):
+            return {"message": "format must be ndjson or csv."}, 400
 
-       
         log_action(
             user_id=admin.id,
-            action=f"{admin.first_name} viewed audit logs",
+            action=f"{admin.first_name} {'exported' if export_format else 'viewed'} audit logs",
             target_type="AuditLog",
             target_id=None,
             status="Success",
-            ip_address=request.remote_addr
+            ip_address=request.remote_addr,
+            extra_data={"filters": request.args.to_dict()} if request.args else None
         )
 
-        result = []
-        for log in logs:
-            user = log.user  # via relationship
-            result.append({
-                "id": log.id,
-                "user_id": log.user_id,
-                "user_name": f"{user.first_name} {user.last_name}" if user else "System",
-                "action": log.action,
-                "target_type": log.target_type,
-                "target_id": log.target_id,
-                "status": log.status,
-                "ip_address": log.ip_address,
-                "timestamp": log.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                "extra_data": log.extra_data
-            })
-
-        return result, 200
+        # Export mode walks every matching row through a server-side cursor
+        if export_format == "ndjson":
+            return ndjson_response(stream_rows(query), _audit_log_row, filename="audit_logs.ndjson")
+        if export_format == "csv":
+            return csv_response(stream_rows(query), AUDIT_LOG_COLUMNS, _audit_log_row, filename="audit_logs.csv")
+
+        limit = parse_limit(request.args.get("limit"), default=100, maximum=500)
+        cursor = request.args.get("cursor")
+        if cursor:
+            try:
+                timestamp, log_id = decode_cursor(cursor, datetime, int)
+            except InvalidCursor as e:
+                return {"message": str(e)}, 400
+            query = query.where(tuple_(AuditLog.timestamp, AuditLog.id) < tuple_(timestamp, log_id))
+
+        rows = db.session.execute(query.limit(limit + 1)).all()
+        rows, next_cursor = keyset_page(rows, limit, key=lambda r: (r.timestamp, r.id))
+
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return [_audit_log_row(row) for row in rows], 200, headers
+
+
+class AdminAuditStats(Resource):
+    @jwt_required()
+    def get(self):
+        admin = User.query.get(get_jwt_identity())
+        if not admin or admin.role != "admin":
+            return {"message": "Admins only."}, 403
+
+        return audit_writer.stats(), 200
+
+
+class AdminCacheStats(Resource):
+    @jwt_required()
+    def get(self):
+        admin = User.query.get(get_jwt_identity())
+        if not admin or admin.role != "admin":
+            return {"message": "Admins only."}, 403
+
+        return result_cache.stats(), 200
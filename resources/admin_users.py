@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask import request
 from models import User, db
 from utils.logger import log_action
+from utils.serializers import serialize_all
 
 status_parser = reqparse.RequestParser()
 status_parser.add_argument("status", type=str, required=True)  #active/banned
@@ -18,12 +19,9 @@ class AllUsers(Resource):
             return {"message": "Admins only."}, 403
 
         users = User.query.order_by(User.created_at.desc()).all()
-        return [
-            u.to_dict(only=(
-                "id", "first_name", "last_name", "email", "phone", "role", "status", "created_at"
-            ))
-            for u in users
-        ], 200
+        return serialize_all(User, users, (
+            "id", "first_name", "last_name", "email", "phone", "role", "status", "created_at"
+        )), 200
 
 class BanOrUnbanUser(Resource):
     @jwt_required()
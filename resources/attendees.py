@@ -1,9 +1,23 @@
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask import request
+from flask import request, Response
+from sqlalchemy import func, or_, select
 
 from models import db, User, EventPass, Ticket, Event, OrderItem
 from utils.logger import log_action
+from utils.checkin import (
+    apply_scans, load_passes, set_pass_state, summarize, apply_device_changes, MAX_SCAN_BATCH,
+    MAX_SYNC_CHANGES, SYNC_POLICIES, FIRST_SCAN_WINS, NOT_FOUND, FORBIDDEN, WRONG_EVENT
+)
+from utils.manifest import build_manifest, compress_manifest, current_version, decode_token, encode_token
+from utils.pagination import parse_limit, decode_cursor, keyset_page, InvalidCursor
+from utils.checkin_counters import (
+    checkin_counter_hub, stream_frames, issue_stream_token, verify_stream_token, STREAM_TOKEN_SECONDS
+)
+
+# HTTP status for a single-code scan; everything else is 200
+SCAN_HTTP_STATUS = {NOT_FOUND: 404, FORBIDDEN: 403, WRONG_EVENT: 409}
+SCAN_ACTIONS = ("checkin", "checkout")
 
 
 class EventAttendees(Resource):
@@ -19,26 +33,116 @@ class EventAttendees(Resource):
         if not event or event.organizer_id != organizer.id:
             return {"message": "You can only view attendees for your own events."}, 403
 
-        passes = (
-            db.session.query(EventPass)
-            .join(OrderItem)
-            .join(Ticket)
-            .filter(Ticket.event_id == event_id)
-            .all()
+        limit = parse_limit(request.args.get("limit"), default=100, maximum=500)
+
+        # Projected columns in one joined query; no ORM objects, no lazy loads
+        query = (
+            select(
+                EventPass.id, EventPass.ticket_code,
+                EventPass.attendee_first_name, EventPass.attendee_last_name,
+                EventPass.attendee_email, EventPass.attendee_phone,
+                EventPass.att_status, Ticket.type.label("ticket_type"),
+            )
+            .select_from(EventPass)
+            .join(OrderItem, OrderItem.id == EventPass.order_item_id)
+            .join(Ticket, Ticket.id == OrderItem.ticket_id)
+            .where(Ticket.event_id == event_id)
         )
 
+        search = request.args.get("q", "").strip()
+        if search:
+            pattern = _contains_pattern(search)
+            query = query.where(or_(
+                EventPass.attendee_first_name.ilike(pattern, escape="\\"),
+                EventPass.attendee_last_name.ilike(pattern, escape="\\"),
+                (EventPass.attendee_first_name + " " + EventPass.attendee_last_name).ilike(pattern, escape="\\"),
+                EventPass.attendee_email.ilike(pattern, escape="\\"),
+                EventPass.ticket_code.ilike(pattern, escape="\\"),
+            ))
+
+        ticket_type = request.args.get("ticket_type")
+        if ticket_type:
+            query = query.where(Ticket.type == ticket_type)
+
+        checked_in = request.args.get("checked_in")
+        if checked_in is not None:
+            if checked_in not in ("true", "false"):
+                return {"message": "checked_in must be true or false."}, 400
+            if checked_in == "true":
+                query = query.where(EventPass.att_status.is_(True))
+            else:
+                query = query.where(or_(EventPass.att_status.is_(False), EventPass.att_status.is_(None)))
+
+        cursor = request.args.get("cursor")
+        if cursor:
+            try:
+                (last_id,) = decode_cursor(cursor, int)
+            except InvalidCursor as e:
+                return {"message": str(e)}, 400
+            query = query.where(EventPass.id > last_id)
+
+        rows = db.session.execute(query.order_by(EventPass.id).limit(limit + 1)).all()
+        rows, next_cursor = keyset_page(rows, limit, key=lambda r: (r.id,))
+
         attendees = [{
-            "id": p.id,
-            "ticket_code": p.ticket_code,
-            "attendee_first_name": p.attendee_first_name,
-            "attendee_last_name": p.attendee_last_name,
-            "attendee_email": p.attendee_email,
-            "attendee_phone": p.attendee_phone,
-            "checked_in": p.att_status,
-            "ticket_type": p.order_item.ticket.type if p.order_item and p.order_item.ticket else None,
-        } for p in passes]
+            "id": r.id,
+            "ticket_code": r.ticket_code,
+            "attendee_first_name": r.attendee_first_name,
+            "attendee_last_name": r.attendee_last_name,
+            "attendee_email": r.attendee_email,
+            "attendee_phone": r.attendee_phone,
+            "checked_in": r.att_status,
+            "ticket_type": r.ticket_type,
+        } for r in rows]
+
+        return {"attendees": attendees, "next_cursor": next_cursor, "counts": _checkin_counts(event_id)}, 200
+
+
+def _contains_pattern(text):
+    """An ILIKE pattern (escape "\\") matching `text` literally, so "%" and "_" aren't wildcards."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _checkin_counts(event_id):
+    """Passes and check-ins per ticket type of the event, in one grouped query."""
+    rows = db.session.execute(
+        select(
+            Ticket.id, Ticket.type,
+            func.count(EventPass.id).label("passes"),
+            func.count(EventPass.id).filter(EventPass.att_status.is_(True)).label("checked_in"),
+        )
+        .select_from(Ticket)
+        .outerjoin(OrderItem, OrderItem.ticket_id == Ticket.id)
+        .outerjoin(EventPass, EventPass.order_item_id == OrderItem.id)
+        .where(Ticket.event_id == event_id)
+        .group_by(Ticket.id, Ticket.type)
+        .order_by(Ticket.id)
+    ).all()
+
+    by_type = [
+        {"ticket_id": r.id, "ticket_type": r.type, "passes": r.passes, "checked_in": r.checked_in}
+        for r in rows
+    ]
+    return {
+        "passes": sum(t["passes"] for t in by_type),
+        "checked_in": sum(t["checked_in"] for t in by_type),
+        "ticket_types": by_type,
+    }
+
+
+def _check_pass(pass_id, organizer, checked_in, forbidden_message):
+    """Shared body of CheckInAttendee / CheckOutAttendee: (response, pass row)."""
+    event_pass = load_passes(EventPass.id, [pass_id]).get(pass_id)
+    if not event_pass:
+        return ({"message": "Event pass not found."}, 404), None
+
+    if event_pass.organizer_id != organizer.id:
+        return ({"message": forbidden_message}, 403), None
 
-        return {"attendees": attendees}, 200
+    set_pass_state(event_pass, checked_in)
+    db.session.commit()
+    return None, event_pass
 
 
 class CheckInAttendee(Resource):
@@ -50,16 +154,11 @@ class CheckInAttendee(Resource):
         if not organizer or organizer.role != "organizer":
             return {"message": "Only organizers can check in attendees."}, 403
 
-        event_pass = EventPass.query.get(pass_id)
-        if not event_pass:
-            return {"message": "Event pass not found."}, 404
-
-        ticket = event_pass.order_item.ticket
-        if not ticket or ticket.event.organizer_id != organizer.id:
-            return {"message": "You can only check-in attendees for your own events."}, 403
-
-        event_pass.att_status = True
-        db.session.commit()
+        error, event_pass = _check_pass(
+            pass_id, organizer, True, "You can only check-in attendees for your own events."
+        )
+        if error:
+            return error
 
         log_action(
             user_id=user_id,
@@ -83,16 +182,11 @@ class CheckOutAttendee(Resource):
         if not organizer or organizer.role != "organizer":
             return {"message": "Only organizers can check out attendees."}, 403
 
-        event_pass = EventPass.query.get(pass_id)
-        if not event_pass:
-            return {"message": "Event pass not found."}, 404
-
-        ticket = event_pass.order_item.ticket
-        if not ticket or ticket.event.organizer_id != organizer.id:
-            return {"message": "Unauthorized access to this event pass."}, 403
-
-        event_pass.att_status = False
-        db.session.commit()
+        error, event_pass = _check_pass(
+            pass_id, organizer, False, "Unauthorized access to this event pass."
+        )
+        if error:
+            return error
 
         log_action(
             user_id=user_id,
@@ -105,3 +199,205 @@ class CheckOutAttendee(Resource):
         )
 
         return {"message": "Attendee checked out successfully."}, 200
+
+
+class CheckInByCode(Resource):
+    @jwt_required()
+    def patch(self, ticket_code):
+        user_id = get_jwt_identity()
+        organizer = User.query.get(user_id)
+
+        if not organizer or organizer.role != "organizer":
+            return {"message": "Only organizers can check in attendees."}, 403
+
+        action = request.args.get("action", "checkin")
+        if action not in SCAN_ACTIONS:
+            return {"message": "action must be checkin or checkout."}, 400
+        checked_in = action == "checkin"
+        event_id = request.args.get("event_id", type=int)
+
+        (result,), _ = apply_scans(organizer.id, [ticket_code], event_id=event_id, checked_in=checked_in)
+        db.session.commit()
+
+        log_action(
+            user_id=user_id,
+            action="Checked-in Attendee" if checked_in else "Checked-out Attendee",
+            target_type="EventPass",
+            target_id=result["pass_id"],
+            status="Success" if result["pass_id"] else "Failed",
+            ip_address=request.remote_addr,
+            extra_data={"ticket_code": result["code"], "result": result["status"]}
+        )
+
+        status = SCAN_HTTP_STATUS.get(result["status"], 200)
+        return result, status
+
+
+class BulkCheckIn(Resource):
+    @jwt_required()
+    def post(self, event_id):
+        user_id = get_jwt_identity()
+        organizer = User.query.get(user_id)
+
+        if not organizer or organizer.role != "organizer":
+            return {"message": "Only organizers can check in attendees."}, 403
+
+        event = Event.query.get(event_id)
+        if not event or event.organizer_id != organizer.id:
+            return {"message": "You can only check-in attendees for your own events."}, 403
+
+        data = request.get_json() or {}
+        codes = data.get("codes")
+        if not isinstance(codes, list) or not codes:
+            return {"message": "codes must be a non-empty list of ticket codes."}, 400
+        if len(codes) > MAX_SCAN_BATCH:
+            return {"message": f"At most {MAX_SCAN_BATCH} codes per request."}, 400
+        action = data.get("action", "checkin")
+        if action not in SCAN_ACTIONS:
+            return {"message": "action must be checkin or checkout."}, 400
+
+        checked_in = action == "checkin"
+        results, _ = apply_scans(organizer.id, codes, event_id=event_id, checked_in=checked_in)
+        db.session.commit()
+
+        summary = summarize(results)
+
+        # One audit record per batch rather than per scan
+        log_action(
+            user_id=user_id,
+            action="Bulk Checked-in Attendees" if checked_in else "Bulk Checked-out Attendees",
+            target_type="Event",
+            target_id=event_id,
+            status="Success",
+            ip_address=request.remote_addr,
+            extra_data={"summary": summary}
+        )
+
+        return {"results": results, "summary": summary}, 200
+
+
+class CheckInManifest(Resource):
+    @jwt_required()
+    def get(self, event_id):
+        user_id = get_jwt_identity()
+        organizer = User.query.get(user_id)
+
+        if not organizer or organizer.role != "organizer":
+            return {"message": "Only organizers can download check-in manifests."}, 403
+
+        event = Event.query.get(event_id)
+        if not event or event.organizer_id != organizer.id:
+            return {"message": "You can only download manifests for your own events."}, 403
+
+        since = 0
+        token = request.args.get("since")
+        if token:
+            try:
+                since = decode_token(token, event_id)
+            except InvalidCursor as e:
+                return {"message": str(e)}, 400
+
+        manifest = build_manifest(event_id, since)
+
+        # Devices on slow links ask for gzip; the body is compressed once here
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            return Response(
+                compress_manifest(manifest),
+                mimetype="application/json",
+                headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+            )
+        return manifest, 200
+
+
+class CheckInSync(Resource):
+    @jwt_required()
+    def post(self, event_id):
+        user_id = get_jwt_identity()
+        organizer = User.query.get(user_id)
+
+        if not organizer or organizer.role != "organizer":
+            return {"message": "Only organizers can check in attendees."}, 403
+
+        event = Event.query.get(event_id)
+        if not event or event.organizer_id != organizer.id:
+            return {"message": "You can only check-in attendees for your own events."}, 403
+
+        data = request.get_json() or {}
+        policy = data.get("policy", FIRST_SCAN_WINS)
+        if policy not in SYNC_POLICIES:
+            return {"message": f"policy must be one of: {', '.join(SYNC_POLICIES)}."}, 400
+
+        changes = data.get("changes")
+        if not isinstance(changes, list) or not changes:
+            return {"message": "changes must be a non-empty list."}, 400
+        if len(changes) > MAX_SYNC_CHANGES:
+            return {"message": f"At most {MAX_SYNC_CHANGES} changes per request."}, 400
+
+        try:
+            results = apply_device_changes(event_id, changes, policy)
+        except (KeyError, TypeError, ValueError):
+            db.session.rollback()
+            return {"message": "Each change needs a code, an ISO 8601 scanned_at and a boolean checked_in."}, 400
+        db.session.commit()
+
+        summary = summarize(results)
+
+        log_action(
+            user_id=user_id,
+            action="Synced Offline Check-ins",
+            target_type="Event",
+            target_id=event_id,
+            status="Success",
+            ip_address=request.remote_addr,
+            extra_data={"policy": policy, "summary": summary}
+        )
+
+        return {
+            "results": results,
+            "summary": summary,
+            "version": encode_token(event_id, current_version(event_id)),
+        }, 200
+
+
+class CheckInStreamToken(Resource):
+    @jwt_required()
+    def post(self, event_id):
+        user_id = get_jwt_identity()
+        organizer = User.query.get(user_id)
+
+        if not organizer or organizer.role != "organizer":
+            return {"message": "Only organizers can watch check-ins."}, 403
+
+        event = Event.query.get(event_id)
+        if not event or event.organizer_id != organizer.id:
+            return {"message": "You can only watch check-ins for your own events."}, 403
+
+        return {"token": issue_stream_token(event_id, organizer.id), "expires_in": STREAM_TOKEN_SECONDS}, 200
+
+
+class CheckInCounterStream(Resource):
+    # EventSource cannot send headers, so it passes a stream token as ?token=
+    # instead of the JWT, which must not end up in URLs
+    def get(self, event_id):
+        user_id = verify_stream_token(request.args.get("token", ""), event_id)
+        if user_id is None:
+            return {"message": "A valid stream token is required."}, 401
+
+        organizer = User.query.get(user_id)
+
+        if not organizer or organizer.role != "organizer":
+            return {"message": "Only organizers can watch check-ins."}, 403
+
+        event = Event.query.get(event_id)
+        if not event or event.organizer_id != organizer.id:
+            return {"message": "You can only watch check-ins for your own events."}, 403
+
+        watcher = checkin_counter_hub.subscribe(event_id)
+        # The stream is fed by the hub; give the connection back to the pool now
+        db.session.remove()
+
+        return Response(
+            stream_frames(checkin_counter_hub, event_id, watcher),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
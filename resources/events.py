@@ -3,6 +3,10 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask import request
 from models import Event, User, db
 from utils.logger import log_action
+from utils.serializers import compile_serializer, serialize_all, ISO_FORMAT
+from utils.pagination import parse_limit, parse_fields, decode_cursor, keyset_page, InvalidCursor
+from sqlalchemy import tuple_
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import datetime
 import cloudinary.uploader
 from werkzeug.utils import secure_filename
@@ -19,25 +23,62 @@ event_parser.add_argument("tags", type=str, required=True)
 event_parser.add_argument("image_url", type=str, required=True)
 
 
+EVENT_LIST_FIELDS = (
+    "id", "title", "description", "location",
+    "start_time", "end_time", "category", "tags", "image_url",
+    "organizer.id", "organizer.first_name", "organizer.last_name"
+)
+
+
 class EventList(Resource):
     def get(self):
         now = datetime.utcnow()
-        events = Event.query.filter(
+        limit = parse_limit(request.args.get("limit"))
+
+        try:
+            fields = parse_fields(request.args.get("fields"), EVENT_LIST_FIELDS)
+        except ValueError as e:
+            return {"message": str(e)}, 400
+
+        query = Event.query.filter(
             Event.status == "approved",
             Event.start_time > now
-        ).order_by(Event.start_time.asc()).all()
+        )
 
-        return [e.to_dict(only=(
-            "id", "title", "description", "location",
-            "start_time", "end_time", "category", "tags", "image_url",
-            "organizer.id", "organizer.first_name", "organizer.last_name"
-        )) for e in events], 200
+        # Pull the organizer columns in the same query instead of one lazy load per row
+        if any(f.startswith("organizer.") for f in fields):
+            query = query.options(
+                joinedload(Event.organizer).load_only(User.id, User.first_name, User.last_name)
+            )
+
+        cursor = request.args.get("cursor")
+        if cursor:
+            try:
+                start_time, event_id = decode_cursor(cursor, datetime, int)
+            except InvalidCursor as e:
+                return {"message": str(e)}, 400
+            query = query.filter(tuple_(Event.start_time, Event.id) > tuple_(start_time, event_id))
+
+        events = query.order_by(Event.start_time.asc(), Event.id.asc()).limit(limit + 1).all()
+        events, next_cursor = keyset_page(events, limit, key=lambda e: (e.start_time, e.id))
+
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        serialize = compile_serializer(Event, fields)
+        return [serialize(e) for e in events], 200, headers
 
 
 
 class SingleEvent(Resource):
     def get(self, id):
-        event = Event.query.filter_by(id=id, is_approved=True).first()
+        event = (
+            Event.query
+            .options(
+                joinedload(Event.organizer).load_only(User.id, User.first_name, User.last_name),
+                selectinload(Event.tickets)
+            )
+            .filter_by(id=id, is_approved=True)
+            .first()
+        )
         if not event:
             return {"message": "Event not found."}, 404
 
@@ -209,24 +250,23 @@ class DeleteEvent(Resource):
         return {"message": "Event deleted successfully."}, 200
 
 
+MY_EVENT_FIELDS = (
+    "id", "title", "description", "location",
+    "start_time", "end_time", "category", "tags", "image_url", "status",
+    "tickets.id", "tickets.type", "tickets.price", "tickets.quantity", "tickets.sold"
+)
+
+
 class MyEvents(Resource):
     @jwt_required()
     def get(self):
         user_id = int(get_jwt_identity())
-        events = Event.query.filter_by(organizer_id=user_id).order_by(Event.created_at.desc()).all()
-
-        serialized = []
-        for e in events:
-            event_dict = e.to_dict(only=(
-                "id", "title", "description", "location",
-                "start_time", "end_time", "category", "tags", "image_url", "status"
-            ))
-            event_dict["start_time"] = e.start_time.isoformat() if e.start_time else None
-            event_dict["end_time"] = e.end_time.isoformat() if e.end_time else None
-            event_dict["tickets"] = [
-                ticket.to_dict(only=("id", "type", "price", "quantity", "sold"))
-                for ticket in e.tickets
-            ]
-            serialized.append(event_dict)
-
-        return serialized, 200
+        events = (
+            Event.query
+            .options(selectinload(Event.tickets))
+            .filter_by(organizer_id=user_id)
+            .order_by(Event.created_at.desc())
+            .all()
+        )
+
+        return serialize_all(Event, events, MY_EVENT_FIELDS, datetime_format=ISO_FORMAT), 200
@@ -0,0 +1,164 @@
+# resources/exports.py
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import request
+from sqlalchemy import func, select
+from models import User, Event, Ticket, Order, OrderItem, EventPass, SalesDailyRollup
+from utils.logger import log_action
+from utils.streaming import stream_rows, csv_response, parquet_response, parquet_available
+
+
+# Each dataset is (columns, statement builder). Columns are (name, type)
+# pairs for the Parquet schema; every statement exposes Event.id and
+# Event.organizer_id so the same ownership filter applies to all of them.
+
+ORDER_COLUMNS = (
+    ("order_id", "str"), ("status", "str"), ("mpesa_receipt", "str"), ("created_at", "datetime"),
+    ("attendee_id", "int"), ("event_id", "int"), ("event_title", "str"), ("tickets", "int"), ("amount", "float"),
+)
+
+ORDER_ITEM_COLUMNS = (
+    ("id", "int"), ("order_id", "str"), ("status", "str"), ("created_at", "datetime"),
+    ("event_id", "int"), ("event_title", "str"), ("ticket_id", "int"), ("ticket_type", "str"),
+    ("quantity", "int"), ("unit_price", "float"), ("amount", "float"),
+)
+
+PASS_COLUMNS = (
+    ("id", "int"), ("ticket_code", "str"), ("attendee_first_name", "str"), ("attendee_last_name", "str"),
+    ("attendee_email", "str"), ("attendee_phone", "str"), ("checked_in", "bool"),
+    ("event_id", "int"), ("ticket_type", "str"), ("order_item_id", "int"),
+)
+
+REVENUE_COLUMNS = (
+    ("event_id", "int"), ("event_title", "str"), ("units", "int"), ("revenue", "float"), ("orders", "int"),
+)
+
+
+def _orders():
+    # One row per (order, event): an organizer only sees the part of an
+    # order that was spent on their own events
+    return (
+        select(
+            Order.order_id, Order.status, Order.mpesa_receipt, Order.created_at, Order.attendee_id,
+            Event.id.label("event_id"), Event.title.label("event_title"),
+            func.sum(OrderItem.quantity).label("tickets"),
+            func.sum(OrderItem.quantity * Ticket.price).label("amount"),
+        )
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(Ticket, Ticket.id == OrderItem.ticket_id)
+        .join(Event, Event.id == Ticket.event_id)
+        .group_by(Order.id, Event.id)
+        .order_by(Order.id, Event.id)
+    )
+
+
+def _order_items():
+    return (
+        select(
+            OrderItem.id, Order.order_id, Order.status, Order.created_at,
+            Event.id.label("event_id"), Event.title.label("event_title"),
+            Ticket.id.label("ticket_id"), Ticket.type.label("ticket_type"),
+            OrderItem.quantity, Ticket.price.label("unit_price"),
+            (OrderItem.quantity * Ticket.price).label("amount"),
+        )
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(Ticket, Ticket.id == OrderItem.ticket_id)
+        .join(Event, Event.id == Ticket.event_id)
+        .order_by(OrderItem.id)
+    )
+
+
+def _passes():
+    return (
+        select(
+            EventPass.id, EventPass.ticket_code,
+            EventPass.attendee_first_name, EventPass.attendee_last_name,
+            EventPass.attendee_email, EventPass.attendee_phone,
+            EventPass.att_status.label("checked_in"),
+            Event.id.label("event_id"), Ticket.type.label("ticket_type"), EventPass.order_item_id,
+        )
+        .select_from(EventPass)
+        .join(OrderItem, OrderItem.id == EventPass.order_item_id)
+        .join(Ticket, Ticket.id == OrderItem.ticket_id)
+        .join(Event, Event.id == Ticket.event_id)
+        .order_by(EventPass.id)
+    )
+
+
+def _revenue():
+    # Paid sales only, from the rollup table
+    return (
+        select(
+            Event.id.label("event_id"), Event.title.label("event_title"),
+            func.sum(SalesDailyRollup.units).label("units"),
+            func.sum(SalesDailyRollup.revenue).label("revenue"),
+            func.sum(SalesDailyRollup.orders).label("orders"),
+        )
+        .select_from(SalesDailyRollup)
+        .join(Event, Event.id == SalesDailyRollup.event_id)
+        .group_by(Event.id)
+        .order_by(Event.id)
+    )
+
+
+EXPORTS = {
+    "orders": (ORDER_COLUMNS, _orders),
+    "order-items": (ORDER_ITEM_COLUMNS, _order_items),
+    "passes": (PASS_COLUMNS, _passes),
+    "revenue": (REVENUE_COLUMNS, _revenue),
+}
+
+
+class DataExport(Resource):
+    @jwt_required()
+    def get(self, dataset):
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+
+        if not user or user.role not in ("organizer", "admin"):
+            return {"message": "Only organizers and admins can export data."}, 403
+
+        if dataset not in EXPORTS:
+            return {"message": f"Unknown export. Choose one of: {', '.join(EXPORTS)}."}, 404
+
+        export_format = request.args.get("format", "csv")
+        if export_format not in ("csv", "parquet"):
+            return {"message": "format must be csv or parquet."}, 400
+        if export_format == "parquet" and not parquet_available():
+            return {"message": "Parquet export is not available on this server."}, 501
+
+        columns, build = EXPORTS[dataset]
+        statement = build()
+
+        # Same rules as EventAttendees: organizers only see their own events
+        try:
+            event_id = int(request.args["event_id"]) if "event_id" in request.args else None
+        except ValueError:
+            return {"message": "event_id must be an integer."}, 400
+        if event_id is not None:
+            event = Event.query.get(event_id)
+            if not event or (user.role != "admin" and event.organizer_id != user.id):
+                return {"message": "You can only export data for your own events."}, 403
+            statement = statement.where(Event.id == event_id)
+        elif user.role != "admin":
+            statement = statement.where(Event.organizer_id == user.id)
+
+        log_action(
+            user_id=user.id,
+            action=f"Exported {dataset}",
+            target_type="Event" if event_id else "Export",
+            target_id=event_id,
+            status="Success",
+            ip_address=request.remote_addr,
+            extra_data={"format": export_format}
+        )
+
+        names = [name for name, _ in columns]
+        rows = stream_rows(statement)
+        filename = f"{dataset}-event-{event_id}" if event_id else dataset
+
+        if export_format == "parquet":
+            return parquet_response(rows, columns, lambda row: dict(row._mapping), filename=f"{filename}.parquet")
+        return csv_response(rows, names, lambda row: dict(row._mapping), filename=f"{filename}.csv")
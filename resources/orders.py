@@ -3,10 +3,12 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask import request, jsonify
 from models import db, Order, OrderItem, Ticket, EventPass, User
 from utils.logger import log_action
+from utils.inventory import reserve_tickets, InsufficientInventory
+from utils.payment_queue import enqueue_stk_push, notify_payment_workers
+from utils.settlement import mark_paid, REFUND_DUE
 import uuid
 from datetime import datetime
 from resources.mpesaConfig import initiate_stk_push
-from mpesa import Mpesa
 
 order_parser = reqparse.RequestParser()
 order_parser.add_argument("ticket_id", type=int, required=True)
@@ -30,83 +32,120 @@ class CreateOrder(Resource):
         if attendee.role != "attendee":
             return {"message": "Only attendees can make purchases"}, 403
 
-        # Calculate total amount
+        # Validate the whole cart in memory before touching the session
+        try:
+            requested_ids = {int(t["ticket_id"]) for t in ticket_data_list}
+        except (KeyError, TypeError, ValueError):
+            return {"message": "Each ticket needs a ticket_id and quantity"}, 400
+
+        tickets = {
+            t.id: t for t in Ticket.query.filter(Ticket.id.in_(requested_ids)).all()
+        }
+
         total_amount = 0
+        quantities = {}
         for ticket_data in ticket_data_list:
-            ticket = Ticket.query.get(ticket_data["ticket_id"])
+            ticket_id = int(ticket_data["ticket_id"])
+            quantity = ticket_data.get("quantity")
+            attendees_list = ticket_data.get("attendees")
+
+            ticket = tickets.get(ticket_id)
             if not ticket:
-                return {"message": f"Ticket with ID {ticket_data['ticket_id']} not found"}, 404
-            total_amount += ticket.price * ticket_data["quantity"]
+                return {"message": f"Ticket with ID {ticket_id} not found"}, 404
+            # bool is a subclass of int, so `true` would pass as 1
+            if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+                return {"message": f"Invalid quantity for ticket {ticket_id}"}, 400
+            if not isinstance(attendees_list, list) or not all(isinstance(a, dict) for a in attendees_list):
+                return {"message": f"Attendees must be a list of objects for ticket {ticket_id}"}, 400
+            if len(attendees_list) != quantity:
+                return {"message": f"Attendee info mismatch for ticket {ticket_id}"}, 400
+
+            total_amount += ticket.price * quantity
+            quantities[ticket_id] = quantities.get(ticket_id, 0) + quantity
 
-        # Create Order
+        # Create the Order and its OrderItems in a single flush
         order = Order(
             order_id=str(uuid.uuid4()).replace("-", "").upper()[:12],
             attendee=attendee,
             total_amount=total_amount
         )
-        db.session.add(order)
-
-        # Create OrderItems and attach attendees
-        for ticket_data in ticket_data_list:
-            ticket_id = ticket_data["ticket_id"]
-            quantity = ticket_data["quantity"]
-            attendees_list = ticket_data.get("attendees", [])
-
-            if len(attendees_list) != quantity:
-                return {"message": f"Attendee info mismatch for ticket {ticket_id}"}, 400
-
-            order_item = OrderItem(
+        order_items = [
+            OrderItem(
                 order=order,
-                ticket_id=ticket_id,
-                quantity=quantity,
-                temp_attendee_data=attendees_list
+                ticket_id=int(ticket_data["ticket_id"]),
+                quantity=ticket_data["quantity"],
+                temp_attendee_data=ticket_data["attendees"]
             )
-            db.session.add(order_item)
-
-        db.session.commit()
+            for ticket_data in ticket_data_list
+        ]
+        db.session.add(order)
+        db.session.add_all(order_items)
 
-        # Initiate STK Push
-        mpesa = Mpesa()
+        # Reserve seats last so the ticket row locks are held only until commit
         try:
-            response = mpesa.make_stk_push({
-                "amount": total_amount,
-                "phone": phone,
-                "description": "Payment for event tickets"
-            })
-            return {
-                "message": "STK Push initiated",
-                "checkoutRequestID": response.get("CheckoutRequestID"),
-                "customerMessage": response.get("CustomerMessage"),
-                "orderId": order.order_id
-            }, 200
-        except Exception as e:
-            return {"message": "STK Push failed", "error": str(e)}, 500
+            reserve_tickets(quantities)
+        except InsufficientInventory as e:
+            db.session.rollback()
+            return {"message": str(e)}, 409
 
+        # The STK push is sent by the payment workers, not in this request
+        enqueue_stk_push(order, phone, "Payment for event tickets")
+        db.session.commit()
+        notify_payment_workers()
 
+        return {
+            "message": "STK Push queued",
+            "orderId": order.order_id,
+            "status": order.status
+        }, 202
 
 
 class ConfirmPayment(Resource):
     @jwt_required()
     def patch(self, id):
         user_id = get_jwt_identity()
-        order = Order.query.filter_by(id=id, attendee_id=user_id).first()
+        user = User.query.get(user_id)
+        if not user:
+            return {"message": "Order not found or unauthorized."}, 404
+
+        # Locked like in the callback, so a concurrent callback can't also record the sale
+        query = Order.query.filter_by(id=id)
+        if user.role != "admin":
+            query = query.filter_by(attendee_id=user.id)
+        order = query.with_for_update().first()
 
         if not order:
             return {"message": "Order not found or unauthorized."}, 404
 
-        order.status = "paid"
-        order.mpesa_receipt = str(uuid.uuid4())
+        if order.status == "paid":
+            return {"message": "Order already paid.", "receipt": order.mpesa_receipt}, 200
+
+        # Orders are settled by the M-Pesa callback or an STK push query. An
+        # admin may settle one by hand against a receipt they have checked.
+        if user.role != "admin":
+            return {"message": "Payment has not been confirmed by M-Pesa yet."}, 403
+
+        receipt = ((request.get_json(silent=True) or {}).get("receipt") or "").strip()
+        if not receipt:
+            return {"message": "receipt is required."}, 400
+
+        # Same path as the M-Pesa callback: a lapsed hold is re-reserved
+        outcome = mark_paid(order, receipt)
         db.session.commit()
 
         log_action(
-            user_id=user_id,
+            user_id=user.id,
             action="Confirmed Payment",
             target_type="Order",
             target_id=order.id,
-            status="Success",
-            ip_address=request.remote_addr
+            status="Failed" if outcome == REFUND_DUE else "Success",
+            ip_address=request.remote_addr,
+            extra_data={"receipt": receipt}
         )
 
+        if outcome == REFUND_DUE:
+            return {"message": "Tickets sold out before payment; the order is due a refund."}, 409
+
         return {"message": "Payment confirmed.", "receipt": order.mpesa_receipt}, 200
 
 
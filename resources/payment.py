@@ -1,9 +1,18 @@
+import logging
 from flask import request
 from flask_restful import Resource
-from models import db, Order, EventPass
-import uuid
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, Order, PaymentJob, User, ProcessedCallback
+from utils.daraja import get_transport
+from utils.payment_queue import (
+    enqueue_stk_push, notify_payment_workers, adopt_unknown_push, live_job, find_pushed_order
+)
+from utils.settlement import settle_payment, DUPLICATE, ALREADY_PAID, REFUND_DUE
+
+from mpesa import Mpesa, MPESA_BASE_URL
+
+logger = logging.getLogger(__name__)
 
-from mpesa import Mpesa
 
 class PaymentResource(Resource):
     def post(self):
@@ -11,25 +20,52 @@ class PaymentResource(Resource):
         order_id=data.get("order_id")
         phone=data.get("phone")
 
-        order = Order.query.filter_by(order_id=order_id).first()
+        # Locked so two concurrent requests can't both queue a push
+        order = Order.query.filter_by(order_id=order_id).with_for_update().first()
 
         if not order:
             return {"message": "Order not found"}, 404
 
-        mpesa_instance = Mpesa()
-        
-        mpesa_response = mpesa_instance.make_stk_push({
-            "amount": int(order.total_amount),
-            "phone": phone,
-            "description": f"Payment for order {order_id}"
-        })
-
-        if mpesa_response.get("ResponseCode") == "0":
-            checkout_id = mpesa_response.get("CheckoutRequestID")
-            order.order_id = checkout_id  
-            db.session.commit()
+        if order.status != "pending":
+            return {"message": f"Order is already {order.status}"}, 400
+
+        job = live_job(order.id)
+        if job:
+            db.session.rollback()
+            return {
+                "message": "A payment request for this order is already in progress",
+                "orderId": order.order_id,
+                "stkStatus": job.status
+            }, 409
 
-        return {"message": "STK Push initiated", "data": mpesa_response}, 200
+        enqueue_stk_push(order, phone, f"Payment for order {order_id}")
+        db.session.commit()
+        notify_payment_workers()
+
+        return {"message": "STK Push queued", "orderId": order.order_id}, 202
+
+
+class PaymentStatusResource(Resource):
+    def get(self, order_id):
+        order = Order.query.filter_by(order_id=order_id).first()
+
+        if not order:
+            return {"message": "Order not found"}, 404
+
+        job = (
+            PaymentJob.query
+            .filter_by(order_id=order.id)
+            .order_by(PaymentJob.created_at.desc())
+            .first()
+        )
+
+        return {
+            "orderId": order.order_id,
+            "status": order.status,
+            "checkoutRequestID": order.checkout_request_id,
+            "stkStatus": job.status if job else None,
+            "customerMessage": (job.response or {}).get("CustomerMessage") if job else None
+        }, 200
     
 
 class CheckPaymentResource(Resource):
@@ -41,6 +77,16 @@ class CheckPaymentResource(Resource):
         return {"message": "ok", "data": res}
     
 
+class PaymentLatencyResource(Resource):
+    @jwt_required()
+    def get(self):
+        admin = User.query.get(get_jwt_identity())
+        if not admin or admin.role != "admin":
+            return {"message": "Admins only."}, 403
+
+        return get_transport(MPESA_BASE_URL).latency_snapshot(), 200
+
+
 class PaymentCallbackResource(Resource):
     def get(self):
         return {"message": "callback registered"}
@@ -60,46 +106,42 @@ class PaymentCallbackResource(Resource):
                     receipt = item["Value"]
                     break
 
-            order = Order.query.filter_by(order_id=checkout_id).first()
+            if not checkout_id:
+                return {"message": "CheckoutRequestID is required"}, 400
+
+            # Safaricom retries callbacks; replays stop at this indexed lookup
+            if ProcessedCallback.query.filter_by(checkout_request_id=checkout_id).first():
+                return {"message": "Callback already processed"}, 200
+
+            # Lock the order so the hold sweeper can't expire it mid-callback
+            order = find_pushed_order(checkout_id)
+
+            if not order:
+                # The push may have gone out while its response was lost
+                order = adopt_unknown_push(checkout_id, metadata)
 
             if not order:
                 return {"message": "Order not found"}, 404
 
-            if result_code == 0:
-                order.status = "paid"
-                order.mpesa_receipt = receipt if receipt else "N/A"
-
-                # Create EventPasses and increment ticket.sold
-                for item in order.order_items:
-                    ticket = item.ticket
-                    attendee_data_list = item.temp_attendee_data or []
-                    
-                    if (ticket.quantity - ticket.sold) < len(attendee_data_list):
-                        return {"message": f"Not enough tickets left for ticket ID {ticket.id}"}, 400
-                    
-                    ticket.sold += len(attendee_data_list)
-
-                    for att in attendee_data_list:
-                        ep = EventPass(
-                            ticket_code=str(uuid.uuid4())[:8].upper(),
-                            attendee_first_name=att["first_name"],
-                            attendee_last_name=att["last_name"],
-                            attendee_email=att["email"],
-                            attendee_phone=att["phone"],
-                            order_item=item
-                        )
-                        db.session.add(ep)
-
-                db.session.commit()
-
-            else:
-                order.status = "failed"
-                order.mpesa_receipt = receipt if receipt else "N/A"
-                db.session.commit()
+            # A concurrent replay waits on the order lock and then finds the
+            # ledger row taken, so only one request ever mints passes.
+            outcome = settle_payment(order, checkout_id, result_code, receipt)
+            if outcome == DUPLICATE:
+                db.session.rollback()
+                return {"message": "Callback already processed"}, 200
+
+            db.session.commit()
+
+            if outcome == ALREADY_PAID:
+                return {"message": "Order already paid"}, 200
+
+            if outcome == REFUND_DUE:
+                logger.error("Order %s was paid after its tickets sold out; refund due", order.order_id)
+                return {"message": "Callback received, refund due"}, 200
 
             return {"message": "Callback received"}, 200
 
-        except Exception as e:
+        except Exception:
             db.session.rollback()
-            print("Callback error:", str(e))
+            logger.exception("Could not process payment callback")
             return {"message": "Error"}, 500
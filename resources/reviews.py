@@ -3,6 +3,8 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask import request
 from models import db, Review, Event, User, OrderItem, Ticket
 from utils.logger import log_action
+from utils.serializers import serialize_all
+from sqlalchemy.orm import joinedload
 
 review_parser = reqparse.RequestParser()
 review_parser.add_argument("rating", type=int, required=True)
@@ -61,13 +63,16 @@ class EventReviews(Resource):
         if not event:
             return {"message": "Event not found."}, 404
 
-        reviews = Review.query.filter_by(event_id=id).order_by(Review.created_at.desc()).all()
+        reviews = (
+            Review.query
+            .options(joinedload(Review.attendee).load_only(User.id, User.first_name, User.last_name))
+            .filter_by(event_id=id)
+            .order_by(Review.created_at.desc())
+            .all()
+        )
 
-        return [
-            r.to_dict(only=(
-                "id", "rating", "comment", "created_at",
-                "attendee.id", "attendee.first_name", "attendee.last_name"
-            ))
-            for r in reviews
-        ], 200
+        return serialize_all(Review, reviews, (
+            "id", "rating", "comment", "created_at",
+            "attendee.id", "attendee.first_name", "attendee.last_name"
+        )), 200
 
@@ -1,5 +1,9 @@
 from models import db, User, Event, Ticket, Order, OrderItem, Review, Report, AuditLog, EventPass, SavedEvent
 from app import app, bcrypt
+from utils.audit_partitions import ensure_partitions
+from utils.rollups import rebuild_sales_rollups
+from utils.ticket_filter import ticket_filters
+from utils.checkin_counters import rebuild_checkin_counters
 from datetime import datetime, timedelta
 import random
 import uuid
@@ -8,6 +12,7 @@ with app.app_context():
     print("Dropping and recreating database")
     db.drop_all()
     db.create_all()
+    ensure_partitions()
 
     print("🌱 Seeding users...")
     users = []
@@ -240,6 +245,12 @@ with app.app_context():
 
     db.session.commit()
 
+    print("🌱 Building sales rollups...")
+    rebuild_sales_rollups()
+    rebuild_checkin_counters()
+    # Seeded passes skip mint_passes, so stale gate filters must go
+    ticket_filters.discard()
+
     print("🌱 Seeding saved events & reports...")
 
     for attendee in attendees_only:
@@ -0,0 +1,70 @@
+import utils.checkin_counters
+from models import db
+from utils.passes import mint_passes
+from tests.conftest import auth_header
+
+ATTENDEES = [
+    {"first_name": "Ann", "last_name": "O_Neil", "email": "ann@example.com", "phone": "0711111111"},
+    {"first_name": "Bob", "last_name": "OxNeil", "email": "bob@example.com", "phone": "0711111112"},
+    {"first_name": "Cy", "last_name": "100%", "email": "cy@example.com", "phone": "0711111113"},
+]
+
+
+def test_search_treats_wildcards_literally(client, make_user, make_event, make_order):
+    organizer = make_user("organizer")
+    event = make_event(organizer=organizer)
+    order = make_order(event.tickets[0], quantity=len(ATTENDEES))
+    order.order_items[0].temp_attendee_data = ATTENDEES
+    mint_passes(order)
+    db.session.commit()
+
+    def search(q):
+        response = client.get(f"/organizer/events/{event.id}/attendees", query_string={"q": q},
+                              headers=auth_header(organizer))
+        assert response.status_code == 200
+        return sorted(a["attendee_first_name"] for a in response.get_json()["attendees"])
+
+    assert search("O_N") == ["Ann"]
+    assert search("%") == ["Cy"]
+    assert search("_") == ["Ann"]
+    assert search("\\") == []
+    assert search("neil") == ["Ann", "Bob"]
+
+
+def test_stream_opens_only_with_a_stream_token_for_its_event(client, make_user, make_event, monkeypatch):
+    organizer = make_user("organizer")
+    event, other = make_event(organizer=organizer), make_event(organizer=organizer)
+    stream = f"/organizer/events/{event.id}/checkin/stream"
+
+    def stream_token(event_id):
+        response = client.post(f"/organizer/events/{event_id}/checkin/stream-token", headers=auth_header(organizer))
+        assert response.status_code == 200
+        return response.get_json()["token"]
+
+    token = stream_token(event.id)
+
+    # The account's JWT is no longer accepted in the URL
+    jwt = auth_header(organizer)["Authorization"].split()[1]
+    assert client.get(stream, query_string={"jwt": jwt}).status_code == 401
+    assert client.get(stream, query_string={"token": jwt}).status_code == 401
+    assert client.get(stream, query_string={"token": stream_token(other.id)}).status_code == 401
+    # ...and the stream token opens nothing but the stream
+    response = client.get(f"/organizer/events/{event.id}/attendees", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code != 200
+
+    response = client.get(stream, query_string={"token": token}, buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert next(iter(response.response)).startswith(b"retry:")
+    response.close()
+
+    monkeypatch.setattr(utils.checkin_counters, "STREAM_TOKEN_SECONDS", -1)
+    assert client.get(stream, query_string={"token": token}).status_code == 401
+
+
+def test_only_the_owner_gets_a_stream_token(client, make_user, make_event):
+    event = make_event()
+    stranger = make_user("organizer")
+
+    response = client.post(f"/organizer/events/{event.id}/checkin/stream-token", headers=auth_header(stranger))
+    assert response.status_code == 403
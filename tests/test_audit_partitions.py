@@ -0,0 +1,101 @@
+import csv
+import gzip
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+from models import db
+from utils.audit_partitions import (
+    DEFAULT_PARTITION, ensure_partitions, archive_partitions, list_partitions, partition_name, month_start,
+    add_months,
+)
+
+# Well before the partitions the app fixture creates for the current month
+NOW = datetime(2020, 6, 15)
+
+
+def insert_log(conn, timestamp, action="login"):
+    conn.execute(text(
+        "INSERT INTO audit_logs (timestamp, action, status) VALUES (:timestamp, :action, 'Success')"
+    ), {"timestamp": timestamp, "action": action})
+
+
+def partition_of(action):
+    with db.engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT tableoid::regclass::text FROM audit_logs WHERE action = :action"
+        ), {"action": action}).scalar()
+
+
+def test_ensure_partitions_creates_months_ahead_once(app):
+    created = ensure_partitions(months_ahead=2, now=NOW)
+
+    assert created == ["audit_logs_y2020m06", "audit_logs_y2020m07", "audit_logs_y2020m08"]
+    assert ensure_partitions(months_ahead=2, now=NOW) == []
+    months = [month for month, _ in list_partitions()]
+    assert add_months(month_start(NOW), 2) in months
+
+
+def test_attaching_a_month_moves_its_rows_out_of_the_default_partition(app):
+    ensure_partitions(months_ahead=0, now=NOW)
+    with db.engine.begin() as conn:
+        insert_log(conn, datetime(2020, 9, 5), action="early")
+    assert partition_of("early") == DEFAULT_PARTITION
+
+    ensure_partitions(months_ahead=3, now=NOW)
+
+    assert partition_of("early") == "audit_logs_y2020m09"
+
+
+def test_inserts_into_the_range_wait_for_the_attach(app):
+    ensure_partitions(months_ahead=0, now=NOW)
+    errors = []
+
+    def maintain():
+        try:
+            with app.app_context():
+                ensure_partitions(months_ahead=1, now=NOW)
+        except Exception as exc:
+            errors.append(exc)
+
+    # An insert into next month's range lands in the default partition and
+    # commits only after the maintenance run has started moving rows
+    with db.engine.connect() as writer:
+        writer.begin()
+        insert_log(writer, datetime(2020, 7, 2), action="racing")
+        thread = threading.Thread(target=maintain)
+        thread.start()
+        time.sleep(0.5)
+        writer.commit()
+    thread.join()
+
+    assert errors == []
+    assert partition_of("racing") == "audit_logs_y2020m07"
+
+
+def test_archive_exports_then_drops_expired_months(app, tmp_path):
+    old = datetime(2019, 3, 10)
+    ensure_partitions(months_ahead=0, now=old)
+    ensure_partitions(months_ahead=0, now=NOW)
+    with db.engine.begin() as conn:
+        insert_log(conn, old, action="expired")
+        insert_log(conn, NOW, action="kept")
+
+    archived = archive_partitions(str(tmp_path), retain_months=12, now=NOW)
+
+    assert archived == [partition_name(old)]
+    with gzip.open(tmp_path / f"{partition_name(old)}.csv.gz", "rt") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["action"] for row in rows] == ["expired"]
+    with db.engine.connect() as conn:
+        assert conn.execute(text("SELECT to_regclass(:name)"), {"name": partition_name(old)}).scalar() is None
+    assert partition_of("kept") == partition_name(NOW)
+
+
+def test_maintenance_command_runs_against_the_database(app, tmp_path):
+    result = app.test_cli_runner().invoke(args=["maintain-audit-logs", "--archive-dir", str(tmp_path)])
+
+    assert result.exit_code == 0, result.output
+    assert partition_name(month_start(datetime.utcnow())) in [name for _, name in list_partitions()]
@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from models import AuditLog
+from utils.audit_spool import AuditSpool, DEAD_LETTER_FILE
+from utils.logger import AuditWriter
+
+
+def _record(n, **fields):
+    record = {
+        "timestamp": datetime(2025, 1, 1, 12, 0, n % 60),
+        "user_id": None,
+        "action": f"action {n}",
+        "target_type": "Event",
+        "target_id": n,
+        "status": "Success",
+        "ip_address": "127.0.0.1",
+        "extra_data": None,
+    }
+    record.update(fields)
+    return record
+
+
+def _drain(spool):
+    records, position = spool.read_batch(1000)
+    spool.commit(position)
+    return [r["target_id"] for r in records]
+
+
+def test_torn_tail_frame_is_cut_off_on_restart(tmp_path):
+    spool = AuditSpool(str(tmp_path))
+    for n in range(3):
+        spool.append(_record(n))
+    segment = os.path.join(spool.directory, sorted(os.listdir(spool.directory))[0])
+    spool.close()
+
+    # A crash halfway through writing the fourth frame
+    with open(segment, "ab") as f:
+        f.write(b"\x40\x00\x00\x00\x01\x02")
+
+    spool = AuditSpool(str(tmp_path))
+    assert spool.pending == 3
+    spool.append(_record(3))
+    assert _drain(spool) == [0, 1, 2, 3]
+
+
+def test_restart_resumes_from_checkpoint(tmp_path):
+    spool = AuditSpool(str(tmp_path))
+    for n in range(5):
+        spool.append(_record(n))
+    records, position = spool.read_batch(2)
+    spool.commit(position)
+    spool.close()
+
+    spool = AuditSpool(str(tmp_path))
+    assert spool.pending == 3
+    assert _drain(spool) == [2, 3, 4]
+
+
+def test_segments_behind_checkpoint_are_deleted(tmp_path):
+    spool = AuditSpool(str(tmp_path), segment_bytes=256)
+    for n in range(20):
+        spool.append(_record(n))
+    segments = [name for name in os.listdir(spool.directory) if name.endswith(".seg")]
+    assert len(segments) > 3
+
+    assert _drain(spool) == list(range(20))
+    remaining = [name for name in os.listdir(spool.directory) if name.endswith(".seg")]
+    assert remaining == [max(segments)]
+    assert spool.backlog_bytes == 0
+
+
+def test_spools_of_exited_processes_are_adopted(tmp_path):
+    first = AuditSpool(str(tmp_path))
+    second = AuditSpool(str(tmp_path))
+    second.append(_record(7))
+    second.close()
+
+    orphans = AuditSpool.orphans(str(tmp_path))
+    assert [o.directory for o in orphans] == [second.directory]
+    assert _drain(orphans[0]) == [7]
+    first.close()
+
+
+def test_sync_fsyncs_only_what_was_appended_since(tmp_path, monkeypatch):
+    spool = AuditSpool(str(tmp_path), fsync=False)
+    calls = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: calls.append(fd) or real_fsync(fd))
+
+    for n in range(50):
+        spool.append(_record(n))
+    assert calls == []
+
+    spool.sync()
+    spool.sync()
+    assert len(calls) == 1
+    spool.close()
+
+
+def test_requests_do_not_wait_on_fsync_by_default(app, tmp_path, monkeypatch):
+    writer = AuditWriter(flush_interval=0.05)
+    writer.app = app
+    writer.spool = AuditSpool(str(tmp_path), fsync=writer.fsync == "always")
+    synced_by = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: synced_by.append(threading.current_thread().name) or real_fsync(fd))
+    writer._thread = threading.Thread(target=writer._run, name="audit-writer", daemon=True)
+    writer._thread.start()
+
+    for n in range(20):
+        writer.submit(_record(n))
+    assert threading.current_thread().name not in synced_by
+
+    deadline = time.monotonic() + 5
+    while writer.stats()["written"] < 20 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    writer.close()
+
+    assert writer.stats()["written"] == 20
+    assert "audit-writer" in synced_by
+    assert not writer.spool._unsynced
+    assert AuditLog.query.count() == 20
+
+
+def test_rejected_records_are_dead_lettered(app, tmp_path):
+    writer = AuditWriter()
+    writer.app = app
+    spool = AuditSpool(str(tmp_path))
+    spool.append(_record(1))
+    spool.append(_record(2, user_id=999999))  # no such user
+    spool.append(_record(3, status="x" * 100))  # longer than the column
+    spool.append(_record(4))
+    records, position = spool.read_batch(10)
+
+    assert writer._write(spool, records)
+    spool.commit(position)
+
+    assert sorted(row.target_id for row in AuditLog.query.all()) == [1, 4]
+    with open(os.path.join(spool.directory, DEAD_LETTER_FILE)) as f:
+        assert [json.loads(line)["record"]["target_id"] for line in f] == [2, 3]
+    assert writer.stats()["dead_lettered"] == 2
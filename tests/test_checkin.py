@@ -0,0 +1,83 @@
+import random
+import threading
+
+from models import db, EventCheckinCounter, EventPass
+from utils.manifest import current_version
+from utils.passes import mint_passes
+from tests.conftest import auth_header
+
+
+def _event_with_passes(make_user, make_event, make_order, count):
+    organizer = make_user("organizer")
+    event = make_event(organizer=organizer)
+    codes = [code for _, code, _ in mint_passes(make_order(event.tickets[0], quantity=count))]
+    db.session.commit()
+    return organizer, event, codes
+
+
+def test_repeat_scans_leave_the_event_version_alone(client, make_user, make_event, make_order):
+    organizer, event, codes = _event_with_passes(make_user, make_event, make_order, 3)
+    url = f"/organizer/events/{event.id}/checkin"
+
+    client.post(url, json={"codes": codes}, headers=auth_header(organizer))
+    version = current_version(event.id)
+    response = client.post(url, json={"codes": codes}, headers=auth_header(organizer))
+
+    assert response.get_json()["summary"] == {"already_checked_in": 3}
+    assert current_version(event.id) == version
+
+
+def test_scans_accept_only_checkin_or_checkout(client, make_user, make_event, make_order):
+    organizer, event, codes = _event_with_passes(make_user, make_event, make_order, 2)
+    headers = auth_header(organizer)
+
+    for action in ("check-out", "CHECKOUT", "", ["checkout"]):
+        response = client.post(f"/organizer/events/{event.id}/checkin", json={"codes": codes, "action": action},
+                               headers=headers)
+        assert response.status_code == 400, action
+    for action in ("check-out", "undo", ""):
+        response = client.patch(f"/organizer/checkin/code/{codes[0]}", query_string={"action": action},
+                                headers=headers)
+        assert response.status_code == 400, action
+    assert EventPass.query.filter_by(att_status=True).count() == 0
+
+    client.post(f"/organizer/events/{event.id}/checkin", json={"codes": codes}, headers=headers)
+    response = client.patch(f"/organizer/checkin/code/{codes[0]}", query_string={"action": "checkout"},
+                            headers=headers)
+    assert response.status_code == 200
+    assert EventPass.query.filter_by(att_status=True).count() == 1
+
+
+def test_gates_and_device_uploads_in_parallel_do_not_deadlock(app, make_user, make_event, make_order):
+    organizer, event, codes = _event_with_passes(make_user, make_event, make_order, 60)
+    headers, event_id = auth_header(organizer), event.id
+    barrier = threading.Barrier(12)
+    statuses = []
+
+    def gate(n):
+        # Overlapping batches in different orders
+        batch = random.Random(n).sample(codes, 40)
+        client = app.test_client()
+        barrier.wait()
+        statuses.append(client.post(f"/organizer/events/{event_id}/checkin", json={"codes": batch},
+                                    headers=headers).status_code)
+
+    def device(n):
+        changes = [{"code": code, "checked_in": True, "scanned_at": f"2025-01-01T10:00:{n:02d}Z"}
+                   for code in random.Random(100 + n).sample(codes, 40)]
+        client = app.test_client()
+        barrier.wait()
+        statuses.append(client.post(f"/organizer/events/{event_id}/checkin/sync", json={"changes": changes},
+                                    headers=headers).status_code)
+
+    threads = [threading.Thread(target=gate, args=(n,)) for n in range(8)]
+    threads += [threading.Thread(target=device, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db.session.expire_all()
+    assert statuses == [200] * 12
+    checked_in = EventPass.query.filter_by(att_status=True).count()
+    assert EventCheckinCounter.query.one().checked_in == checked_in
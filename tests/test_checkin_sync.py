@@ -0,0 +1,40 @@
+from models import db, EventPass, Order
+from utils.passes import mint_passes
+from utils.query_counter import count_queries
+from tests.conftest import auth_header
+
+
+def test_minting_loads_item_events_in_one_query(app, make_event, make_order):
+    event = make_event(tickets=(("Regular", 500, 100), ("VIP", 2000, 100)))
+    order = make_order(event.tickets[0], quantity=2)
+    order_id = order.id
+    db.session.commit()
+    db.session.expire_all()
+
+    order = Order.query.get(order_id)
+    with count_queries() as queries:
+        mint_passes(order)
+
+    assert not any("FROM tickets" in sql and "WHERE tickets.id =" in sql for sql in queries.statements)
+    assert EventPass.query.count() == 2
+
+
+def test_sync_rejects_checked_in_that_is_not_a_boolean(client, make_user, make_event, make_order):
+    organizer = make_user("organizer")
+    event = make_event(organizer=organizer)
+    order = make_order(event.tickets[0])
+    (event_pass,) = mint_passes(order)
+    db.session.commit()
+
+    url = f"/organizer/events/{event.id}/checkin/sync"
+    change = {"code": event_pass[1], "scanned_at": "2025-01-01T10:00:00Z"}
+
+    for value in ("false", 0, None):
+        response = client.post(url, json={"changes": [dict(change, checked_in=value)]},
+                               headers=auth_header(organizer))
+        assert response.status_code == 400
+    assert EventPass.query.filter_by(att_status=True).count() == 0
+
+    response = client.post(url, json={"changes": [dict(change, checked_in=True)]}, headers=auth_header(organizer))
+    assert response.status_code == 200
+    assert EventPass.query.filter_by(att_status=True).count() == 1
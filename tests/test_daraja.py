@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+import requests
+
+from utils.daraja import stk_timestamp, stk_password, parse_response
+
+# The sandbox shortcode and passkey from Safaricom's STK push documentation
+SANDBOX_SHORTCODE = "174379"
+SANDBOX_PASSKEY = "bfb279f9aa9bdbcf158e97dd71a467cd2e0c893059b10f78e6b72ada1ed2c919"
+
+
+def reply(status, body, content_type="application/json"):
+    response = requests.Response()
+    response.status_code = status
+    response.headers["Content-Type"] = content_type
+    response._content = body.encode()
+    return response
+
+
+def test_password_matches_the_documented_example():
+    timestamp = stk_timestamp(datetime(2016, 2, 16, 16, 56, 27))
+
+    assert timestamp == "20160216165627"
+    assert stk_password(SANDBOX_SHORTCODE, SANDBOX_PASSKEY, timestamp) == (
+        "MTc0Mzc5YmZiMjc5ZjlhYTliZGJjZjE1OGU5N2RkNzFhNDY3Y2QyZTBjODkzMDU5YjEwZjc4ZTZi"
+        "NzJhZGExZWQyYzkxOTIwMTYwMjE2MTY1NjI3"
+    )
+
+
+def test_replies_are_parsed_whatever_their_status():
+    accepted = parse_response(reply(200, '{"ResponseCode": "0", "CheckoutRequestID": "ws_CO_1"}'))
+    rejected = parse_response(reply(400, '{"errorCode": "400.002.02", "errorMessage": "Bad Request"}'))
+
+    assert accepted["CheckoutRequestID"] == "ws_CO_1"
+    assert rejected["errorMessage"] == "Bad Request"
+
+
+@pytest.mark.parametrize("status, body", [
+    (502, "<html><body>Bad Gateway</body></html>"),
+    (200, ""),
+    (200, '["not", "an", "object"]'),
+])
+def test_replies_without_a_json_object_raise(status, body):
+    with pytest.raises(ValueError, match=str(status)):
+        parse_response(reply(status, body, content_type="text/html"))
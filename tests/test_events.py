@@ -0,0 +1,66 @@
+# tests/test_events.py
+from models import db, Review
+from utils.query_counter import assert_max_queries
+
+EVENTS = 5
+TICKETS = (("Regular", 1000, 100), ("VIP", 5000, 20), ("Student", 500, 50))
+
+
+def seed(make_user, make_event):
+    """EVENTS events, each with its own organizer, three ticket types and two reviews."""
+    events = []
+    for n in range(EVENTS):
+        event = make_event(make_user("organizer"), tickets=TICKETS, title=f"Event {n}")
+        for rating in (4, 5):
+            db.session.add(Review(rating=rating, comment="ok", attendee_id=make_user().id, event_id=event.id))
+        events.append(event.id)
+    db.session.commit()
+    # Start each request from an empty identity map, as in production
+    db.session.remove()
+    return events
+
+
+def test_event_list_is_one_query(client, make_user, make_event):
+    seed(make_user, make_event)
+
+    with assert_max_queries(1):
+        response = client.get("/events")
+
+    assert response.status_code == 200
+    assert len(response.get_json()) == EVENTS
+    assert all(e["organizer"]["first_name"] == "Organizer" for e in response.get_json())
+
+
+def test_event_list_without_organizer_skips_the_join(client, make_user, make_event):
+    seed(make_user, make_event)
+
+    with assert_max_queries(1) as queries:
+        response = client.get("/events?fields=id,title")
+
+    assert response.status_code == 200
+    assert "JOIN" not in queries.statements[0]
+    assert all(set(e) == {"id", "title"} for e in response.get_json())
+
+
+def test_single_event_loads_organizer_and_tickets_up_front(client, make_user, make_event):
+    event_id = seed(make_user, make_event)[0]
+
+    # The event with its organizer, then every ticket in one selectin query
+    with assert_max_queries(2):
+        response = client.get(f"/events/{event_id}")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["organizer"]["first_name"] == "Organizer"
+    assert sorted(t["type"] for t in body["tickets"]) == ["Regular", "Student", "VIP"]
+
+
+def test_event_reviews_load_attendees_in_the_same_query(client, make_user, make_event):
+    event_id = seed(make_user, make_event)[0]
+
+    # The event lookup, then the reviews joined to their attendees
+    with assert_max_queries(2):
+        response = client.get(f"/events/{event_id}/reviews")
+
+    assert response.status_code == 200
+    assert [r["attendee"]["first_name"] for r in response.get_json()] == ["Attendee", "Attendee"]
@@ -0,0 +1,26 @@
+import csv
+import io
+
+from models import db
+from tests.conftest import auth_header
+
+
+def test_export_by_event_needs_an_integer_event_id(client, make_user, make_event, make_order):
+    organizer = make_user("organizer")
+    event, other = make_event(organizer=organizer), make_event(organizer=organizer)
+    for e in (event, other):
+        make_order(e.tickets[0], status="paid")
+    db.session.commit()
+
+    def export(**query):
+        return client.get("/exports/orders", query_string=query, headers=auth_header(organizer))
+
+    for bad in ("abc", "", "1.5"):
+        response = export(event_id=bad)
+        assert response.status_code == 400, bad
+        assert response.get_json() == {"message": "event_id must be an integer."}
+
+    response = export(event_id=event.id)
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [int(row["event_id"]) for row in rows] == [event.id]
@@ -0,0 +1,66 @@
+import threading
+
+from models import db, Ticket
+from utils.inventory import reserve_tickets, InsufficientInventory
+
+BUYERS = 40
+
+
+def test_concurrent_reservations_never_oversell(app, make_event):
+    ticket_id = make_event(tickets=(("Regular", 500, 25),)).tickets[0].id
+    barrier = threading.Barrier(BUYERS)
+    results = []
+
+    def buy():
+        with app.app_context():
+            barrier.wait()
+            try:
+                reserve_tickets({ticket_id: 1})
+                db.session.commit()
+                results.append(True)
+            except InsufficientInventory:
+                db.session.rollback()
+                results.append(False)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=buy) for _ in range(BUYERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db.session.expire_all()
+    assert results.count(True) == 25
+    assert results.count(False) == BUYERS - 25
+    assert Ticket.query.get(ticket_id).sold == 25
+
+
+def test_multi_ticket_carts_do_not_deadlock(app, make_event):
+    event = make_event(tickets=(("Regular", 500, 1000), ("VIP", 2000, 1000)))
+    first, second = (t.id for t in event.tickets)
+    barrier = threading.Barrier(BUYERS)
+    errors = []
+
+    def buy(n):
+        with app.app_context():
+            barrier.wait()
+            try:
+                # Half the carts list the tickets in the opposite order
+                cart = {first: 1, second: 1} if n % 2 else {second: 1, first: 1}
+                reserve_tickets(cart)
+                db.session.commit()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=buy, args=(n,)) for n in range(BUYERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db.session.expire_all()
+    assert errors == []
+    assert [Ticket.query.get(t).sold for t in (first, second)] == [BUYERS, BUYERS]
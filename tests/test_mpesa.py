@@ -0,0 +1,111 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from mpesa import AccessTokenCache, authorized_post
+
+
+class FakeDaraja:
+    """A local OAuth and STK query endpoint. Tokens are token-1, token-2, ... in issue order."""
+
+    def __init__(self):
+        self.token_requests = 0
+        self.revoked = set()
+        self.oauth_reply = None  # (status, body) to send instead of a token
+        self.lock = threading.Lock()
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with fake.lock:
+                    fake.token_requests += 1
+                    number = fake.token_requests
+                if fake.oauth_reply:
+                    self._reply(*fake.oauth_reply)
+                else:
+                    self._reply(200, {"access_token": f"token-{number}", "expires_in": "3599"})
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                token = self.headers["Authorization"].split()[1]
+                if token in fake.revoked:
+                    self._reply(401, {"errorMessage": "Invalid Access Token"})
+                else:
+                    self._reply(200, {"ResponseCode": "0", "token": token})
+
+            def _reply(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def daraja():
+    fake = FakeDaraja()
+    yield fake
+    fake.server.shutdown()
+    fake.server.server_close()
+
+
+def test_concurrent_callers_share_one_token_fetch(daraja):
+    cache = AccessTokenCache(daraja.url, "key", "secret")
+    barrier = threading.Barrier(100)
+    tokens = []
+
+    def checkout():
+        barrier.wait()
+        tokens.append(cache.get())
+
+    threads = [threading.Thread(target=checkout) for _ in range(100)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert daraja.token_requests == 1
+    assert set(tokens) == {"token-1"}
+
+
+def test_a_rejected_token_is_replaced_and_the_call_retried_once(daraja):
+    cache = AccessTokenCache(daraja.url, "key", "secret")
+    assert cache.get() == "token-1"
+    daraja.revoked.add("token-1")
+
+    response = authorized_post(cache, "/mpesa/stkpushquery/v1/query", endpoint="stkpushquery", json={})
+
+    assert response.json() == {"ResponseCode": "0", "token": "token-2"}
+    assert cache.get() == "token-2"
+
+    # A second 401 is returned to the caller rather than retried again
+    daraja.revoked.update({"token-2", "token-3"})
+    assert authorized_post(cache, "/mpesa/stkpushquery/v1/query", endpoint="stkpushquery", json={}).status_code == 401
+    assert daraja.token_requests == 3
+
+
+@pytest.mark.parametrize("status, body", [
+    (400, {"errorMessage": "Invalid credentials"}),
+    (200, {"errorMessage": "no token here"}),
+])
+def test_bad_oauth_replies_are_not_cached(daraja, status, body):
+    cache = AccessTokenCache(daraja.url, "key", "secret")
+    daraja.oauth_reply = (status, body)
+
+    with pytest.raises((requests.HTTPError, ValueError)):
+        cache.get()
+
+    daraja.oauth_reply = None
+    assert cache.get() == "token-2"
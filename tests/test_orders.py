@@ -0,0 +1,41 @@
+import pytest
+
+from models import Order, Ticket
+from tests.conftest import auth_header
+
+
+def _attendee(n):
+    return {"first_name": "Guest", "last_name": str(n), "email": f"guest{n}@example.com", "phone": "0711111111"}
+
+
+@pytest.mark.parametrize("item", [
+    {"quantity": 1, "attendees": None},
+    {"quantity": 1},
+    {"quantity": 1, "attendees": "Guest"},
+    {"quantity": 1, "attendees": ["Guest"]},
+    {"quantity": True, "attendees": [_attendee(0)]},
+    {"quantity": 0, "attendees": []},
+    {"quantity": 2, "attendees": [_attendee(0)]},
+])
+def test_malformed_cart_items_are_rejected(client, make_user, make_event, item):
+    attendee = make_user("attendee")
+    ticket_id = make_event().tickets[0].id
+
+    response = client.post("/orders", json={"phone": "254700000001", "tickets": [dict(item, ticket_id=ticket_id)]},
+                           headers=auth_header(attendee))
+
+    assert response.status_code == 400
+    assert Order.query.count() == 0
+    assert Ticket.query.get(ticket_id).sold == 0
+
+
+def test_valid_cart_reserves_seats(client, make_user, make_event):
+    attendee = make_user("attendee")
+    ticket_id = make_event().tickets[0].id
+
+    response = client.post("/orders", json={"phone": "254700000001", "tickets": [
+        {"ticket_id": ticket_id, "quantity": 2, "attendees": [_attendee(0), _attendee(1)]},
+    ]}, headers=auth_header(attendee))
+
+    assert response.status_code == 202
+    assert Ticket.query.get(ticket_id).sold == 2
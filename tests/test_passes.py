@@ -0,0 +1,45 @@
+from models import db, EventPass
+from utils import passes
+from utils.manifest import current_version
+from utils.passes import mint_passes
+from utils.query_counter import count_queries
+from utils.settlement import mark_paid
+
+
+def test_colliding_codes_are_retried_without_aborting_the_order(app, make_event, make_order, monkeypatch):
+    ticket = make_event().tickets[0]
+    (existing,) = mint_passes(make_order(ticket))
+    db.session.commit()
+
+    fresh = iter(["FRESHCODE0000001", "FRESHCODE0000002"])
+    batches = []
+
+    def codes(count):
+        # The first attempt reuses the existing code for one of the three rows
+        batch = [existing[1], "NEWCODE000000001", "NEWCODE000000002"] if not batches else [next(fresh)]
+        batches.append(batch)
+        return batch[:count]
+    monkeypatch.setattr(passes, "generate_ticket_codes", codes)
+
+    minted = mint_passes(make_order(ticket, quantity=3))
+    db.session.commit()
+
+    assert len(batches) == 2
+    assert sorted(code for _, code, _ in minted) == ["FRESHCODE0000001", "NEWCODE000000001", "NEWCODE000000002"]
+    assert EventPass.query.count() == 4
+
+
+def test_settling_takes_the_event_version_lock_last(app, make_event, make_order):
+    event = make_event()
+    order = make_order(event.tickets[0], quantity=2)
+
+    with count_queries() as queries:
+        mark_paid(order, "RCP1")
+    writes = [sql.split()[2] for sql in queries.statements if sql.startswith("INSERT INTO")]
+    db.session.commit()
+
+    # The pass inserts and rollup upserts all come before the shared version row
+    assert {"event_passes", "sales_daily_rollups", "sales_hourly_rollups"} <= set(writes)
+    assert writes[-1] == "event_pass_versions"
+    assert writes.count("event_pass_versions") == 1
+    assert {p.sync_version for p in EventPass.query.all()} == {current_version(event.id)}
@@ -0,0 +1,38 @@
+import threading
+
+from models import db, EventPass, Order, ProcessedCallback, SalesDailyRollup
+
+REPLAYS = 50
+
+
+def test_concurrent_callback_replays_settle_once(app, make_event, make_order):
+    order = make_order(make_event().tickets[0], quantity=3)
+    order.checkout_request_id = "ws_CO_replayed"
+    db.session.commit()
+    order_id = order.id
+
+    body = {"Body": {"stkCallback": {
+        "CheckoutRequestID": "ws_CO_replayed",
+        "ResultCode": 0,
+        "CallbackMetadata": {"Item": [{"Name": "MpesaReceiptNumber", "Value": "RCP1"}]},
+    }}}
+    barrier = threading.Barrier(REPLAYS)
+    statuses = []
+
+    def replay():
+        client = app.test_client()
+        barrier.wait()
+        statuses.append(client.post("/payments/callback", json=body).status_code)
+
+    threads = [threading.Thread(target=replay) for _ in range(REPLAYS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db.session.expire_all()
+    assert statuses == [200] * REPLAYS
+    assert ProcessedCallback.query.filter_by(checkout_request_id="ws_CO_replayed").count() == 1
+    assert Order.query.filter_by(id=order_id, status="paid").count() == 1
+    assert EventPass.query.count() == 3
+    assert [r.units for r in SalesDailyRollup.query.all()] == [3]
@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from models import db, Order, PaymentJob
+from utils.payment_queue import (
+    PaymentWorkerPool, enqueue_stk_push, claim_jobs, reap_stuck_jobs, reconcile_sent_pushes
+)
+
+
+def _claimed_job(make_event, make_order):
+    order = make_order(make_event().tickets[0])
+    enqueue_stk_push(order, "254700000001", "test")
+    db.session.commit()
+    (job,) = claim_jobs(1)
+    return order, job
+
+
+def _run(app, job, monkeypatch, push):
+    monkeypatch.setattr("mpesa.Mpesa.get_access_token", lambda self: "token")
+    monkeypatch.setattr("mpesa.Mpesa.make_stk_push", push)
+    PaymentWorkerPool(app, concurrency=1)._process(job)
+    db.session.expire_all()
+    return PaymentJob.query.get(job["id"])
+
+
+def test_read_timeout_is_never_retried(app, make_event, make_order, monkeypatch):
+    _, job = _claimed_job(make_event, make_order)
+
+    def push(self, data):
+        raise requests.ReadTimeout("read timed out")
+
+    assert _run(app, job, monkeypatch, push).status == "unknown"
+
+
+def test_connection_refused_is_queued_again(app, make_event, make_order, monkeypatch):
+    _, job = _claimed_job(make_event, make_order)
+
+    def push(self, data):
+        reason = NewConnectionError(None, "connection refused")
+        raise requests.ConnectionError(MaxRetryError(None, "/stkpush", reason=reason))
+
+    assert _run(app, job, monkeypatch, push).status == "queued"
+
+
+def test_accepted_push_stores_checkout_id(app, make_event, make_order, monkeypatch):
+    order, job = _claimed_job(make_event, make_order)
+
+    def push(self, data):
+        return {"ResponseCode": "0", "CheckoutRequestID": "ws_CO_1"}
+
+    assert _run(app, job, monkeypatch, push).status == "sent"
+    assert Order.query.get(order.id).checkout_request_id == "ws_CO_1"
+    assert PaymentJob.query.get(job["id"]).checkout_request_id == "ws_CO_1"
+
+
+def test_stuck_processing_jobs_become_unknown(app, make_event, make_order):
+    _, job = _claimed_job(make_event, make_order)
+    PaymentJob.query.filter_by(id=job["id"]).update(
+        {PaymentJob.updated_at: datetime.now() - timedelta(hours=1)}, synchronize_session=False
+    )
+    db.session.commit()
+
+    assert reap_stuck_jobs(timeout=60) == 1
+    assert PaymentJob.query.get(job["id"]).status == "unknown"
+
+
+def test_callback_for_unknown_push_settles_its_order(client, make_event, make_order):
+    order, job = _claimed_job(make_event, make_order)
+    PaymentJob.query.filter_by(id=job["id"]).update({PaymentJob.status: "unknown"}, synchronize_session=False)
+    db.session.commit()
+
+    response = client.post("/payments/callback", json={"Body": {"stkCallback": {
+        "CheckoutRequestID": "ws_CO_lost",
+        "ResultCode": 0,
+        "CallbackMetadata": {"Item": [
+            {"Name": "Amount", "Value": job["amount"]},
+            {"Name": "MpesaReceiptNumber", "Value": "RCP1"},
+            {"Name": "PhoneNumber", "Value": 254700000001},
+        ]},
+    }}})
+
+    assert response.status_code == 200
+    db.session.expire_all()
+    order = Order.query.get(order.id)
+    assert (order.status, order.checkout_request_id) == ("paid", "ws_CO_lost")
+    assert PaymentJob.query.get(job["id"]).status == "sent"
+
+
+def test_second_payment_request_is_refused_while_a_push_is_live(client, make_event, make_order):
+    order = make_order(make_event().tickets[0])
+    body = {"order_id": order.order_id, "phone": "254700000001"}
+
+    assert client.post("/payments", json=body).status_code == 202
+    response = client.post("/payments", json=body)
+
+    assert response.status_code == 409
+    assert response.get_json()["stkStatus"] == "queued"
+    assert PaymentJob.query.filter_by(order_id=order.id).count() == 1
+
+    # Once the push is known to have failed, the customer may try again
+    PaymentJob.query.filter_by(order_id=order.id).update({PaymentJob.status: "failed"}, synchronize_session=False)
+    db.session.commit()
+    assert client.post("/payments", json=body).status_code == 202
+
+
+def test_callbacks_resolve_through_the_job_that_sent_the_push(client, make_event, make_order):
+    order, job = _claimed_job(make_event, make_order)
+    PaymentJob.query.filter_by(id=job["id"]).update(
+        {PaymentJob.status: "sent", PaymentJob.checkout_request_id: "ws_CO_first"}, synchronize_session=False
+    )
+    # The order shows a later push; the first push's callback must still find it
+    Order.query.filter_by(id=order.id).update({Order.checkout_request_id: "ws_CO_later"}, synchronize_session=False)
+    db.session.commit()
+
+    response = client.post("/payments/callback", json={"Body": {"stkCallback": {
+        "CheckoutRequestID": "ws_CO_first",
+        "ResultCode": 0,
+        "CallbackMetadata": {"Item": [{"Name": "MpesaReceiptNumber", "Value": "RCP2"}]},
+    }}})
+
+    assert response.status_code == 200
+    db.session.expire_all()
+    assert Order.query.get(order.id).status == "paid"
+
+
+def test_reconciler_queries_each_job_by_its_own_checkout_id(app, make_event, make_order, monkeypatch):
+    order, job = _claimed_job(make_event, make_order)
+    PaymentJob.query.filter_by(id=job["id"]).update({
+        PaymentJob.status: "sent",
+        PaymentJob.checkout_request_id: "ws_CO_first",
+        PaymentJob.updated_at: datetime.now() - timedelta(hours=1),
+    }, synchronize_session=False)
+    Order.query.filter_by(id=order.id).update({Order.checkout_request_id: "ws_CO_later"}, synchronize_session=False)
+    db.session.commit()
+
+    queried = []
+
+    def check_transaction(self, checkout_id):
+        queried.append(checkout_id)
+        return {"ResultCode": "0"}
+
+    monkeypatch.setattr("mpesa.Mpesa.check_transaction", check_transaction)
+
+    assert reconcile_sent_pushes() == 1
+    assert queried == ["ws_CO_first"]
+    db.session.expire_all()
+    assert Order.query.get(order.id).status == "paid"
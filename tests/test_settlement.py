@@ -0,0 +1,125 @@
+import logging
+import threading
+
+from models import db, EventPass, Order, SalesDailyRollup, Ticket
+from tests.conftest import auth_header
+
+
+def _callback(checkout_id, result_code=0, receipt="RCP1"):
+    return {"Body": {"stkCallback": {
+        "CheckoutRequestID": checkout_id,
+        "ResultCode": result_code,
+        "CallbackMetadata": {"Item": [{"Name": "MpesaReceiptNumber", "Value": receipt}]},
+    }}}
+
+
+def _expire(order, ticket):
+    order.status = "expired"
+    ticket.sold -= sum(item.quantity for item in order.order_items)
+    db.session.commit()
+
+
+def test_late_payment_takes_its_seats_back(client, make_event, make_order):
+    ticket = make_event(tickets=(("Regular", 500, 2),)).tickets[0]
+    order = make_order(ticket, quantity=2)
+    order.checkout_request_id = "ws_CO_late"
+    db.session.commit()
+    _expire(order, ticket)
+
+    assert client.post("/payments/callback", json=_callback("ws_CO_late")).status_code == 200
+
+    db.session.expire_all()
+    assert Order.query.get(order.id).status == "paid"
+    assert Ticket.query.get(ticket.id).sold == 2
+    assert EventPass.query.count() == 2
+
+
+def test_late_payment_for_sold_out_seats_is_due_a_refund(client, make_event, make_order, caplog):
+    ticket = make_event(tickets=(("Regular", 500, 2),)).tickets[0]
+    order = make_order(ticket, quantity=2)
+    order.checkout_request_id = "ws_CO_late"
+    db.session.commit()
+    _expire(order, ticket)
+    make_order(ticket, quantity=1)  # someone else took a seat meanwhile
+
+    with caplog.at_level(logging.ERROR, logger="resources.payment"):
+        response = client.post("/payments/callback", json=_callback("ws_CO_late", receipt="RCP9"))
+
+    assert response.status_code == 200
+    assert f"Order {order.order_id} was paid after its tickets sold out; refund due" in caplog.messages
+    db.session.expire_all()
+    order = Order.query.get(order.id)
+    assert (order.status, order.mpesa_receipt) == ("refund_due", "RCP9")
+    assert Ticket.query.get(ticket.id).sold == 1
+    assert EventPass.query.count() == 0
+
+
+def test_attendees_cannot_mark_their_own_order_paid(client, make_user, make_event, make_order):
+    attendee = make_user("attendee")
+    order = make_order(make_event().tickets[0], quantity=2, attendee=attendee)
+
+    response = client.patch(f"/orders/{order.id}/pay", json={"receipt": "FAKE"}, headers=auth_header(attendee))
+
+    assert response.status_code == 403
+    db.session.expire_all()
+    assert Order.query.get(order.id).status == "pending"
+    assert EventPass.query.count() == 0
+    assert SalesDailyRollup.query.count() == 0
+
+
+def test_admin_confirmation_needs_a_receipt(client, make_user, make_event, make_order):
+    admin = make_user("admin")
+    order = make_order(make_event().tickets[0])
+
+    assert client.patch(f"/orders/{order.id}/pay", headers=auth_header(admin)).status_code == 400
+
+    response = client.patch(f"/orders/{order.id}/pay", json={"receipt": "RCP7"}, headers=auth_header(admin))
+    assert response.status_code == 200
+    db.session.expire_all()
+    assert (Order.query.get(order.id).status, Order.query.get(order.id).mpesa_receipt) == ("paid", "RCP7")
+    assert EventPass.query.count() == 1
+
+
+def test_confirming_an_expired_order_reserves_again(client, make_user, make_event, make_order):
+    admin = make_user("admin")
+    ticket = make_event(tickets=(("Regular", 500, 1),)).tickets[0]
+    order = make_order(ticket)
+    _expire(order, ticket)
+    make_order(ticket)
+
+    response = client.patch(f"/orders/{order.id}/pay", json={"receipt": "RCP8"}, headers=auth_header(admin))
+
+    assert response.status_code == 409
+    db.session.expire_all()
+    assert Order.query.get(order.id).status == "refund_due"
+    assert Ticket.query.get(ticket.id).sold == 1
+
+
+def test_confirm_racing_the_callback_records_the_sale_once(app, make_user, make_event, make_order):
+    admin = make_user("admin")
+    order = make_order(make_event().tickets[0], quantity=2)
+    order.checkout_request_id = "ws_CO_race"
+    db.session.commit()
+    order_id, headers = order.id, auth_header(admin)
+    barrier = threading.Barrier(2)
+
+    def confirm():
+        client = app.test_client()
+        barrier.wait()
+        client.patch(f"/orders/{order_id}/pay", json={"receipt": "RCP_RACE"}, headers=headers)
+
+    def callback():
+        client = app.test_client()
+        barrier.wait()
+        client.post("/payments/callback", json=_callback("ws_CO_race"))
+
+    threads = [threading.Thread(target=confirm), threading.Thread(target=callback)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db.session.expire_all()
+    assert Order.query.get(order_id).status == "paid"
+    assert [r.units for r in SalesDailyRollup.query.all()] == [2]
+    assert EventPass.query.count() == 2
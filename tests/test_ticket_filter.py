@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import text
+
+from models import db
+from utils import ticket_filter
+from utils.ticket_filter import ScalableBloomFilter, TicketFilterRegistry, TICKET_FILTER_ERROR_RATE
+
+
+@pytest.mark.parametrize("count", [100_000, 1_000_000])
+def test_false_positive_rate_stays_near_target(count):
+    bloom = ScalableBloomFilter()
+    bloom.update(f"PASS{i:012d}" for i in range(count))
+
+    probes = 200_000
+    false_positives = sum(f"FAKE{i:012d}" in bloom for i in range(probes))
+
+    # 200k probes put the sampling error at about 7% of the target
+    assert false_positives / probes < TICKET_FILTER_ERROR_RATE * 1.25
+    assert all(f"PASS{i:012d}" in bloom for i in range(0, count, 997))
+
+
+def _registry(directory):
+    registry = TicketFilterRegistry()
+    registry.enabled = True
+    registry.directory = str(directory)
+    return registry
+
+
+@pytest.fixture
+def codes_in_db(monkeypatch):
+    codes = []
+    monkeypatch.setattr(ticket_filter, "event_ticket_codes", lambda event_id: list(codes))
+    return codes
+
+
+def test_other_processes_read_only_the_new_journal_lines(tmp_path, codes_in_db):
+    codes_in_db.append("A1")
+    minter, gate = _registry(tmp_path), _registry(tmp_path)
+    assert gate.might_contain(1, "A1") and not gate.might_contain(1, "B1")
+
+    minter.add(1, ["B1", "B2"])
+
+    assert gate.might_contain(1, "B1") and gate.might_contain(1, "B2")
+    assert gate._filters[1].journal_offset == len("B1\nB2\n")
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(tmp_path, codes_in_db, monkeypatch):
+    monkeypatch.setattr(ticket_filter, "JOURNAL_COMPACT_BYTES", 64)
+    minter, gate = _registry(tmp_path), _registry(tmp_path)
+    gate.might_contain(1, "X")
+    snapshot = ticket_filter._stat(gate._path(1))
+
+    codes = [f"CODE{i:04d}" for i in range(20)]
+    for code in codes:
+        minter.add(1, [code])
+
+    assert ticket_filter._stat(gate._path(1)) != snapshot
+    assert (tmp_path / "event-1.codes").stat().st_size < 64
+    assert all(gate.might_contain(1, code) for code in codes)
+
+
+def test_failed_add_bypasses_the_filter_until_the_mint_ends(app, tmp_path, monkeypatch):
+    minter, gate = _registry(tmp_path), _registry(tmp_path)
+    assert not gate.might_contain(1, "NEWCODE")
+
+    def broken(event_id, codes):
+        raise OSError("disk full")
+    monkeypatch.setattr(minter, "_append", broken)
+
+    db.session.execute(text("SELECT 1"))  # the mint's transaction
+    minter.add(1, ["NEWCODE"])
+    assert gate.might_contain(1, "NEWCODE")
+    assert gate.might_contain(1, "ANYTHING")
+
+    db.session.commit()
+    assert not gate.might_contain(1, "ANYTHING")
+    assert not (tmp_path / "event-1.stale").exists()
+
+
+def test_rebuild_keeps_codes_of_mints_still_in_flight(app, tmp_path, codes_in_db, monkeypatch):
+    codes_in_db.append("COMMITTED")
+    other_process, minter, gate = _registry(tmp_path), _registry(tmp_path), _registry(tmp_path)
+    gate.might_contain(1, "X")
+
+    # Appended by a mint in another process that hasn't committed yet
+    other_process.add(1, ["INFLIGHT"])
+
+    def broken(event_id, codes):
+        raise OSError("disk full")
+    monkeypatch.setattr(minter, "_append", broken)
+    db.session.execute(text("SELECT 1"))
+    minter.add(1, ["FAILED"])
+    codes_in_db.append("FAILED")
+    db.session.commit()
+
+    # The stale mark has ended, so this rebuilds from the database
+    assert not gate.might_contain(1, "ANYTHING")
+    assert all(gate.might_contain(1, code) for code in ("COMMITTED", "FAILED", "INFLIGHT"))
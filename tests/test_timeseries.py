@@ -0,0 +1,70 @@
+import re
+from datetime import datetime, timedelta
+
+from models import db, Order, OrderItem, SalesHourlyOrders
+from utils.query_counter import count_queries
+from utils.rollups import record_sale, rebuild_sales_rollups
+from utils.timeseries import sales_timeseries
+
+
+def _two_event_order(make_user, make_event):
+    organizer = make_user("organizer")
+    first, second = make_event(organizer=organizer), make_event(organizer=organizer)
+    order = Order(order_id="T2EVENTS", attendee_id=make_user("attendee").id, total_amount=2000,
+                  status="paid", created_at=datetime(2025, 3, 1, 10, 30))
+    db.session.add(order)
+    for event in (first, second):
+        db.session.add(OrderItem(order=order, ticket_id=event.tickets[0].id, quantity=1))
+    db.session.flush()
+    record_sale(order)
+    db.session.commit()
+    return organizer, first, second
+
+
+def test_an_order_spanning_two_events_is_counted_once(app, make_user, make_event):
+    organizer, first, second = _two_event_order(make_user, make_event)
+    start, end = datetime(2025, 3, 1), datetime(2025, 3, 2)
+
+    (overall,) = sales_timeseries("day", start, end)
+    assert (overall["sales"], overall["orders"]) == (2, 1)
+
+    (mine,) = sales_timeseries("day", start, end, organizer_id=organizer.id)
+    assert (mine["sales"], mine["orders"]) == (2, 1)
+
+    (one_event,) = sales_timeseries("day", start, end, event_id=second.id)
+    assert (one_event["sales"], one_event["orders"]) == (1, 1)
+
+
+def test_orders_land_in_the_hour_they_were_placed(app, make_user, make_event):
+    _two_event_order(make_user, make_event)
+    start = datetime(2025, 3, 1, 9)
+
+    points = sales_timeseries("hour", start, start + timedelta(hours=3))
+    assert [p["orders"] for p in points] == [0, 1, 0]
+
+
+def test_order_counts_come_from_the_rollup(app, make_user, make_event):
+    organizer, _, _ = _two_event_order(make_user, make_event)
+    start, end = datetime(2025, 1, 1), datetime(2026, 1, 1)
+
+    with count_queries() as queries:
+        sales_timeseries("month", start, end)
+        sales_timeseries("month", start, end, organizer_id=organizer.id)
+
+    assert not any(re.search(r"(FROM|JOIN) orders\b", sql) for sql in queries.statements)
+
+
+def test_rebuild_matches_the_incremental_order_counts(app, make_user, make_event):
+    organizer, _, _ = _two_event_order(make_user, make_event)
+
+    def counts():
+        return sorted(
+            (row.hour, row.organizer_id, row.slot, row.orders)
+            for row in SalesHourlyOrders.query.all()
+        )
+
+    incremental = counts()
+    rebuild_sales_rollups()
+
+    assert counts() == incremental
+    assert [row[1] for row in incremental] == [0, organizer.id]
@@ -0,0 +1,152 @@
+# utils/audit_partitions.py
+import os
+import gzip
+import re
+from datetime import datetime, date
+from sqlalchemy import text
+from models import db
+
+PARENT_TABLE = "audit_logs"
+DEFAULT_PARTITION = "audit_logs_default"
+PARTITION_PATTERN = re.compile(r"^audit_logs_y(\d{4})m(\d{2})$")
+
+AUDIT_RETAIN_MONTHS = int(os.getenv("AUDIT_RETAIN_MONTHS", 12))
+AUDIT_PARTITIONS_AHEAD = int(os.getenv("AUDIT_PARTITIONS_AHEAD", 3))
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def _table_exists(conn, name):
+    return conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None
+
+
+def _attach_partition(conn, month):
+    """
+    Create the partition for `month`, moving any rows that already landed in
+    the default partition for that range (Postgres refuses to attach a
+    range the default partition still holds).
+
+    The default partition is locked first, so an insert into that range
+    waits until the new partition is attached instead of landing in the
+    default after the move and failing the attach.
+    """
+    name = partition_name(month)
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+
+    conn.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE"))
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(
+        f"WITH moved AS ("
+        f"  DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= :lower AND timestamp < :upper RETURNING *"
+        f") INSERT INTO {name} SELECT * FROM moved"
+    ), {"lower": lower, "upper": upper})
+    conn.execute(text(
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    ))
+
+
+def ensure_partitions(months_ahead=AUDIT_PARTITIONS_AHEAD, now=None):
+    """Create the default partition and monthly partitions up to `months_ahead` out."""
+    current = month_start(now or datetime.utcnow())
+    created = []
+
+    with db.engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+        for n in range(months_ahead + 1):
+            month = add_months(current, n)
+            if not _table_exists(conn, partition_name(month)):
+                _attach_partition(conn, month)
+                created.append(partition_name(month))
+
+    return created
+
+
+def list_partitions():
+    """Return [(month, table_name)] for every monthly partition, oldest first."""
+    with db.engine.connect() as conn:
+        names = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent"
+        ), {"parent": PARENT_TABLE}).scalars().all()
+
+    partitions = []
+    for name in names:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            partitions.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(partitions)
+
+
+def archive_partitions(archive_dir, retain_months=AUDIT_RETAIN_MONTHS, now=None):
+    """
+    Detach monthly partitions older than `retain_months`, export each to
+    <archive_dir>/<partition>.csv.gz and drop it.
+
+    A partition is only dropped after its export has been written and
+    fsynced. If the export fails, the detached table is left in place and
+    the next run picks it up again.
+    """
+    cutoff = add_months(month_start(now or datetime.utcnow()), -retain_months)
+    os.makedirs(archive_dir, exist_ok=True)
+    archived = []
+
+    # Tables detached by an earlier run whose export failed
+    for name in _orphaned_partitions():
+        _archive_table(name, archive_dir)
+        archived.append(name)
+
+    for month, name in list_partitions():
+        if month >= cutoff:
+            break
+
+        with db.engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+
+        _archive_table(name, archive_dir)
+        archived.append(name)
+
+    return archived
+
+
+def _archive_table(name, archive_dir):
+    _export_table(name, os.path.join(archive_dir, f"{name}.csv.gz"))
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {name}"))
+
+
+def _orphaned_partitions():
+    with db.engine.connect() as conn:
+        names = conn.execute(text(
+            "SELECT c.relname FROM pg_class c "
+            "WHERE c.relname LIKE :prefix AND c.relkind = 'r' AND NOT c.relispartition"
+        ), {"prefix": f"{PARENT_TABLE}_y%"}).scalars().all()
+    return [name for name in names if PARTITION_PATTERN.match(name)]
+
+
+def _export_table(name, path):
+    tmp = path + ".tmp"
+    raw = db.engine.raw_connection()
+    try:
+        with gzip.open(tmp, "wb") as out:
+            cursor = raw.cursor()
+            cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER true)", out)
+            cursor.close()
+        with open(tmp, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        raw.close()
@@ -0,0 +1,322 @@
+# utils/audit_spool.py
+import os
+import json
+import zlib
+import fcntl
+import struct
+import threading
+from datetime import datetime
+
+FRAME_HEADER = struct.Struct("<II")  # payload length, crc32
+SEGMENT_SUFFIX = ".seg"
+DEAD_LETTER_FILE = "dead-letter.jsonl"
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class AuditSpool:
+    """
+    Local append-only log that audit records are written to before they
+    reach the database.
+
+    Records are framed as [length][crc32][json] and appended to numbered
+    segment files that roll over at `segment_bytes`. A checkpoint file holds
+    the (segment, offset) of the first record not yet stored in the
+    database. Segments behind the checkpoint are deleted.
+
+    Every process claims its own spool-N directory through an flock on
+    spool-N/lock. A process that crashed releases its lock, and the next
+    process to start adopts the directory and replays whatever its
+    checkpoint had not covered. Directories left unclaimed because fewer
+    processes run than before are picked up with orphans(). A torn record
+    at the end of the last segment is cut off on startup. A corrupt frame
+    in an older segment ends that segment.
+
+    With `fsync` on, every append is fsynced before it returns. With it
+    off, an appended record survives a process crash but not a power loss
+    or kernel crash that comes before the next sync() (or before the OS
+    writes it back on its own).
+    """
+
+    def __init__(self, root, segment_bytes=16 * 1024 * 1024, max_bytes=512 * 1024 * 1024, fsync=True,
+                 directory=None):
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync = fsync
+        if directory is None:
+            self.directory, self._dir_lock = self._claim_directory(root)
+        else:
+            self.directory, self._dir_lock = directory, self._lock_directory(directory)
+        self._lock = threading.Lock()
+        self._unsynced = False
+        self._recover()
+
+    @classmethod
+    def orphans(cls, root, **kwargs):
+        """
+        Claim every spool-N directory under `root` that no process holds and
+        that still has records to replay. Callers drain and close them.
+        """
+        spools = []
+        for name in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+            path = os.path.join(root, name)
+            if not name.startswith("spool-") or not os.path.isdir(path):
+                continue
+            try:
+                spool = cls(root, directory=path, **kwargs)
+            except BlockingIOError:
+                continue
+            if spool.pending:
+                spools.append(spool)
+            else:
+                spool.close()
+        return spools
+
+    @property
+    def backlog_bytes(self):
+        with self._lock:
+            return self._backlog
+
+    @property
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def append(self, record):
+        """Append one record. Returns False when the spool is full."""
+        payload = json.dumps(record, default=_json_default, separators=(",", ":")).encode()
+        frame = FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+        with self._lock:
+            if self._backlog + len(frame) > self.max_bytes:
+                return False
+
+            self._writer.write(frame)
+            self._writer.flush()
+            if self.fsync:
+                os.fsync(self._writer.fileno())
+            else:
+                self._unsynced = True
+
+            self._write_offset += len(frame)
+            self._backlog += len(frame)
+            self._pending += 1
+
+            if self._write_offset >= self.segment_bytes:
+                self._roll()
+        return True
+
+    def sync(self):
+        """
+        fsync records appended since the last sync. The fsync runs on a
+        duplicate descriptor, outside the lock, so appends don't wait on it.
+        """
+        with self._lock:
+            if not self._unsynced:
+                return
+            fd = os.dup(self._writer.fileno())
+            self._unsynced = False
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def read_batch(self, limit):
+        """
+        Read up to `limit` records from the checkpoint on, without consuming
+        them. Returns (records, position); pass position to commit() once
+        the records are safely stored.
+        """
+        seq, offset = self._read_pos
+        records = []
+        consumed = 0
+
+        while len(records) < limit:
+            with self._lock:
+                write_seq, write_offset = self._write_seq, self._write_offset
+
+            path = self._segment_path(seq)
+            end = write_offset if seq == write_seq else (os.path.getsize(path) if os.path.exists(path) else 0)
+
+            if offset >= end:
+                if seq < write_seq:
+                    seq, offset = seq + 1, 0
+                    continue
+                break
+
+            with open(path, "rb") as f:
+                f.seek(offset)
+                while len(records) < limit and offset < end:
+                    frame_len, payload = self._read_frame(f, end - offset)
+                    if payload is None:
+                        # Corrupt tail of a sealed segment: skip to the next one
+                        consumed += end - offset
+                        offset = end
+                        break
+                    records.append(json.loads(payload))
+                    offset += frame_len
+                    consumed += frame_len
+
+        return records, (seq, offset, len(records), consumed)
+
+    def commit(self, position):
+        """Mark everything before `position` as stored and drop dead segments."""
+        seq, offset, count, consumed = position
+        self._write_checkpoint(seq, offset)
+        self._read_pos = (seq, offset)
+
+        with self._lock:
+            self._backlog -= consumed
+            self._pending -= count
+
+        for old in self._segments():
+            if old < seq:
+                os.remove(self._segment_path(old))
+
+    def dead_letter(self, record, error):
+        """Set aside a record the database will never accept, for manual review."""
+        line = json.dumps({"record": record, "error": error}, default=_json_default) + "\n"
+        with self._lock:
+            with open(os.path.join(self.directory, DEAD_LETTER_FILE), "a") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def close(self):
+        with self._lock:
+            self._writer.close()
+        self._dir_lock.close()
+
+    # -- internals --------------------------------------------------------
+
+    @classmethod
+    def _claim_directory(cls, root):
+        os.makedirs(root, exist_ok=True)
+        n = 0
+        while True:
+            path = os.path.join(root, f"spool-{n}")
+            os.makedirs(path, exist_ok=True)
+            try:
+                return path, cls._lock_directory(path)
+            except BlockingIOError:
+                n += 1
+
+    @staticmethod
+    def _lock_directory(path):
+        """flock spool-N/lock without waiting; raises BlockingIOError when it is taken."""
+        lock = open(os.path.join(path, "lock"), "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            raise
+        return lock
+
+    def _segment_path(self, seq):
+        return os.path.join(self.directory, f"{seq:012d}{SEGMENT_SUFFIX}")
+
+    def _segments(self):
+        return sorted(
+            int(name[:-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    @staticmethod
+    def _read_frame(f, available):
+        """Return (frame length, payload) or (0, None) for a torn/corrupt frame."""
+        if available < FRAME_HEADER.size:
+            return 0, None
+        header = f.read(FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            return 0, None
+        length, crc = FRAME_HEADER.unpack(header)
+        if length > available - FRAME_HEADER.size:
+            return 0, None
+        payload = f.read(length)
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return 0, None
+        return FRAME_HEADER.size + length, payload
+
+    def _scan(self, seq, start=0):
+        """Return (end offset of the intact prefix, records after `start`)."""
+        path = self._segment_path(seq)
+        size = os.path.getsize(path)
+        offset = start
+        count = 0
+        with open(path, "rb") as f:
+            f.seek(start)
+            while offset < size:
+                frame_len, payload = self._read_frame(f, size - offset)
+                if payload is None:
+                    break
+                offset += frame_len
+                count += 1
+        return offset, count
+
+    def _recover(self):
+        segments = self._segments()
+        checkpoint = self._read_checkpoint()
+
+        if checkpoint and checkpoint[0] in segments:
+            self._read_pos = checkpoint
+        elif segments:
+            self._read_pos = (segments[0], 0)
+        else:
+            self._read_pos = (0, 0)
+
+        if segments:
+            self._write_seq = segments[-1]
+            valid, _ = self._scan(self._write_seq)
+            with open(self._segment_path(self._write_seq), "r+b") as f:
+                f.truncate(valid)
+            self._write_offset = valid
+        else:
+            self._write_seq, self._write_offset = self._read_pos[0], 0
+
+        self._writer = open(self._segment_path(self._write_seq), "ab")
+
+        # Recount what is still waiting to be replayed
+        self._backlog = 0
+        self._pending = 0
+        read_seq, read_offset = self._read_pos
+        for seq in self._segments():
+            if seq < read_seq:
+                continue
+            start = read_offset if seq == read_seq else 0
+            end, count = self._scan(seq, start)
+            self._backlog += end - start
+            self._pending += count
+
+    def _roll(self):
+        # Caller holds self._lock
+        if self._unsynced:
+            os.fsync(self._writer.fileno())
+            self._unsynced = False
+        self._writer.close()
+        self._write_seq += 1
+        self._write_offset = 0
+        self._writer = open(self._segment_path(self._write_seq), "ab")
+
+    def _checkpoint_path(self):
+        return os.path.join(self.directory, "checkpoint")
+
+    def _read_checkpoint(self):
+        try:
+            with open(self._checkpoint_path()) as f:
+                seq, offset = f.read().split()
+                return int(seq), int(offset)
+        except (OSError, ValueError):
+            return None
+
+    def _write_checkpoint(self, seq, offset):
+        tmp = self._checkpoint_path() + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(f"{seq} {offset}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._checkpoint_path())
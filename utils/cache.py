@@ -0,0 +1,247 @@
+# utils/cache.py
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+CACHE_URL = os.getenv("CACHE_URL")  # e.g. redis://localhost:6379/0; in-process when unset
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+CACHE_TTL_SCALE = float(os.getenv("CACHE_TTL_SCALE", 1.0))  # 0 disables caching
+SINGLE_FLIGHT_TIMEOUT = 30
+
+_MISSING = object()
+
+# Models whose inserts, updates and deletes invalidate a cache tag
+MODEL_TAGS = {
+    "User": ("users",),
+    "Event": ("events",),
+    "Ticket": ("events", "sales"),
+}
+
+
+class MemoryBackend:
+    """Per-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def tag_versions(self, tags):
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tag):
+        with self._lock:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Shared backend for running several app processes. Values are stored as
+    JSON with SETEX. Tag versions are plain counters, so an invalidation
+    from any process is seen by all of them.
+    """
+
+    def __init__(self, url, prefix="cache:"):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return _MISSING if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.setex(self.prefix + key, max(1, int(ttl)), json.dumps(value))
+
+    def tag_versions(self, tags):
+        values = self.client.mget([self.prefix + "tag:" + tag for tag in tags])
+        return [int(v) if v is not None else 0 for v in values]
+
+    def bump(self, tag):
+        self.client.incr(self.prefix + "tag:" + tag)
+
+    def size(self):
+        return None
+
+
+class ResultCache:
+    """
+    Caches computed endpoint payloads by key with a per-call TTL.
+
+    Each entry is tagged (e.g. "sales", "events"). Invalidating a tag bumps
+    its version counter, and the current versions are part of every cache
+    key, so older entries are never read again and simply age out. Misses
+    are single-flight per process: while one request computes a key, others
+    asking for it wait for that result instead of running the same queries.
+
+    Only put the data under the cache. Auth checks and log_action stay in
+    the endpoint so they run on every request.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0, "errors": 0}
+
+    def init_app(self, app):
+        url = app.config.get("CACHE_URL", CACHE_URL)
+        if url:
+            try:
+                self.backend = RedisBackend(url)
+            except ImportError:
+                logger.warning("CACHE_URL is set but redis is not installed, using the in-process cache")
+        _register_invalidation_hooks(self)
+
+    def get_or_compute(self, key, compute, ttl, tags=()):
+        ttl = ttl * CACHE_TTL_SCALE
+        if ttl <= 0:
+            return compute()
+
+        try:
+            versions = self.backend.tag_versions(tags) if tags else []
+            full_key = key + "".join(f"|{t}:{v}" for t, v in zip(tags, versions))
+            value = self.backend.get(full_key)
+        except Exception:
+            logger.exception("Cache backend unavailable, computing %s directly", key)
+            self._count("errors")
+            return compute()
+
+        if value is not _MISSING:
+            self._count("hits")
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(full_key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[full_key] = _Flight()
+
+        if not leader:
+            self._count("coalesced")
+            return flight.wait()
+
+        self._count("misses")
+        try:
+            value = compute()
+            flight.resolve(value)
+        except Exception as e:
+            flight.fail(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(full_key, None)
+
+        try:
+            self.backend.set(full_key, value, ttl)
+        except Exception:
+            logger.exception("Could not store %s in the cache", key)
+            self._count("errors")
+        return value
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            try:
+                self.backend.bump(tag)
+                self._count("invalidations")
+            except Exception:
+                logger.exception("Could not invalidate cache tag %s", tag)
+                self._count("errors")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["coalesced"]) / lookups, 4) if lookups else None
+        stats["backend"] = type(self.backend).__name__
+        stats["entries"] = self.backend.size()
+        return stats
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+
+class _Flight:
+    def __init__(self):
+        self._done = threading.Event()
+        self._value = None
+        self._error = None
+
+    def resolve(self, value):
+        self._value = value
+        self._done.set()
+
+    def fail(self, error):
+        self._error = error
+        self._done.set()
+
+    def wait(self):
+        if not self._done.wait(SINGLE_FLIGHT_TIMEOUT):
+            raise TimeoutError("Timed out waiting for a cached computation")
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+result_cache = ResultCache()
+
+
+def invalidate_on_commit(session, *tags):
+    """Invalidate `tags` once the session's current transaction commits."""
+    session.info.setdefault("cache_tags", set()).update(tags)
+
+
+def _register_invalidation_hooks(cache):
+    if getattr(cache, "_hooks_registered", False):
+        return
+    cache._hooks_registered = True
+
+    @event.listens_for(Session, "after_flush")
+    def collect_tags(session, flush_context):
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            tags = MODEL_TAGS.get(type(obj).__name__)
+            if tags:
+                invalidate_on_commit(session, *tags)
+
+    @event.listens_for(Session, "after_commit")
+    def fire_tags(session):
+        tags = session.info.pop("cache_tags", None)
+        if tags:
+            cache.invalidate(*sorted(tags))
+
+    @event.listens_for(Session, "after_rollback")
+    def drop_tags(session):
+        session.info.pop("cache_tags", None)
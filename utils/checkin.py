@@ -0,0 +1,286 @@
+# utils/checkin.py
+from sqlalchemy import select, update, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from datetime import datetime, timezone
+from models import db, EventPass, OrderItem, Ticket, Event
+from utils.manifest import bump_event_versions
+from utils.ticket_filter import ticket_filters
+from utils.checkin_counters import adjust_counters, count_flips
+
+MAX_SCAN_BATCH = 1000
+
+# Per-code results
+CHECKED_IN = "checked_in"
+CHECKED_OUT = "checked_out"
+ALREADY_CHECKED_IN = "already_checked_in"
+ALREADY_CHECKED_OUT = "already_checked_out"
+NOT_FOUND = "not_found"
+WRONG_EVENT = "wrong_event"
+FORBIDDEN = "forbidden"
+
+# Offline device uploads (apply_device_changes)
+FIRST_SCAN_WINS = "first_scan_wins"
+LAST_WRITER_WINS = "last_writer_wins"
+SYNC_POLICIES = (FIRST_SCAN_WINS, LAST_WRITER_WINS)
+MAX_SYNC_CHANGES = 5000
+APPLIED = "applied"
+UNCHANGED = "unchanged"
+CONFLICT = "conflict"
+
+
+def _matches(key_column, keys):
+    # One array parameter instead of an IN list, so every batch size shares a plan
+    return key_column == any_(bindparam("keys", list(keys), type_=ARRAY(key_column.type)))
+
+
+def normalize_code(code):
+    return str(code).strip().upper()
+
+
+def load_passes(key_column, keys):
+    """
+    Fetch the passes whose `key_column` is in `keys`, with the ids needed
+    for ownership checks, in one joined query: {key: row}.
+    """
+    rows = db.session.execute(
+        select(
+            EventPass.id, EventPass.ticket_code, EventPass.att_status,
+            Ticket.id.label("ticket_id"), Ticket.type.label("ticket_type"),
+            Event.id.label("event_id"), Event.organizer_id,
+        )
+        .select_from(EventPass)
+        .join(OrderItem, OrderItem.id == EventPass.order_item_id)
+        .join(Ticket, Ticket.id == OrderItem.ticket_id)
+        .join(Event, Event.id == Ticket.event_id)
+        .where(_matches(key_column, keys))
+    ).all()
+    return {getattr(row, key_column.key): row for row in rows}
+
+
+def apply_scans(organizer_id, codes, event_id=None, checked_in=True):
+    """
+    Check passes in (or out) by ticket code for one organizer.
+
+    With an `event_id`, codes that the event's ticket filter rules out are
+    reported as not_found without touching the database. Ownership of the
+    rest is resolved for the whole batch in one joined query. The
+    accepted codes of each event are then flipped by a single
+    UPDATE ... WHERE ticket_code = ANY(:codes) AND att_status = <old state>,
+    stamped with a new event version for manifest sync, and the
+    event_checkin_counters rows move by the number of passes flipped.
+    Only rows that really changed come back from RETURNING, so two gates
+    scanning the same pass at once get one success and one "already".
+    The caller commits.
+
+    Returns (results, changed): one {"code", "status", "pass_id"} dict per
+    distinct code in scan order, plus the changed pass rows.
+    """
+    codes = list(dict.fromkeys(normalize_code(c) for c in codes if c))
+
+    results = {}
+    lookup = codes
+    if event_id is not None:
+        # Codes the event's filter has never seen are rejected without a query
+        lookup = [code for code in codes if ticket_filters.might_contain(event_id, code)]
+        for code in set(codes) - set(lookup):
+            results[code] = {"code": code, "status": NOT_FOUND, "pass_id": None}
+    passes = load_passes(EventPass.ticket_code, lookup) if lookup else {}
+
+    accepted = []
+    for code in lookup:
+        row = passes.get(code)
+        if row is None:
+            results[code] = {"code": code, "status": NOT_FOUND, "pass_id": None}
+        elif row.organizer_id != organizer_id:
+            results[code] = {"code": code, "status": FORBIDDEN, "pass_id": None}
+        elif event_id is not None and row.event_id != event_id:
+            results[code] = {"code": code, "status": WRONG_EVENT, "pass_id": None}
+        else:
+            accepted.append(code)
+
+    # Pass rows are locked before the event's version row, and only the
+    # ones that will change, so repeat scans never touch the version row
+    by_event = {}
+    for code in _lock_for_flip(EventPass.ticket_code, accepted, checked_in) if accepted else []:
+        by_event.setdefault(passes[code].event_id, []).append(code)
+
+    changed = set()
+    versions = bump_event_versions(by_event)
+    for event, event_codes in by_event.items():
+        changed.update(_flip(EventPass.ticket_code, event_codes, checked_in, versions[event]))
+
+    changed_rows = [passes[code] for code in accepted if code in changed]
+    adjust_counters(count_flips(changed_rows, checked_in))
+
+    done, already = (CHECKED_IN, ALREADY_CHECKED_IN) if checked_in else (CHECKED_OUT, ALREADY_CHECKED_OUT)
+    for code in accepted:
+        results[code] = {
+            "code": code,
+            "status": done if code in changed else already,
+            "pass_id": passes[code].id,
+        }
+
+    return [results[code] for code in codes], changed_rows
+
+
+def _lock_for_flip(key_column, keys, checked_in):
+    """Lock, in id order, the passes among `keys` not yet in `checked_in` state; returns their keys."""
+    return db.session.execute(
+        select(key_column)
+        .where(_matches(key_column, keys), EventPass.att_status.isnot(checked_in))
+        .order_by(EventPass.id)
+        .with_for_update()
+    ).scalars().all()
+
+
+def _flip(key_column, keys, checked_in, version):
+    return db.session.execute(
+        update(EventPass)
+        .where(
+            _matches(key_column, keys),
+            EventPass.att_status.isnot(checked_in),
+        )
+        .values(att_status=checked_in, sync_version=version, status_changed_at=datetime.utcnow())
+        .returning(key_column)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+
+
+def set_pass_state(event_pass, checked_in):
+    """Flip one pass loaded by load_passes(). Returns True if its state changed."""
+    if not _lock_for_flip(EventPass.id, [event_pass.id], checked_in):
+        return False
+    version = bump_event_versions([event_pass.event_id])[event_pass.event_id]
+    _flip(EventPass.id, [event_pass.id], checked_in, version)
+    adjust_counters(count_flips([event_pass], checked_in))
+    return True
+
+
+def summarize(results):
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return summary
+
+
+def parse_checked_in(value):
+    # bool("false") is True: only real booleans are accepted
+    if not isinstance(value, bool):
+        raise TypeError("checked_in must be true or false")
+    return value
+
+
+def parse_scan_time(value):
+    """Device timestamp as naive UTC, like status_changed_at."""
+    scanned_at = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if scanned_at.tzinfo is not None:
+        scanned_at = scanned_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return scanned_at
+
+
+def apply_device_changes(event_id, changes, policy=FIRST_SCAN_WINS):
+    """
+    Merge check-ins recorded offline by a door device.
+
+    `changes` are {"code", "checked_in", "scanned_at"} dicts in any order.
+    The affected passes are locked, each change is resolved against the
+    current server state, and the accepted ones are written in one batch
+    under a single new event version, together with the check-in counters. The caller commits. Raises ValueError for a
+    malformed scanned_at and TypeError for a checked_in that is not a
+    JSON boolean.
+
+    - last_writer_wins: a change applies if it was scanned after the pass
+      last changed; repeating the current state is "unchanged".
+    - first_scan_wins: the earliest check-in scan is the one kept. A later
+      check-in of a pass that is already in is a "conflict" (the ticket
+      was used), while an earlier one takes over the check-in time.
+      Check-outs follow last_writer_wins.
+
+    Returns one {"code", "status", "checked_in", "status_changed_at"} result
+    per change, giving the resulting server state.
+    """
+    parsed = [
+        (normalize_code(change["code"]), parse_checked_in(change.get("checked_in", True)),
+         parse_scan_time(change["scanned_at"]))
+        for change in changes
+    ]
+    # Older scans first, so later ones in the same upload win under LWW
+    ordered = sorted(range(len(parsed)), key=lambda i: parsed[i][2])
+
+    codes = list({code for code, _, _ in parsed})
+    passes = {
+        row.ticket_code: row
+        for row in db.session.execute(
+            select(
+                EventPass.id, EventPass.ticket_code, EventPass.att_status, EventPass.status_changed_at,
+                Ticket.id.label("ticket_id"),
+            )
+            .join(OrderItem, OrderItem.id == EventPass.order_item_id)
+            .join(Ticket, Ticket.id == OrderItem.ticket_id)
+            .where(Ticket.event_id == event_id, _matches(EventPass.ticket_code, codes))
+            .order_by(EventPass.id)
+            .with_for_update(of=EventPass)
+        )
+    }
+    state = {code: [bool(row.att_status), row.status_changed_at] for code, row in passes.items()}
+
+    results = [None] * len(parsed)
+    writes = {}
+    for i in ordered:
+        code, checked_in, scanned_at = parsed[i]
+        if code not in state:
+            results[i] = {"code": code, "status": NOT_FOUND, "checked_in": None, "status_changed_at": None}
+            continue
+
+        current, changed_at = state[code]
+        if current and checked_in and policy == FIRST_SCAN_WINS:
+            if changed_at and scanned_at < changed_at:
+                # This device saw the attendee first: its scan becomes the check-in
+                status = APPLIED
+                state[code] = [True, scanned_at]
+                writes[code] = state[code]
+            else:
+                # The pass was already used
+                status = CONFLICT
+        elif current == checked_in:
+            status = UNCHANGED
+        elif changed_at and scanned_at <= changed_at:
+            # Something newer already happened to this pass
+            status = CONFLICT
+        else:
+            status = APPLIED
+            state[code] = [checked_in, scanned_at]
+            writes[code] = state[code]
+
+        current, changed_at = state[code]
+        results[i] = {
+            "code": code,
+            "status": status,
+            "checked_in": current,
+            "status_changed_at": changed_at.isoformat(timespec="seconds") if changed_at else None,
+        }
+
+    if writes:
+        # After the pass rows, like every other writer, and only when something changes
+        version = bump_event_versions([event_id])[event_id]
+        db.session.execute(
+            EventPass.__table__.update()
+            .where(EventPass.__table__.c.id == db.bindparam("pass_id"))
+            .values(
+                att_status=db.bindparam("state"),
+                status_changed_at=db.bindparam("changed_at"),
+                sync_version=version,
+            ),
+            [
+                {"pass_id": passes[code].id, "state": checked_in, "changed_at": changed_at}
+                for code, (checked_in, changed_at) in writes.items()
+            ]
+        )
+
+    deltas = {}
+    for code, (checked_in, _) in writes.items():
+        key = (event_id, passes[code].ticket_id)
+        deltas[key] = deltas.get(key, 0) + int(checked_in) - int(bool(passes[code].att_status))
+    adjust_counters(deltas)
+
+    return results
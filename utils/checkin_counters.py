@@ -0,0 +1,279 @@
+# utils/checkin_counters.py
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from models import db, EventCheckinCounter, EventPass, EventPassVersion, OrderItem, Ticket
+
+logger = logging.getLogger(__name__)
+
+COUNTER_POLL_SECONDS = float(os.getenv("COUNTER_POLL_SECONDS", 1.0))
+KEEPALIVE_SECONDS = 15
+WATCHER_QUEUE_SIZE = 100
+# How long a stream token can be used to open the stream
+STREAM_TOKEN_SECONDS = 60
+
+
+def adjust_counters(deltas):
+    """
+    Add {(event_id, ticket_id): delta} to event_checkin_counters.
+
+    Runs in the caller's transaction, right after the passes were flipped,
+    so counters and passes commit together. Each row is updated in place
+    (checked_in = checked_in + delta), in ticket order so concurrent
+    writers lock rows in the same order.
+    """
+    rows = [
+        {"event_id": event_id, "ticket_id": ticket_id, "checked_in": delta}
+        for (event_id, ticket_id), delta in sorted(deltas.items(), key=lambda item: item[0][1])
+        if delta
+    ]
+    if not rows:
+        return
+
+    stmt = insert(EventCheckinCounter).values(rows)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=["ticket_id"],
+        set_={"checked_in": EventCheckinCounter.checked_in + stmt.excluded.checked_in}
+    ))
+
+
+def count_flips(rows, checked_in):
+    """Counter deltas for pass rows (with event_id and ticket_id) that were flipped to `checked_in`."""
+    deltas = {}
+    for row in rows:
+        key = (row.event_id, row.ticket_id)
+        deltas[key] = deltas.get(key, 0) + (1 if checked_in else -1)
+    return deltas
+
+
+def rebuild_checkin_counters():
+    """
+    Recompute event_checkin_counters from event_passes, under a table lock
+    like rebuild_sales_rollups. Returns the number of rows written.
+    """
+    counts = (
+        select(Ticket.id, Ticket.event_id, func.count(EventPass.id))
+        .select_from(EventPass)
+        .join(OrderItem, OrderItem.id == EventPass.order_item_id)
+        .join(Ticket, Ticket.id == OrderItem.ticket_id)
+        .where(EventPass.att_status.is_(True))
+        .group_by(Ticket.id, Ticket.event_id)
+    )
+
+    db.session.execute(text("LOCK TABLE event_checkin_counters IN EXCLUSIVE MODE"))
+    db.session.execute(EventCheckinCounter.__table__.delete())
+    written = db.session.execute(
+        insert(EventCheckinCounter).from_select(["ticket_id", "event_id", "checked_in"], counts)
+    ).rowcount
+    db.session.commit()
+    return written
+
+
+def read_counters(event_ids):
+    """{event_id: {ticket_id: (ticket_type, checked_in)}} for every ticket of the events, in one query."""
+    rows = db.session.execute(
+        select(Ticket.event_id, Ticket.id, Ticket.type, func.coalesce(EventCheckinCounter.checked_in, 0))
+        .select_from(Ticket)
+        .outerjoin(EventCheckinCounter, EventCheckinCounter.ticket_id == Ticket.id)
+        .where(Ticket.event_id.in_(list(event_ids)))
+        .order_by(Ticket.id)
+    ).all()
+
+    counters = {event_id: {} for event_id in event_ids}
+    for event_id, ticket_id, ticket_type, checked_in in rows:
+        counters[event_id][ticket_id] = (ticket_type, checked_in)
+    return counters
+
+
+def _message(kind, event_id, counts, previous=None):
+    """One SSE frame. "snapshot" lists every ticket type, "delta" only the ones that moved."""
+    previous = previous or {}
+    tickets = [
+        {
+            "ticket_id": ticket_id,
+            "ticket_type": ticket_type,
+            "checked_in": checked_in,
+            "delta": checked_in - previous.get(ticket_id, (None, 0))[1] if kind == "delta" else 0,
+        }
+        for ticket_id, (ticket_type, checked_in) in counts.items()
+        if kind == "snapshot" or previous.get(ticket_id, (None, 0))[1] != checked_in
+    ]
+    total = sum(checked_in for _, checked_in in counts.values())
+    data = {
+        "event_id": event_id,
+        "checked_in": total,
+        "delta": total - sum(checked_in for _, checked_in in previous.values()) if kind == "delta" else 0,
+        "ticket_types": tickets,
+    }
+    return f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+
+
+class CheckinCounterHub:
+    """
+    Fans check-in counter changes out to every connected dashboard.
+
+    A single poller thread per process watches the events that have at
+    least one subscriber. Each tick it reads the event_pass_versions rows
+    of all of them in one query. Every check-in write bumps that version,
+    so only events whose version moved have their counters re-read, again
+    in one query for all of them. The resulting frame is formatted once and
+    put on each subscriber's queue. The cost per tick depends on the number
+    of watched events, not on the number of watchers, and the streams
+    themselves never touch the database.
+    """
+
+    def __init__(self, interval=COUNTER_POLL_SECONDS):
+        self.interval = interval
+        self._app = None
+        self._watchers = {}  # event_id -> set of queues
+        self._state = {}     # event_id -> (version, counts)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self._app = app
+
+    def subscribe(self, event_id):
+        """Queue of SSE frames for one dashboard; starts with a snapshot once one is known."""
+        watcher = queue.Queue(maxsize=WATCHER_QUEUE_SIZE)
+        with self._lock:
+            self._watchers.setdefault(event_id, set()).add(watcher)
+            state = self._state.get(event_id)
+            if state:
+                watcher.put_nowait(_message("snapshot", event_id, state[1]))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._poll_forever, name="checkin-counter-hub", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return watcher
+
+    def unsubscribe(self, event_id, watcher):
+        with self._lock:
+            watchers = self._watchers.get(event_id)
+            if watchers is None:
+                return
+            watchers.discard(watcher)
+            if not watchers:
+                del self._watchers[event_id]
+                self._state.pop(event_id, None)
+
+    def watcher_count(self):
+        with self._lock:
+            return sum(len(w) for w in self._watchers.values())
+
+    def poll_once(self):
+        with self._lock:
+            event_ids = list(self._watchers)
+        if not event_ids:
+            return
+
+        versions = dict(db.session.execute(
+            select(EventPassVersion.event_id, EventPassVersion.version)
+            .where(EventPassVersion.event_id.in_(event_ids))
+        ).all())
+        changed = [
+            event_id for event_id in event_ids
+            if event_id not in self._state or self._state[event_id][0] != versions.get(event_id, 0)
+        ]
+        if not changed:
+            return
+
+        counters = read_counters(changed)
+        for event_id in changed:
+            previous = self._state.get(event_id)
+            counts = counters[event_id]
+            if previous is None:
+                message = _message("snapshot", event_id, counts)
+            elif previous[1] == counts:
+                # A mint or a no-op scan moved the version, not the counters
+                with self._lock:
+                    if event_id in self._watchers:
+                        self._state[event_id] = (versions.get(event_id, 0), counts)
+                continue
+            else:
+                message = _message("delta", event_id, counts, previous[1])
+
+            with self._lock:
+                if event_id not in self._watchers:
+                    continue
+                self._state[event_id] = (versions.get(event_id, 0), counts)
+                for watcher in self._watchers[event_id]:
+                    self._deliver(watcher, message, event_id, counts)
+
+    def _deliver(self, watcher, message, event_id, counts):
+        try:
+            watcher.put_nowait(message)
+        except queue.Full:
+            # A dashboard that stopped reading gets a fresh snapshot instead of a backlog
+            while not watcher.empty():
+                try:
+                    watcher.get_nowait()
+                except queue.Empty:
+                    break
+            watcher.put_nowait(_message("snapshot", event_id, counts))
+
+    def _poll_forever(self):
+        while True:
+            self._wake.wait()
+            with self._app.app_context():
+                try:
+                    self.poll_once()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Check-in counter poll failed")
+                finally:
+                    db.session.remove()
+
+            with self._lock:
+                if not self._watchers:
+                    self._wake.clear()
+            time.sleep(self.interval)
+
+
+def stream_frames(hub, event_id, watcher, keepalive=KEEPALIVE_SECONDS):
+    """SSE body for one subscriber; unsubscribes when the client goes away."""
+    try:
+        yield f"retry: {int(hub.interval * 1000) * 3}\n\n"
+        while True:
+            try:
+                yield watcher.get(timeout=keepalive)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+    finally:
+        hub.unsubscribe(event_id, watcher)
+
+
+def issue_stream_token(event_id, user_id):
+    """
+    Token that lets `user_id` open the check-in stream of `event_id` for
+    STREAM_TOKEN_SECONDS. EventSource can only send it in the URL, where
+    proxies and logs may keep it, so it is signed apart from the JWTs and
+    opens nothing else.
+    """
+    return _stream_token_serializer().dumps({"event_id": event_id, "user_id": user_id})
+
+
+def verify_stream_token(token, event_id):
+    """User id the token was issued to, or None if it is forged, expired or for another event."""
+    try:
+        claims = _stream_token_serializer().loads(token, max_age=STREAM_TOKEN_SECONDS)
+    except BadSignature:
+        return None
+    if claims.get("event_id") != event_id:
+        return None
+    return claims.get("user_id")
+
+
+def _stream_token_serializer():
+    return URLSafeTimedSerializer(current_app.config["JWT_SECRET_KEY"], salt="checkin-stream")
+
+
+checkin_counter_hub = CheckinCounterHub()
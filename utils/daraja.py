@@ -0,0 +1,175 @@
+# utils/daraja.py
+import os
+import time
+import base64
+import random
+import bisect
+import threading
+from datetime import datetime
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+DARAJA_POOL_SIZE = int(os.getenv("MPESA_POOL_SIZE", 20))
+DARAJA_CONNECT_TIMEOUT = float(os.getenv("MPESA_CONNECT_TIMEOUT", 3.05))
+DARAJA_READ_TIMEOUT = float(os.getenv("MPESA_READ_TIMEOUT", 15))
+DARAJA_MAX_RETRIES = int(os.getenv("MPESA_MAX_RETRIES", 3))
+DARAJA_BACKOFF_SECONDS = float(os.getenv("MPESA_BACKOFF_SECONDS", 0.25))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LatencyHistogram:
+    """Cumulative request latency in fixed millisecond buckets."""
+
+    BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self._total_ms = 0.0
+        self._errors = 0
+
+    def observe(self, elapsed_ms, error=False):
+        index = bisect.bisect_left(self.BUCKETS_MS, elapsed_ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._total_ms += elapsed_ms
+            if error:
+                self._errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            total_ms = self._total_ms
+            errors = self._errors
+
+        count = sum(counts)
+        buckets = {f"le_{bound}": n for bound, n in zip(self.BUCKETS_MS, counts)}
+        buckets["le_inf"] = counts[-1]
+
+        return {
+            "count": count,
+            "errors": errors,
+            "avg_ms": round(total_ms / count, 2) if count else 0,
+            "buckets": buckets,
+        }
+
+
+class DarajaTransport:
+    """
+    Shared HTTP transport for every Daraja call.
+
+    Requests go through one pooled keep-alive Session. The pool size is
+    bounded and blocks when full, so TLS handshakes are paid once per
+    connection. Every call gets connect/read timeouts. Only calls marked
+    `idempotent` are retried, with jittered exponential backoff. An STK
+    push is not idempotent because a retry could prompt the customer twice.
+    """
+
+    def __init__(self, base_url, pool_size=DARAJA_POOL_SIZE,
+                 timeout=(DARAJA_CONNECT_TIMEOUT, DARAJA_READ_TIMEOUT),
+                 max_retries=DARAJA_MAX_RETRIES, backoff=DARAJA_BACKOFF_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._histograms = {}
+        self._histograms_lock = threading.Lock()
+
+    def get(self, path, endpoint, **kwargs):
+        return self.request("GET", path, endpoint, **kwargs)
+
+    def post(self, path, endpoint, **kwargs):
+        return self.request("POST", path, endpoint, **kwargs)
+
+    def request(self, method, path, endpoint, idempotent=False, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        attempts = 1 + (self.max_retries if idempotent else 0)
+        histogram = self._histogram(endpoint)
+
+        for attempt in range(1, attempts + 1):
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                histogram.observe((time.perf_counter() - started) * 1000, error=True)
+                if attempt == attempts:
+                    raise
+            else:
+                failed = response.status_code in RETRY_STATUSES
+                histogram.observe((time.perf_counter() - started) * 1000, error=failed)
+                if not failed or attempt == attempts:
+                    return response
+
+            # Full jitter keeps retries from a burst of workers from lining up
+            time.sleep(random.uniform(0, self.backoff * (2 ** (attempt - 1))))
+
+    def latency_snapshot(self):
+        with self._histograms_lock:
+            histograms = dict(self._histograms)
+        return {endpoint: h.snapshot() for endpoint, h in histograms.items()}
+
+    def _histogram(self, endpoint):
+        histogram = self._histograms.get(endpoint)
+        if histogram is None:
+            with self._histograms_lock:
+                histogram = self._histograms.setdefault(endpoint, LatencyHistogram())
+        return histogram
+
+
+def request_not_sent(exc):
+    """
+    True when `exc` means the request never left this process: the TCP
+    connection could not be opened or timed out while connecting. Anything
+    later (a read timeout, a reset mid-response) may come after Daraja
+    accepted the request.
+    """
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.ConnectionError) and exc.args:
+        return isinstance(getattr(exc.args[0], "reason", None), NewConnectionError)
+    return False
+
+
+def stk_timestamp(now=None):
+    """The Timestamp field of an STK push or query: local time as YYYYMMDDHHMMSS."""
+    return (now or datetime.now()).strftime("%Y%m%d%H%M%S")
+
+
+def stk_password(shortcode, passkey, timestamp):
+    """The Password field that goes with `timestamp`: base64(shortcode + passkey + timestamp)."""
+    return base64.b64encode(f"{shortcode}{passkey}{timestamp}".encode()).decode()
+
+
+def parse_response(response):
+    """
+    Return the JSON object in a Daraja reply. Raises ValueError for anything
+    else, such as the HTML page a gateway sends in place of a 502.
+    """
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    if not isinstance(body, dict):
+        raise ValueError(f"Daraja replied {response.status_code} without a JSON object: {response.text[:200]!r}")
+    return body
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(base_url):
+    """Return the process-wide transport for `base_url`."""
+    with _transports_lock:
+        transport = _transports.get(base_url)
+        if transport is None:
+            transport = _transports[base_url] = DarajaTransport(base_url)
+        return transport
@@ -0,0 +1,99 @@
+# utils/holds.py
+import os
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from models import db, Order, OrderItem
+from utils.inventory import release_tickets
+
+logger = logging.getLogger(__name__)
+
+HOLD_TTL_MINUTES = int(os.getenv("ORDER_HOLD_TTL_MINUTES", 15))
+SWEEP_INTERVAL_SECONDS = int(os.getenv("HOLD_SWEEP_INTERVAL_SECONDS", 60))
+SWEEP_BATCH_SIZE = int(os.getenv("HOLD_SWEEP_BATCH_SIZE", 500))
+
+
+def hold_cutoff(now=None):
+    """Pending orders created before this moment have outlived their hold."""
+    return (now or datetime.now()) - timedelta(minutes=HOLD_TTL_MINUTES)
+
+
+def release_expired_holds(batch_size=SWEEP_BATCH_SIZE, now=None):
+    """
+    Expire abandoned pending orders and hand their seats back.
+
+    Works in batches of `batch_size` orders, each in its own transaction.
+    Candidates come from the (status, created_at) index and are locked with
+    SKIP LOCKED, so several sweepers (one per worker) and an in-flight
+    payment callback never fight over the same order.
+
+    Returns the number of orders expired.
+    """
+    cutoff = hold_cutoff(now)
+    expired = 0
+
+    while True:
+        order_ids = [
+            order_id for (order_id,) in (
+                db.session.query(Order.id)
+                .filter(Order.status == "pending", Order.created_at < cutoff)
+                .order_by(Order.created_at.asc())
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+        ]
+
+        if not order_ids:
+            db.session.rollback()
+            break
+
+        quantities = dict(
+            db.session.query(OrderItem.ticket_id, func.sum(OrderItem.quantity))
+            .filter(OrderItem.order_id.in_(order_ids))
+            .group_by(OrderItem.ticket_id)
+            .all()
+        )
+        release_tickets(quantities)
+
+        (
+            db.session.query(Order)
+            .filter(Order.id.in_(order_ids))
+            .update({Order.status: "expired"}, synchronize_session=False)
+        )
+        db.session.commit()
+
+        expired += len(order_ids)
+        if len(order_ids) < batch_size:
+            break
+
+    return expired
+
+
+def _sweep_forever(app, interval):
+    while True:
+        with app.app_context():
+            try:
+                count = release_expired_holds()
+                if count:
+                    logger.info("Released %s expired ticket holds", count)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Hold sweep failed")
+            finally:
+                db.session.remove()
+
+        time.sleep(interval)
+
+
+def start_hold_sweeper(app, interval=SWEEP_INTERVAL_SECONDS):
+    thread = threading.Thread(
+        target=_sweep_forever,
+        args=(app, interval),
+        name="hold-sweeper",
+        daemon=True
+    )
+    thread.start()
+    return thread
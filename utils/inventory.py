@@ -0,0 +1,58 @@
+# utils/inventory.py
+from sqlalchemy import func
+from models import db, Ticket
+
+
+class InsufficientInventory(Exception):
+    def __init__(self, ticket_id):
+        super().__init__(f"Not enough tickets left for ticket ID {ticket_id}")
+        self.ticket_id = ticket_id
+
+
+def reserve_tickets(quantities):
+    """
+    Reserve seats by bumping Ticket.sold for each {ticket_id: quantity}.
+
+    Every ticket row is claimed with one conditional UPDATE
+    (sold + n <= quantity), so there is no read-then-write window and
+    concurrent buyers only wait on the row lock until the caller commits.
+    Rows are touched in id order so two multi-ticket carts can't deadlock.
+
+    Raises InsufficientInventory for the first ticket that can't cover the
+    quantity; the caller must roll back the session.
+    """
+    for ticket_id in sorted(quantities):
+        quantity = quantities[ticket_id]
+        sold = func.coalesce(Ticket.sold, 0)
+
+        updated = (
+            db.session.query(Ticket)
+            .filter(Ticket.id == ticket_id, sold + quantity <= Ticket.quantity)
+            .update({Ticket.sold: sold + quantity}, synchronize_session=False)
+        )
+
+        if updated != 1:
+            raise InsufficientInventory(ticket_id)
+
+
+def release_tickets(quantities):
+    """Give reserved seats back, e.g. when a payment fails."""
+    for ticket_id in sorted(quantities):
+        sold = func.coalesce(Ticket.sold, 0)
+
+        (
+            db.session.query(Ticket)
+            .filter(Ticket.id == ticket_id)
+            .update(
+                {Ticket.sold: func.greatest(sold - quantities[ticket_id], 0)},
+                synchronize_session=False
+            )
+        )
+
+
+def order_quantities(order):
+    """Collapse an order's items into {ticket_id: quantity}."""
+    quantities = {}
+    for item in order.order_items:
+        quantities[item.ticket_id] = quantities.get(item.ticket_id, 0) + item.quantity
+    return quantities
@@ -1,22 +1,246 @@
 # utils/logger.py
+import os
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime
 from functools import wraps
 from flask import request, g
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, OperationalError
 from models import AuditLog, db
+from utils.audit_spool import AuditSpool
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
 import traceback
 
+logger = logging.getLogger(__name__)
+
+AUDIT_SPOOL_MAX_BYTES = int(os.getenv("AUDIT_SPOOL_MAX_BYTES", 512 * 1024 * 1024))
+# "interval": the replayer fsyncs the spool every AUDIT_FLUSH_SECONDS;
+# "always": every append is fsynced; "never": left to the OS
+# ("true" and "false" are read as "always" and "never")
+AUDIT_SPOOL_FSYNC = os.getenv("AUDIT_SPOOL_FSYNC", "interval").lower()
+AUDIT_SPOOL_FSYNC = {"true": "always", "false": "never"}.get(AUDIT_SPOOL_FSYNC, AUDIT_SPOOL_FSYNC)
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 500))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", 1.0))
+FSYNC_MODES = ("interval", "always", "never")
+AUDIT_MAX_BACKOFF_SECONDS = 30
+
+
+class AuditWriter:
+    """
+    Moves audit records from the request path to a local spool, then
+    replays them into audit_logs in bulk from a background thread.
+
+    submit() only appends to the process's AuditSpool. That is a local file
+    write, so a slow or unavailable database never blocks or fails a
+    request. The replayer inserts a batch once `batch_size` records are
+    waiting or `flush_interval` seconds have passed. The spool checkpoint
+    only advances after the batch commits. While the database is down the
+    replayer backs off and retries the same batch, and the spool keeps
+    filling. Once the spool reaches `max_bytes`, new records are dropped
+    and counted. Records left over from a crash are replayed on the next
+    start, along with spools of processes that no longer run.
+
+    A batch the database rejects outright (a foreign key or length
+    violation, not a lost connection) is written again record by record,
+    each in its own savepoint. The records that still fail go to the
+    spool's dead-letter file, so one bad record can't hold up the rest.
+
+    By default the spool is fsynced by the replayer once per pass (at most
+    every `flush_interval` seconds), not by submit(), so requests never
+    wait on the disk. A power loss can then lose up to that many seconds
+    of records; fsync="always" syncs every append instead.
+
+    Before init_app() runs (scripts, shells) records are written inline.
+    """
+
+    def __init__(self, batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_SECONDS,
+                 max_bytes=AUDIT_SPOOL_MAX_BYTES, fsync=AUDIT_SPOOL_FSYNC):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"AUDIT_SPOOL_FSYNC must be one of {', '.join(FSYNC_MODES)}, not {fsync!r}")
+        self.fsync = fsync
+        self.app = None
+        self.spool = None
+        self._orphans = []
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._counters = {"enqueued": 0, "written": 0, "dropped": 0, "failed_batches": 0, "batches": 0,
+                          "dead_lettered": 0}
+
+    def init_app(self, app):
+        self.app = app
+        spool_dir = os.getenv("AUDIT_SPOOL_DIR", os.path.join(app.instance_path, "audit_spool"))
+        fsync = self.fsync == "always"
+        self.spool = AuditSpool(spool_dir, max_bytes=self.max_bytes, fsync=fsync)
+        self._orphans = AuditSpool.orphans(spool_dir, max_bytes=self.max_bytes, fsync=fsync)
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, record):
+        if self._thread is None:
+            db.session.execute(insert(AuditLog), [record])
+            db.session.commit()
+            return
+
+        if self.spool.append(record):
+            self._count("enqueued")
+            if self.spool.pending >= self.batch_size:
+                self._wakeup.set()
+        else:
+            self._count("dropped")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        if self.spool:
+            spools = [self.spool] + list(self._orphans)
+            stats["queued"] = sum(spool.pending for spool in spools)
+            stats["spool_bytes"] = sum(spool.backlog_bytes for spool in spools)
+        return stats
+
+    def close(self, timeout=10):
+        """Stop the replayer after one last attempt to drain the spool."""
+        if self._thread is None or self._stopping.is_set():
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._counters[key] += n
+
+    def _run(self):
+        backoff = self.flush_interval
+
+        while True:
+            self._sync()
+
+            # Spools orphaned by processes that no longer run are drained first
+            spool = self._orphans[0] if self._orphans else self.spool
+            records, position = spool.read_batch(self.batch_size)
+
+            if spool is not self.spool and not records:
+                self._orphans.pop(0)
+                spool.close()
+                continue
+
+            if spool is self.spool and len(records) < self.batch_size and not self._stopping.is_set():
+                # Wait for a full batch or the flush interval, whichever is first
+                if self._wakeup.wait(self.flush_interval):
+                    self._wakeup.clear()
+                records, position = spool.read_batch(self.batch_size)
+
+            if not records:
+                if self._stopping.is_set():
+                    self._sync()
+                    return
+                continue
+
+            if self._write(spool, records):
+                spool.commit(position)
+                backoff = self.flush_interval
+            elif self._stopping.is_set():
+                self._sync()
+                return
+            else:
+                self._backoff(backoff)
+                backoff = min(backoff * 2, AUDIT_MAX_BACKOFF_SECONDS)
+
+    def _sync(self):
+        if self.fsync == "interval":
+            self.spool.sync()
+
+    def _backoff(self, seconds):
+        """Wait out a failed write, still syncing new records every flush interval."""
+        deadline = time.monotonic() + seconds
+        while not self._stopping.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self._stopping.wait(min(remaining, self.flush_interval))
+            self._sync()
+
+    def _write(self, spool, records):
+        rejected = []
+        rows = []
+        for record in records:
+            try:
+                record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+                rows.append(record)
+            except (KeyError, TypeError, ValueError) as e:
+                rejected.append((record, repr(e)))
+
+        with self.app.app_context():
+            try:
+                try:
+                    if rows:
+                        db.session.execute(insert(AuditLog), rows)
+                except DBAPIError as e:
+                    if _is_transient(e):
+                        raise
+                    db.session.rollback()
+                    rejected.extend(self._write_each(rows))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self._count("failed_batches")
+                logger.exception("Could not write %s audit records, will retry", len(records))
+                return False
+            finally:
+                db.session.remove()
+
+        # Only once the batch is stored, so a retried batch isn't dead-lettered twice
+        for record, error in rejected:
+            spool.dead_letter(record, error)
+        if rejected:
+            logger.error("Moved %s audit records the database rejected to the dead-letter file", len(rejected))
+            self._count("dead_lettered", len(rejected))
+        self._count("written", len(records) - len(rejected))
+        self._count("batches")
+        return True
+
+    def _write_each(self, rows):
+        """Insert rows one savepoint at a time; returns the (record, error) pairs refused."""
+        rejected = []
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(AuditLog), [row])
+            except DBAPIError as e:
+                if _is_transient(e):
+                    raise
+                rejected.append((row, str(e.orig)))
+        return rejected
+
+
+def _is_transient(error):
+    """A lost connection or an unavailable server, as opposed to a record the database refuses."""
+    return error.connection_invalidated or isinstance(error, OperationalError)
+
+
+audit_writer = AuditWriter()
+
+
 def log_action(user_id, action, target_type, target_id, status, ip_address=None, extra_data=None):
-    log = AuditLog(
-        user_id=user_id,
-        action=action,
-        target_type=target_type,
-        target_id=target_id,
-        status=status,
-        ip_address=ip_address or request.remote_addr,
-        extra_data=extra_data
-    )
-    db.session.add(log)
-    db.session.commit()
+    audit_writer.submit({
+        "timestamp": datetime.utcnow(),
+        "user_id": user_id,
+        "action": action,
+        "target_type": target_type,
+        "target_id": target_id,
+        "status": status,
+        "ip_address": ip_address or request.remote_addr,
+        "extra_data": extra_data
+    })
 
 def log_audit(action, target_type=None):
     """
@@ -52,7 +276,7 @@ def log_audit(action, target_type=None):
                 raise e
 
             finally:
-                log = AuditLog(
+                log_action(
                     user_id=user_id,
                     action=action,
                     target_type=target_type,
@@ -61,8 +285,6 @@ def log_audit(action, target_type=None):
                     ip_address=ip,
                     extra_data=extra_data
                 )
-                db.session.add(log)
-                db.session.commit()
 
         return wrapper
     return decorator
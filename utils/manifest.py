@@ -0,0 +1,97 @@
+# utils/manifest.py
+import gzip
+import json
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from models import db, EventPass, EventPassVersion, OrderItem, Ticket
+from utils.pagination import encode_cursor, decode_cursor, InvalidCursor
+
+
+def bump_event_versions(event_ids):
+    """
+    Take the next version of each event and lock its counter row until
+    commit: {event_id: version}.
+
+    Because a second writer for the same event waits on that lock, a
+    version can only be visible once every lower version has committed.
+    That is what makes `since` tokens safe. Rows are locked in id order to
+    avoid deadlocks.
+
+    The row is shared by every writer of the event, so writers take it
+    last. Check-in writers take it after locking the passes they will
+    change, and not at all when nothing changes, so a gate waiting on a
+    pass lock never holds up the others. Minting takes it after its
+    inserts, the filter append and the sales rollups.
+    """
+    versions = {}
+    for event_id in sorted(set(event_ids)):
+        stmt = insert(EventPassVersion).values(event_id=event_id, version=1)
+        versions[event_id] = db.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["event_id"],
+                set_={"version": EventPassVersion.version + 1}
+            ).returning(EventPassVersion.version)
+        ).scalar_one()
+    return versions
+
+
+def current_version(event_id):
+    version = db.session.execute(
+        select(EventPassVersion.version).where(EventPassVersion.event_id == event_id)
+    ).scalar()
+    return version or 0
+
+
+def encode_token(event_id, version):
+    return encode_cursor(event_id, version)
+
+
+def decode_token(token, event_id):
+    """Version a device last synced to, or raise InvalidCursor."""
+    token_event, version = decode_cursor(token, int, int)
+    if token_event != event_id:
+        raise InvalidCursor("Token belongs to another event")
+    return version
+
+
+def build_manifest(event_id, since=0):
+    """
+    Passes of `event_id` changed after version `since` (all of them when 0).
+
+    The event's version is read before the passes, and only passes up to
+    that version are included. A change that commits in between is left
+    for the next download. Passes are compact [code, checked_in, ticket_id,
+    status_changed_at] rows, with ticket types listed once.
+    """
+    version = current_version(event_id)
+
+    tickets = db.session.execute(
+        select(Ticket.id, Ticket.type).where(Ticket.event_id == event_id)
+    ).all()
+
+    query = (
+        select(EventPass.ticket_code, EventPass.att_status, OrderItem.ticket_id, EventPass.status_changed_at)
+        .join(OrderItem, OrderItem.id == EventPass.order_item_id)
+        .where(OrderItem.ticket_id.in_([t.id for t in tickets]), EventPass.sync_version <= version)
+    )
+    if since:
+        query = query.where(EventPass.sync_version > since)
+    rows = db.session.execute(query).all()
+
+    return {
+        "event_id": event_id,
+        "version": encode_token(event_id, version),
+        "full": since == 0,
+        "ticket_types": {str(t.id): t.type for t in tickets},
+        "passes": [
+            [
+                code, 1 if checked_in else 0, ticket_id,
+                changed_at.isoformat(timespec="seconds") if changed_at else None
+            ]
+            for code, checked_in, ticket_id, changed_at in rows
+        ],
+    }
+
+
+def compress_manifest(manifest):
+    return gzip.compress(json.dumps(manifest, separators=(",", ":")).encode(), compresslevel=6)
@@ -0,0 +1,79 @@
+# utils/pagination.py
+import base64
+import json
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Clamp a ?limit= query arg to 1..maximum, falling back to `default`."""
+    try:
+        limit = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(*values):
+    """Pack the sort key of the last row on a page into an opaque token."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, *types):
+    """
+    Unpack a token made by encode_cursor, coercing each value with the
+    matching entry of `types` (datetime values are parsed from ISO format).
+    Raises InvalidCursor for anything malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise InvalidCursor("Invalid cursor")
+        return [
+            datetime.fromisoformat(v) if t is datetime else t(v)
+            for v, t in zip(values, types)
+        ]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def keyset_page(rows, limit, key):
+    """
+    Split `limit + 1` fetched rows into the page and the cursor for the next
+    one (None on the last page). `key` returns the sort tuple of a row.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(*key(page[-1]))
+
+
+def parse_fields(value, allowed):
+    """
+    Turn ?fields=a,b,organizer into a tuple for to_dict(only=...).
+
+    A bare relationship name selects every allowed field under it, and
+    "id" is always included. Returns `allowed` when nothing was requested.
+    Raises ValueError naming the first unknown field.
+    """
+    if not value:
+        return allowed
+
+    selected = ["id"]
+    for name in (f.strip() for f in value.split(",")):
+        if not name:
+            continue
+        matches = [f for f in allowed if f == name or f.startswith(name + ".")]
+        if not matches:
+            raise ValueError(f"Unknown field: {name}")
+        selected.extend(m for m in matches if m not in selected)
+    return tuple(selected)
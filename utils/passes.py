@@ -0,0 +1,116 @@
+# utils/passes.py
+import base64
+import secrets
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from models import db, EventPass, OrderItem, Ticket
+from utils.manifest import bump_event_versions
+from utils.ticket_filter import ticket_filters
+
+CODE_BYTES = 10          # 80 random bits -> 16 base32 characters
+MINT_CHUNK_SIZE = 1000   # rows per INSERT, well under the bind parameter limit
+MAX_MINT_ATTEMPTS = 5
+
+
+class PassMintingError(Exception):
+    pass
+
+
+def generate_ticket_codes(count):
+    """
+    Return `count` distinct random ticket codes.
+
+    Codes are 80-bit base32 strings. At a million issued passes the chance
+    that any new code collides is about 1 in 10^18, so the conflict path
+    below is there for safety, not for throughput.
+    """
+    codes = set()
+    while len(codes) < count:
+        codes.add(base64.b32encode(secrets.token_bytes(CODE_BYTES)).decode("ascii"))
+    return list(codes)
+
+
+def mint_passes(order):
+    """
+    Create one EventPass per attendee on every item of `order`.
+
+    Passes go in with multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING.
+    A row whose code already exists is skipped instead of aborting the
+    transaction, and only those rows are retried with fresh codes.
+
+    New passes carry the next version of their event, so offline check-in
+    manifests pick them up on the next delta sync, and their codes are
+    added to the event's ticket filter. The version row is shared by every
+    writer of the event, so it is bumped last, once the inserts and the
+    filter append are done; callers commit right after (see
+    settlement.mark_paid).
+
+    Returns a list of (pass_id, ticket_code, order_item_id) tuples.
+    """
+    # One query for every item's event, instead of lazy-loading each ticket
+    event_ids = dict(db.session.execute(
+        select(OrderItem.id, Ticket.event_id)
+        .join(Ticket, Ticket.id == OrderItem.ticket_id)
+        .where(OrderItem.order_id == order.id)
+    ).all())
+
+    rows = [
+        {
+            "attendee_first_name": att["first_name"],
+            "attendee_last_name": att["last_name"],
+            "attendee_email": att["email"],
+            "attendee_phone": att["phone"],
+            "order_item_id": item.id,
+        }
+        for item in order.order_items
+        for att in (item.temp_attendee_data or [])
+    ]
+
+    minted = []
+    for start in range(0, len(rows), MINT_CHUNK_SIZE):
+        minted.extend(_insert_with_retry(rows[start:start + MINT_CHUNK_SIZE]))
+
+    # Before commit: once the passes are visible the gate filters know them
+    passes_by_event = {}
+    for pass_id, code, order_item_id in minted:
+        passes_by_event.setdefault(event_ids[order_item_id], []).append((pass_id, code))
+    for event_id, passes in passes_by_event.items():
+        ticket_filters.add(event_id, [code for _, code in passes])
+
+    versions = bump_event_versions(passes_by_event)
+    for event_id, passes in passes_by_event.items():
+        db.session.execute(
+            update(EventPass)
+            .where(EventPass.id.in_([pass_id for pass_id, _ in passes]))
+            .values(sync_version=versions[event_id])
+        )
+
+    return minted
+
+
+def _insert_with_retry(rows):
+    minted = []
+    pending = rows
+
+    for _ in range(MAX_MINT_ATTEMPTS):
+        codes = generate_ticket_codes(len(pending))
+        pending = [dict(row, ticket_code=code) for row, code in zip(pending, codes)]
+
+        # Rows as executemany parameters, not .values(): the statement then
+        # compiles once and is cached, and SQLAlchemy batches it into
+        # multi-row INSERTs itself
+        inserted = db.session.execute(
+            insert(EventPass)
+            .on_conflict_do_nothing(index_elements=["ticket_code"])
+            .returning(EventPass.id, EventPass.ticket_code, EventPass.order_item_id),
+            pending
+        ).all()
+
+        minted.extend(tuple(row) for row in inserted)
+        taken = {row.ticket_code for row in inserted}
+        pending = [row for row in pending if row["ticket_code"] not in taken]
+
+        if not pending:
+            return minted
+
+    raise PassMintingError(f"Could not mint {len(pending)} passes with unique ticket codes")
@@ -0,0 +1,377 @@
+# utils/payment_queue.py
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import exists, or_
+from models import db, Order, PaymentJob, ProcessedCallback
+from mpesa import Mpesa
+from utils.daraja import request_not_sent
+from utils.settlement import settle_payment, REFUND_DUE
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_WORKERS = int(os.getenv("PAYMENT_WORKERS", 8))
+PAYMENT_POLL_SECONDS = float(os.getenv("PAYMENT_POLL_SECONDS", 2))
+PAYMENT_MAX_ATTEMPTS = int(os.getenv("PAYMENT_MAX_ATTEMPTS", 3))
+# A job still "processing" after this long lost its worker
+PAYMENT_PROCESSING_TIMEOUT = int(os.getenv("PAYMENT_PROCESSING_TIMEOUT", 120))
+# Sent pushes with no callback after this long are checked with an STK push query
+STK_QUERY_AFTER_SECONDS = int(os.getenv("STK_QUERY_AFTER_SECONDS", 180))
+STK_QUERY_WINDOW_HOURS = 24
+RECONCILE_INTERVAL_SECONDS = 60
+RECONCILE_BATCH_SIZE = 50
+# A job in one of these may still prompt or charge the customer
+LIVE_JOB_STATUSES = ("queued", "processing", "sent", "unknown")
+
+_pool = None
+
+
+def enqueue_stk_push(order, phone, description):
+    """
+    Queue an STK push for `order`. The job is only added to the session,
+    so it commits atomically with whatever the caller is writing; call
+    notify_payment_workers() after the commit to skip the poll delay.
+    """
+    job = PaymentJob(
+        order=order,
+        phone=phone,
+        amount=int(order.total_amount),
+        description=description,
+        status="queued"
+    )
+    db.session.add(job)
+    return job
+
+
+def live_job(order_id):
+    """
+    The order's push that may still reach the customer, or None. While one
+    exists no other push may be queued for the order: Daraja could prompt
+    the customer twice, and the later push would hide the earlier one.
+    """
+    return (
+        PaymentJob.query
+        .filter(PaymentJob.order_id == order_id, PaymentJob.status.in_(LIVE_JOB_STATUSES))
+        .order_by(PaymentJob.created_at.desc())
+        .first()
+    )
+
+
+def find_pushed_order(checkout_id):
+    """
+    The order a CheckoutRequestID was sent for, locked FOR UPDATE, or None.
+    Looked up through the job that sent it, so every push of an order stays
+    resolvable. Orders from before jobs stored the id match on the order.
+    """
+    order_id = (
+        db.session.query(PaymentJob.order_id)
+        .filter(PaymentJob.checkout_request_id == checkout_id)
+        .scalar()
+    )
+    if order_id is not None:
+        return Order.query.filter_by(id=order_id).with_for_update().first()
+
+    return (
+        Order.query
+        .filter(or_(Order.checkout_request_id == checkout_id, Order.order_id == checkout_id))
+        .with_for_update()
+        .first()
+    )
+
+
+def notify_payment_workers():
+    if _pool:
+        _pool.notify()
+
+
+def claim_jobs(limit):
+    """Move up to `limit` queued jobs to processing and return their payloads."""
+    jobs = (
+        PaymentJob.query
+        .filter(PaymentJob.status == "queued")
+        .order_by(PaymentJob.created_at.asc())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    claimed = []
+    for job in jobs:
+        job.status = "processing"
+        job.attempts += 1
+        claimed.append({
+            "id": job.id,
+            "attempts": job.attempts,
+            "amount": job.amount,
+            "phone": job.phone,
+            "description": job.description,
+        })
+
+    db.session.commit()
+    return claimed
+
+
+def record_result(job_id, response=None, error=None, attempts=0, retry=False):
+    """
+    Store the outcome of one STK push attempt.
+
+    A failed attempt is queued again only when `retry` says the request
+    never reached Daraja. Any other error (a read timeout, a dropped
+    connection, a garbled reply) may come after Daraja accepted the push,
+    and sending it again could prompt and charge the customer twice, so
+    the job is parked as "unknown" instead. Its callback can still settle
+    the order (see adopt_unknown_push).
+    """
+    job = PaymentJob.query.get(job_id)
+
+    if error is not None:
+        job.error = error
+        if not retry:
+            job.status = "unknown"
+        else:
+            job.status = "queued" if attempts < PAYMENT_MAX_ATTEMPTS else "failed"
+    else:
+        job.response = response
+        if response.get("ResponseCode") == "0":
+            job.status = "sent"
+            job.checkout_request_id = response.get("CheckoutRequestID")
+            # The order shows its latest push; callbacks resolve through the job
+            Order.query.filter_by(id=job.order_id).update(
+                {Order.checkout_request_id: job.checkout_request_id},
+                synchronize_session=False
+            )
+        else:
+            job.status = "failed"
+
+    db.session.commit()
+
+
+def reap_stuck_jobs(timeout=PAYMENT_PROCESSING_TIMEOUT):
+    """
+    Park jobs left in "processing" by a worker that died. Whether their push
+    went out is not known, so they become "unknown", never "queued".
+    Returns the number of jobs reaped.
+    """
+    reaped = (
+        PaymentJob.query
+        .filter(
+            PaymentJob.status == "processing",
+            PaymentJob.updated_at < datetime.now() - timedelta(seconds=timeout)
+        )
+        .update(
+            {PaymentJob.status: "unknown", PaymentJob.error: "Worker stopped before recording the result"},
+            synchronize_session=False
+        )
+    )
+    db.session.commit()
+    return reaped
+
+
+def adopt_unknown_push(checkout_id, metadata):
+    """
+    Match a callback whose CheckoutRequestID we never saw to the "unknown"
+    job that sent it, by amount and phone number from the callback
+    metadata (only present on successful payments).
+
+    Adopts only when exactly one recent job matches. Returns the locked
+    order, with the job marked sent, or None.
+    """
+    items = {item.get("Name"): item.get("Value") for item in metadata}
+    amount, phone = items.get("Amount"), str(items.get("PhoneNumber") or "")
+    if amount is None or len(phone) < 9:
+        return None
+
+    jobs = (
+        PaymentJob.query
+        .filter(
+            PaymentJob.status == "unknown",
+            PaymentJob.amount == int(float(amount)),
+            PaymentJob.phone.like(f"%{phone[-9:]}"),
+            PaymentJob.created_at > datetime.now() - timedelta(hours=STK_QUERY_WINDOW_HOURS),
+        )
+        .limit(2)
+        .all()
+    )
+    if len(jobs) != 1:
+        return None
+
+    order = Order.query.filter_by(id=jobs[0].order_id).with_for_update().first()
+    if order is None:
+        return None
+    order.checkout_request_id = checkout_id
+    jobs[0].checkout_request_id = checkout_id
+    jobs[0].status = "sent"
+    return order
+
+
+def reconcile_sent_pushes(batch_size=RECONCILE_BATCH_SIZE):
+    """
+    Settle pushes whose callback never arrived, using the STK push query.
+
+    Looks at "sent" jobs older than STK_QUERY_AFTER_SECONDS whose order is
+    not settled and whose own CheckoutRequestID has no processed_callbacks
+    row.
+    Daraja is queried outside any lock; the order is then locked and
+    settled like a callback would. Pushes Daraja still reports as being
+    processed are looked at again on a later run. Returns the number
+    settled.
+    """
+    now = datetime.now()
+    candidates = (
+        db.session.query(PaymentJob.id, PaymentJob.checkout_request_id)
+        .join(Order, Order.id == PaymentJob.order_id)
+        .filter(
+            PaymentJob.status == "sent",
+            PaymentJob.updated_at < now - timedelta(seconds=STK_QUERY_AFTER_SECONDS),
+            PaymentJob.created_at > now - timedelta(hours=STK_QUERY_WINDOW_HOURS),
+            Order.status.in_(("pending", "expired")),
+            PaymentJob.checkout_request_id.isnot(None),
+            ~exists().where(ProcessedCallback.checkout_request_id == PaymentJob.checkout_request_id),
+        )
+        .order_by(PaymentJob.updated_at.asc())
+        .limit(batch_size)
+        .all()
+    )
+    db.session.rollback()
+
+    settled = 0
+    for job_id, checkout_id in candidates:
+        try:
+            result = Mpesa().check_transaction(checkout_id)
+        except Exception:
+            logger.exception("STK push query failed for %s", checkout_id)
+            continue
+
+        # Bumps updated_at so the job waits another STK_QUERY_AFTER_SECONDS
+        PaymentJob.query.filter_by(id=job_id).update(
+            {PaymentJob.updated_at: datetime.now()}, synchronize_session=False
+        )
+
+        if "ResultCode" not in result:
+            # e.g. "The transaction is being processed"
+            db.session.commit()
+            continue
+
+        order = find_pushed_order(checkout_id)
+        if settle_payment(order, checkout_id, int(result["ResultCode"])) == REFUND_DUE:
+            logger.error("Order %s was paid after its tickets sold out; refund due", order.order_id)
+        db.session.commit()
+        settled += 1
+
+    return settled
+
+
+class PaymentWorkerPool:
+    """
+    Sends queued STK pushes from a thread pool so the request path never
+    waits on Daraja. A dispatcher thread claims as many jobs as there are
+    idle workers (SKIP LOCKED, so several processes can share the queue)
+    and each worker records the outcome on the job and its order. Once a
+    minute the dispatcher also reaps jobs stuck in "processing" and
+    settles sent pushes whose callback never came.
+    """
+
+    def __init__(self, app, concurrency=PAYMENT_WORKERS, poll_interval=PAYMENT_POLL_SECONDS):
+        self.app = app
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="stk-push")
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._dispatch_forever, name="payment-dispatcher", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _dispatch_forever(self):
+        last_reconcile = 0
+        while True:
+            if time.monotonic() - last_reconcile >= RECONCILE_INTERVAL_SECONDS:
+                last_reconcile = time.monotonic()
+                self._reconcile()
+
+            with self._lock:
+                idle = self.concurrency - self._in_flight
+
+            jobs = []
+            if idle > 0:
+                with self.app.app_context():
+                    try:
+                        jobs = claim_jobs(idle)
+                    except Exception:
+                        db.session.rollback()
+                        logger.exception("Could not claim payment jobs")
+                    finally:
+                        db.session.remove()
+
+            for job in jobs:
+                with self._lock:
+                    self._in_flight += 1
+                self.executor.submit(self._process, job).add_done_callback(self._finished)
+
+            if not jobs:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _reconcile(self):
+        with self.app.app_context():
+            try:
+                reaped = reap_stuck_jobs()
+                if reaped:
+                    logger.warning("Marked %s stuck payment jobs as unknown", reaped)
+                settled = reconcile_sent_pushes()
+                if settled:
+                    logger.info("Settled %s payments from STK push queries", settled)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Payment reconciliation failed")
+            finally:
+                db.session.remove()
+
+    def _finished(self, future):
+        with self._lock:
+            self._in_flight -= 1
+        self._wakeup.set()
+
+    def _process(self, job):
+        response, error, retry = None, None, False
+        mpesa = Mpesa()
+        try:
+            # The token comes first: if it fails, the push was never sent
+            mpesa.get_access_token()
+        except Exception as e:
+            error, retry = str(e), True
+        else:
+            try:
+                response = mpesa.make_stk_push({
+                    "amount": job["amount"],
+                    "phone": job["phone"],
+                    "description": job["description"]
+                })
+            except Exception as e:
+                error, retry = str(e), request_not_sent(e)
+
+        with self.app.app_context():
+            try:
+                record_result(job["id"], response=response, error=error, attempts=job["attempts"], retry=retry)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Could not record result for payment job %s", job["id"])
+            finally:
+                db.session.remove()
+
+
+def start_payment_workers(app, concurrency=PAYMENT_WORKERS):
+    global _pool
+    _pool = PaymentWorkerPool(app, concurrency=concurrency)
+    _pool.start()
+    return _pool
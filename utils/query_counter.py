@@ -0,0 +1,49 @@
+# utils/query_counter.py
+from contextlib import contextmanager
+from sqlalchemy import event
+from models import db
+
+
+class QueryCounter:
+    """Records every SQL statement the engine executes while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+        return False
+
+
+def count_queries(engine=None):
+    """
+    Count queries issued inside the block (needs an app context):
+
+        with count_queries() as queries:
+            client.get("/events")
+        print(queries.count, queries.statements)
+    """
+    return QueryCounter(engine or db.engine)
+
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """Fail with the offending SQL if the block issues more than `limit` queries."""
+    with count_queries(engine) as queries:
+        yield queries
+
+    if queries.count > limit:
+        listing = "\n".join(f"  {i}. {sql}" for i, sql in enumerate(queries.statements, 1))
+        raise AssertionError(f"Expected at most {limit} queries, got {queries.count}:\n{listing}")
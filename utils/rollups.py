@@ -0,0 +1,181 @@
+# utils/rollups.py
+from collections import defaultdict
+from sqlalchemy import func, select, text, distinct, cast, literal, Date
+from sqlalchemy.dialects.postgresql import insert
+from models import db, Order, OrderItem, Ticket, Event, SalesDailyRollup, SalesHourlyRollup, SalesHourlyOrders
+from utils.cache import invalidate_on_commit
+
+# Rows each hour's order count is spread over in sales_hourly_orders
+ORDER_COUNT_SLOTS = 8
+PLATFORM = 0  # organizer_id of the platform-wide order counts
+
+
+def record_sale(order):
+    """
+    Add a newly paid order to sales_daily_rollups, sales_hourly_rollups and
+    sales_hourly_orders.
+
+    Runs inside the caller's transaction, so the rollups move only if the
+    order is actually marked paid. The daily table gets one upsert per
+    ticket on the order and the hourly table one per event, each adding to
+    the existing bucket. sales_hourly_orders counts the order once
+    platform-wide and once per organizer. Rows are upserted in id order so
+    concurrent callbacks lock them in the same order.
+    """
+    units = defaultdict(int)
+    for item in order.order_items:
+        units[item.ticket_id] += item.quantity
+    if not units:
+        return
+
+    tickets = db.session.execute(
+        select(Ticket.id, Ticket.type, Ticket.price, Ticket.event_id, Event.category, Event.organizer_id)
+        .join(Event, Event.id == Ticket.event_id)
+        .where(Ticket.id.in_(units))
+    ).all()
+
+    day = order.created_at.date()
+    daily = [
+        {
+            "day": day,
+            "event_id": t.event_id,
+            "ticket_id": t.id,
+            "ticket_type": t.type,
+            "category": t.category,
+            "units": units[t.id],
+            "revenue": units[t.id] * t.price,
+            "orders": 1,
+        }
+        for t in sorted(tickets, key=lambda t: t.id)
+    ]
+
+    stmt = insert(SalesDailyRollup).values(daily)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=["day", "ticket_id"],
+        set_={
+            "units": SalesDailyRollup.units + stmt.excluded.units,
+            "revenue": SalesDailyRollup.revenue + stmt.excluded.revenue,
+            "orders": SalesDailyRollup.orders + stmt.excluded.orders,
+            "ticket_type": stmt.excluded.ticket_type,
+            "category": stmt.excluded.category,
+        }
+    ))
+
+    hour = order.created_at.replace(minute=0, second=0, microsecond=0)
+    per_event = {}
+    for row in daily:
+        bucket = per_event.setdefault(row["event_id"], {
+            "hour": hour, "event_id": row["event_id"], "units": 0, "revenue": 0, "orders": 1
+        })
+        bucket["units"] += row["units"]
+        bucket["revenue"] += row["revenue"]
+
+    stmt = insert(SalesHourlyRollup).values([per_event[k] for k in sorted(per_event)])
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=["hour", "event_id"],
+        set_={
+            "units": SalesHourlyRollup.units + stmt.excluded.units,
+            "revenue": SalesHourlyRollup.revenue + stmt.excluded.revenue,
+            "orders": SalesHourlyRollup.orders + stmt.excluded.orders,
+        }
+    ))
+
+    slot = order.id % ORDER_COUNT_SLOTS
+    scopes = sorted({PLATFORM} | {t.organizer_id for t in tickets})
+    stmt = insert(SalesHourlyOrders).values([
+        {"hour": hour, "organizer_id": organizer_id, "slot": slot, "orders": 1} for organizer_id in scopes
+    ])
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=["organizer_id", "hour", "slot"],
+        set_={"orders": SalesHourlyOrders.orders + stmt.excluded.orders}
+    ))
+    invalidate_on_commit(db.session, "sales")
+
+
+def rebuild_sales_rollups():
+    """
+    Recompute sales_daily_rollups, sales_hourly_rollups and
+    sales_hourly_orders from every paid order.
+
+    Both tables are locked for the rebuild. A callback that is already
+    running commits before the rebuild reads the orders, and one that starts
+    later waits and then adds on top, so no sale is counted twice or
+    dropped. Returns the number of rollup rows written.
+    """
+    day = cast(Order.created_at, Date)
+    daily = (
+        select(
+            day,
+            Ticket.event_id,
+            Ticket.id,
+            Ticket.type,
+            Event.category,
+            func.sum(OrderItem.quantity),
+            func.sum(OrderItem.quantity * Ticket.price),
+            func.count(distinct(Order.id)),
+        )
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(Ticket, Ticket.id == OrderItem.ticket_id)
+        .join(Event, Event.id == Ticket.event_id)
+        .where(Order.status == "paid")
+        .group_by(day, Ticket.event_id, Ticket.id, Ticket.type, Event.category)
+    )
+
+    hour = func.date_trunc("hour", Order.created_at)
+    hourly = (
+        select(
+            hour,
+            Ticket.event_id,
+            func.sum(OrderItem.quantity),
+            func.sum(OrderItem.quantity * Ticket.price),
+            func.count(distinct(Order.id)),
+        )
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(Ticket, Ticket.id == OrderItem.ticket_id)
+        .where(Order.status == "paid")
+        .group_by(hour, Ticket.event_id)
+    )
+
+    slot = Order.id % ORDER_COUNT_SLOTS
+    platform_orders = (
+        select(hour, literal(PLATFORM), slot, func.count())
+        .where(Order.status == "paid")
+        .group_by(hour, slot)
+    )
+    organizer_orders = (
+        select(hour, Event.organizer_id, slot, func.count(distinct(Order.id)))
+        .select_from(Order)
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .join(Ticket, Ticket.id == OrderItem.ticket_id)
+        .join(Event, Event.id == Ticket.event_id)
+        .where(Order.status == "paid")
+        .group_by(hour, Event.organizer_id, slot)
+    )
+
+    db.session.execute(text(
+        "LOCK TABLE sales_daily_rollups, sales_hourly_rollups, sales_hourly_orders IN EXCLUSIVE MODE"
+    ))
+    db.session.execute(SalesDailyRollup.__table__.delete())
+    db.session.execute(SalesHourlyRollup.__table__.delete())
+    db.session.execute(SalesHourlyOrders.__table__.delete())
+    written = db.session.execute(
+        insert(SalesDailyRollup).from_select(
+            ["day", "event_id", "ticket_id", "ticket_type", "category", "units", "revenue", "orders"],
+            daily
+        )
+    ).rowcount
+    written += db.session.execute(
+        insert(SalesHourlyRollup).from_select(
+            ["hour", "event_id", "units", "revenue", "orders"],
+            hourly
+        )
+    ).rowcount
+    for orders in (platform_orders, organizer_orders):
+        written += db.session.execute(
+            insert(SalesHourlyOrders).from_select(["hour", "organizer_id", "slot", "orders"], orders)
+        ).rowcount
+    invalidate_on_commit(db.session, "sales")
+    db.session.commit()
+    return written
@@ -0,0 +1,82 @@
+# utils/settlement.py
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert
+from models import db, ProcessedCallback
+from utils.inventory import InsufficientInventory, reserve_tickets, release_tickets, order_quantities
+from utils.passes import mint_passes
+from utils.rollups import record_sale
+
+# Outcomes of settle_payment
+DUPLICATE = "duplicate"
+ALREADY_PAID = "already_paid"
+PAID = "paid"
+REFUND_DUE = "refund_due"
+FAILED = "failed"
+
+
+def settle_payment(order, checkout_id, result_code, receipt=None):
+    """
+    Apply the final M-Pesa result for `order`, whether it came from the
+    callback or from an STK push query.
+
+    The caller locks the order FOR UPDATE and commits. The result is first
+    claimed in processed_callbacks, in the same transaction as its side
+    effects, so a callback and a query for the same push settle it once.
+    """
+    claimed = db.session.execute(
+        insert(ProcessedCallback)
+        .values(
+            checkout_request_id=checkout_id,
+            result_code=result_code,
+            order_id=order.id,
+            processed_at=datetime.now()
+        )
+        .on_conflict_do_nothing(index_elements=["checkout_request_id"])
+        .returning(ProcessedCallback.id)
+    ).first()
+
+    if not claimed:
+        return DUPLICATE
+
+    if order.status == "paid":
+        return ALREADY_PAID
+
+    if result_code == 0:
+        return mark_paid(order, receipt)
+
+    if order.status == "refund_due":
+        # A failed retry doesn't cancel the payment that still needs refunding
+        return FAILED
+    if order.status == "pending":
+        release_tickets(order_quantities(order))
+    order.status = "failed"
+    order.mpesa_receipt = receipt if receipt else "N/A"
+    return FAILED
+
+
+def mark_paid(order, receipt=None):
+    """
+    Mark a locked, unpaid order as paid: mint its passes and count the sale.
+
+    Only a pending order still holds its seats. Any other order was paid
+    after its hold lapsed, so the seats are claimed again. If they are gone
+    the customer has been charged for nothing: the order is kept as
+    "refund_due" with its receipt, and no passes are minted. Returns PAID
+    or REFUND_DUE.
+    """
+    order.mpesa_receipt = receipt if receipt else "N/A"
+
+    if order.status != "pending":
+        try:
+            # A savepoint, so a multi-ticket order doesn't keep half its seats
+            with db.session.begin_nested():
+                reserve_tickets(order_quantities(order))
+        except InsufficientInventory:
+            order.status = "refund_due"
+            return REFUND_DUE
+
+    order.status = "paid"
+    record_sale(order)
+    # Last: it takes the event's version lock, held until the caller commits
+    mint_passes(order)
+    return PAID
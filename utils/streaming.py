@@ -0,0 +1,158 @@
+# utils/streaming.py
+import csv
+import io
+import json
+from datetime import datetime, date
+from decimal import Decimal
+from flask import Response, stream_with_context
+from models import db
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet exports are optional
+    pa = None
+
+STREAM_BATCH_SIZE = 1000
+PARQUET_ROW_GROUP_SIZE = 50000
+
+# Column type names used by parquet_response
+PARQUET_TYPES = {
+    "int": lambda: pa.int64(),
+    "float": lambda: pa.float64(),
+    "str": lambda: pa.string(),
+    "bool": lambda: pa.bool_(),
+    "datetime": lambda: pa.timestamp("us"),
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def stream_rows(statement, batch_size=STREAM_BATCH_SIZE):
+    """
+    Yield result rows of `statement` without loading them all.
+
+    yield_per turns on stream_results, so on Postgres the rows come from a
+    server-side cursor `batch_size` at a time and memory stays flat however
+    many rows match.
+    """
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    try:
+        for row in result:
+            yield row
+    finally:
+        result.close()
+
+
+def ndjson_response(rows, serialize, filename=None):
+    """Stream one JSON object per line, built by serialize(row)."""
+    def generate():
+        for row in rows:
+            yield json.dumps(serialize(row), default=_json_default) + "\n"
+
+    return _response(generate(), "application/x-ndjson", filename)
+
+
+def csv_response(rows, columns, serialize, filename=None):
+    """Stream a CSV with a `columns` header row; serialize(row) returns a dict."""
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({
+                k: json.dumps(v, default=_json_default) if isinstance(v, (dict, list)) else v
+                for k, v in serialize(row).items()
+            })
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return _response(generate(), "text/csv", filename)
+
+
+def parquet_available():
+    return pa is not None
+
+
+class _ChunkSink:
+    """
+    Write-only file that hands written bytes back to the generator.
+
+    tell() keeps counting across drains, because ParquetWriter records
+    absolute row group offsets in the footer.
+    """
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_response(rows, columns, serialize, filename=None, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    """
+    Stream a Parquet file, one row group per `row_group_size` rows.
+
+    `columns` is a sequence of (name, type) pairs, type being a key of
+    PARQUET_TYPES. Only one row group is held in memory at a time and its
+    bytes are sent as soon as it is written. Needs pyarrow.
+    """
+    schema = pa.schema([(name, PARQUET_TYPES[kind]()) for name, kind in columns])
+
+    def generate():
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        yield sink.drain()  # the file header, so the download starts at once
+        batch = []
+        for row in rows:
+            batch.append(serialize(row))
+            if len(batch) >= row_group_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                batch = []
+                yield sink.drain()
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        writer.close()
+        yield sink.drain()
+
+    return _response(generate(), "application/vnd.apache.parquet", filename)
+
+
+def _response(body, mimetype, filename):
+    headers = {"X-Accel-Buffering": "no"}
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    # stream_with_context keeps the request (and the session) alive while
+    # the body is being sent
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
@@ -0,0 +1,44 @@
+# utils/summary.py
+from sqlalchemy import func, select
+from models import db, User, Event, Ticket, SalesDailyRollup
+from utils.cache import result_cache
+
+# Seconds the summary may be served from the cache (writes invalidate sooner)
+SUMMARY_CACHE_TTL = 15
+
+
+def platform_summary():
+    """
+    Platform-wide counts and revenue in one round trip.
+
+    Each table is aggregated once in its own scalar subquery. The three
+    event status counts come from a single pass over events using FILTER,
+    and revenue is summed from sales_daily_rollups.
+    """
+    events = select(
+        func.count().label("total"),
+        func.count().filter(Event.status == "approved").label("approved"),
+        func.count().filter(Event.status == "pending").label("pending"),
+        func.count().filter(Event.status == "rejected").label("rejected"),
+    ).select_from(Event).subquery()
+
+    row = db.session.execute(
+        select(
+            select(func.count()).select_from(User).scalar_subquery().label("total_users"),
+            events.c.total.label("total_events"),
+            events.c.approved.label("active_events"),
+            events.c.pending.label("pending_events"),
+            events.c.rejected.label("rejected_events"),
+            select(func.count()).select_from(Ticket).scalar_subquery().label("total_tickets"),
+            select(func.coalesce(func.sum(SalesDailyRollup.revenue), 0)).scalar_subquery().label("total_revenue"),
+        ).select_from(events)
+    ).one()
+
+    return dict(row._mapping)
+
+
+def cached_platform_summary():
+    """platform_summary() through the result cache, shared by the admin endpoints."""
+    return result_cache.get_or_compute(
+        "platform:summary", platform_summary, ttl=SUMMARY_CACHE_TTL, tags=("users", "events", "sales")
+    )
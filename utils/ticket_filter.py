@@ -0,0 +1,444 @@
+# utils/ticket_filter.py
+import os
+import json
+import math
+import struct
+import hashlib
+import logging
+import time
+import uuid
+import tempfile
+import threading
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from models import db, EventPass, OrderItem, Ticket
+
+try:
+    import fcntl
+except ImportError:  # no cross-process locking on Windows dev machines
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+TICKET_FILTER_ENABLED = os.getenv("TICKET_FILTER_ENABLED", "false").lower() == "true"
+TICKET_FILTER_DIR = os.getenv("TICKET_FILTER_DIR")  # defaults to <instance>/ticket_filters
+TICKET_FILTER_ERROR_RATE = float(os.getenv("TICKET_FILTER_ERROR_RATE", 0.001))
+INITIAL_CAPACITY = 10000
+GROWTH = 2        # each new slice holds twice as many codes as the last
+TIGHTENING = 0.5  # ... at half the error rate, so the total stays under the target
+JOURNAL_COMPACT_BYTES = 1024 * 1024  # about 60k codes before the journal is folded into the snapshot
+STALE_PENDING_SECONDS = 600          # longest a minting transaction is assumed to stay open
+STALE_MARKS_KEY = "ticket_filter_stale_marks"
+
+MAGIC = b"TKF1"
+
+
+class _Slice:
+    """One fixed-size Bloom filter: `bits` bits, `hashes` probes per code."""
+
+    def __init__(self, capacity, error_rate, bits=None, hashes=None, count=0, data=None):
+        self.capacity = capacity
+        self.bits = bits or int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = hashes or max(1, int(math.ceil(-math.log2(error_rate))))
+        self.count = count
+        self.data = data if data is not None else bytearray((self.bits + 7) // 8)
+
+    def _positions(self, h1, h2):
+        # Kirsch-Mitzenmacher double hashing: k probes from two hashes
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, h1, h2):
+        for pos in self._positions(h1, h2):
+            self.data[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, hashes):
+        data = self.data
+        return all(data[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(*hashes))
+
+
+def _hash(code):
+    digest = hashlib.blake2b(code.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that grows as codes are added.
+
+    When the newest slice is full a larger one with a tighter error rate is
+    appended, so the false positive rate stays under `error_rate` however
+    many passes an event ends up with. There are no false negatives: a code
+    that was added is always reported as present.
+    """
+
+    def __init__(self, error_rate=TICKET_FILTER_ERROR_RATE, initial_capacity=INITIAL_CAPACITY):
+        self.error_rate = error_rate
+        self.initial_capacity = initial_capacity
+        self.slices = []
+
+    def __len__(self):
+        return sum(s.count for s in self.slices)
+
+    def __contains__(self, code):
+        hashes = _hash(code)
+        return any(hashes in s for s in self.slices)
+
+    def add(self, code):
+        hashes = _hash(code)
+        if any(hashes in s for s in self.slices):
+            return False
+        if not self.slices or self.slices[-1].count >= self.slices[-1].capacity:
+            n = len(self.slices)
+            self.slices.append(_Slice(
+                self.initial_capacity * GROWTH ** n,
+                self.error_rate * (1 - TIGHTENING) * TIGHTENING ** n,
+            ))
+        self.slices[-1].add(*hashes)
+        return True
+
+    def update(self, codes):
+        for code in codes:
+            self.add(code)
+
+    def to_bytes(self):
+        meta = {
+            "error_rate": self.error_rate,
+            "initial_capacity": self.initial_capacity,
+            "slices": [[s.capacity, s.bits, s.hashes, s.count] for s in self.slices],
+        }
+        header = json.dumps(meta).encode()
+        return b"".join([MAGIC, struct.pack("<I", len(header)), header] + [bytes(s.data) for s in self.slices])
+
+    @classmethod
+    def from_bytes(cls, raw):
+        if raw[:4] != MAGIC:
+            raise ValueError("Not a ticket filter file")
+        (size,) = struct.unpack("<I", raw[4:8])
+        meta = json.loads(raw[8:8 + size])
+        bloom = cls(meta["error_rate"], meta["initial_capacity"])
+        offset = 8 + size
+        for capacity, bits, hashes, count in meta["slices"]:
+            length = (bits + 7) // 8
+            bloom.slices.append(_Slice(
+                capacity, None, bits=bits, hashes=hashes, count=count,
+                data=bytearray(raw[offset:offset + length]),
+            ))
+            offset += length
+        return bloom
+
+
+def event_ticket_codes(event_id):
+    return db.session.execute(
+        select(EventPass.ticket_code)
+        .join(OrderItem, OrderItem.id == EventPass.order_item_id)
+        .join(Ticket, Ticket.id == OrderItem.ticket_id)
+        .where(Ticket.event_id == event_id)
+    ).scalars()
+
+
+class _Loaded:
+    """A filter in memory: the snapshot it came from and how far into the journal it has read."""
+
+    __slots__ = ("snapshot", "journal_ino", "journal_offset", "bloom")
+
+    def __init__(self, snapshot, bloom):
+        self.snapshot = snapshot
+        self.journal_ino = None
+        self.journal_offset = 0
+        self.bloom = bloom
+
+
+class TicketFilterRegistry:
+    """
+    One ScalableBloomFilter per event, answering "can this code be a pass
+    of this event?" without a database round trip.
+
+    Filters live in TICKET_FILTER_DIR as a snapshot (event-N.bloom) plus a
+    journal of codes added since (event-N.codes). A mint appends its codes
+    to the journal under an exclusive file lock, so its cost does not grow
+    with the event. Past JOURNAL_COMPACT_BYTES the journal is folded into a
+    new snapshot, which is written to a temp file and renamed. Every
+    process keeps the filter in memory and only reads journal bytes it has
+    not seen yet. A replaced snapshot or journal (new inode) is reloaded
+    under a shared lock. A missing filter is built from event_passes on
+    first use.
+
+    Codes are added when passes are minted, before the transaction commits.
+    A rolled-back mint only leaves extra codes behind, which costs a
+    database lookup but never rejects a real pass. If an add fails, the
+    event is marked stale rather than dropped: the filter is bypassed until
+    the minting transaction has ended, then rebuilt from event_passes.
+    Rebuilding sooner would miss the uncommitted passes and reject them at
+    the gate. A mark left by a process that died mid-transaction lapses
+    after STALE_PENDING_SECONDS. If not even the mark can be written the
+    add raises, and the mint rolls back. A rebuild only sees committed
+    passes, so it keeps the journal: codes another process appended for a
+    mint still in flight stay in the filter.
+
+    Off unless TICKET_FILTER_ENABLED is set, because a filter only knows
+    the passes minted through its directory. Deployments running on
+    several hosts must put TICKET_FILTER_DIR on shared storage before
+    enabling it, or passes minted on other hosts are rejected.
+    """
+
+    def __init__(self):
+        self.enabled = TICKET_FILTER_ENABLED
+        self.directory = None
+        self._filters = {}  # event_id -> _Loaded
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get("TICKET_FILTER_ENABLED", TICKET_FILTER_ENABLED)
+        self.directory = app.config.get(
+            "TICKET_FILTER_DIR", TICKET_FILTER_DIR or os.path.join(app.instance_path, "ticket_filters")
+        )
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def might_contain(self, event_id, code):
+        """False only when `code` is certainly not a pass of `event_id`."""
+        if not self.enabled:
+            return True
+        try:
+            bloom = self._get(event_id)
+            return bloom is None or code in bloom
+        except Exception:
+            logger.exception("Ticket filter for event %s unavailable", event_id)
+            return True
+
+    def add(self, event_id, codes):
+        if not self.enabled:
+            return
+        try:
+            with self._file_lock(event_id):
+                if _stat(self._path(event_id)) is None:
+                    # Built in the minting session, so it already sees these passes
+                    self._rebuild(event_id)
+                if self._append(event_id, codes) > JOURNAL_COMPACT_BYTES:
+                    self._compact(event_id)
+        except Exception:
+            logger.exception("Could not update the ticket filter for event %s", event_id)
+            self._mark_stale(event_id)
+
+    def discard(self, event_id=None):
+        """Drop one event's filter, or all of them, to be rebuilt on next use."""
+        if not self.enabled:
+            return
+        if event_id is not None:
+            prefixes = (f"event-{event_id}.",)
+        else:
+            prefixes = ("event-",)
+        for name in os.listdir(self.directory):
+            if name.startswith(prefixes) and not name.endswith(".lock"):
+                os.remove(os.path.join(self.directory, name))
+        with self._lock:
+            if event_id is None:
+                self._filters.clear()
+            else:
+                self._filters.pop(event_id, None)
+
+    def _path(self, event_id):
+        return os.path.join(self.directory, f"event-{event_id}.bloom")
+
+    def _journal_path(self, event_id):
+        return os.path.join(self.directory, f"event-{event_id}.codes")
+
+    def _stale_path(self, event_id):
+        return os.path.join(self.directory, f"event-{event_id}.stale")
+
+    def _get(self, event_id):
+        """The event's filter, current with its journal, or None while it is stale."""
+        if os.path.exists(self._stale_path(event_id)) and self._still_stale(event_id):
+            return None
+
+        snapshot = _stat(self._path(event_id))
+        with self._lock:
+            loaded = self._filters.get(event_id)
+        if loaded is not None and snapshot is not None and loaded.snapshot == snapshot:
+            if self._read_journal(event_id, loaded):
+                return loaded.bloom
+
+        loaded = self._load(event_id)
+        if loaded is None:
+            with self._file_lock(event_id):
+                # Another process may have built it while we waited
+                if _stat(self._path(event_id)) is None:
+                    self._rebuild(event_id)
+            loaded = self._load(event_id)
+        return loaded.bloom
+
+    def _load(self, event_id):
+        """Read the snapshot and the whole journal under a shared lock, so no compaction is half seen."""
+        with self._file_lock(event_id, shared=True):
+            snapshot = _stat(self._path(event_id))
+            if snapshot is None:
+                return None
+            loaded = self._read(event_id, snapshot)
+        with self._lock:
+            self._filters[event_id] = loaded
+        return loaded
+
+    def _read(self, event_id, snapshot):
+        with open(self._path(event_id), "rb") as f:
+            loaded = _Loaded(snapshot, ScalableBloomFilter.from_bytes(f.read()))
+        self._read_journal(event_id, loaded)
+        return loaded
+
+    def _read_journal(self, event_id, loaded):
+        """
+        Add the journal lines `loaded` has not seen. Returns False when the
+        journal was replaced since, in which case the caller reloads.
+        """
+        journal = _stat(self._journal_path(event_id))
+        if journal is None:
+            return loaded.journal_ino is None
+        ino, _, size = journal
+        if loaded.journal_ino is None and loaded.journal_offset == 0:
+            loaded.journal_ino = ino
+        elif loaded.journal_ino != ino:
+            return False
+        if size <= loaded.journal_offset:
+            return True
+
+        with open(self._journal_path(event_id), "rb") as f:
+            if os.fstat(f.fileno()).st_ino != ino:
+                return False
+            f.seek(loaded.journal_offset)
+            chunk = f.read(size - loaded.journal_offset)
+
+        # An append may be half written: stop at the last complete line
+        end = chunk.rfind(b"\n") + 1
+        loaded.bloom.update(chunk[:end].decode("ascii").split())
+        loaded.journal_offset += end
+        return True
+
+    def _append(self, event_id, codes):
+        """Append codes to the journal (caller holds the lock); returns its new size."""
+        with open(self._journal_path(event_id), "ab") as f:
+            f.write("".join(f"{code}\n" for code in codes).encode("ascii"))
+            f.flush()
+            return f.tell()
+
+    def _compact(self, event_id):
+        # Caller holds the exclusive lock
+        loaded = self._read(event_id, _stat(self._path(event_id)))
+        self._save(event_id, loaded.bloom)
+
+    def _rebuild(self, event_id):
+        # Caller holds the exclusive lock. The journal may hold codes of
+        # mints that haven't committed, which event_passes can't show yet;
+        # it is kept, and folded in by the next compaction.
+        bloom = ScalableBloomFilter()
+        bloom.update(event_ticket_codes(event_id))
+        self._save(event_id, bloom, keep_journal=True)
+
+    def _save(self, event_id, bloom, keep_journal=False):
+        # The snapshot first, then an empty journal: a reader in between sees
+        # the codes twice, never not at all. Both are written then renamed,
+        # so readers never see a partial file. A new snapshot makes readers
+        # reload, journal included.
+        self._replace(self._path(event_id), bloom.to_bytes())
+        if not keep_journal:
+            self._replace(self._journal_path(event_id), b"")
+        with self._lock:
+            self._filters.pop(event_id, None)
+
+    def _replace(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _mark_stale(self, event_id):
+        """Bypass the filter until the current transaction ends (see the class docstring)."""
+        token = uuid.uuid4().hex
+        with open(self._stale_path(event_id), "a") as f:
+            f.write(f"+{token} {time.time() + STALE_PENDING_SECONDS:.0f}\n")
+        with self._lock:
+            self._filters.pop(event_id, None)
+        db.session.info.setdefault(STALE_MARKS_KEY, []).append((self, event_id, token))
+
+    def _end_stale(self, event_id, token):
+        with open(self._stale_path(event_id), "a") as f:
+            f.write(f"-{token}\n")
+
+    def _still_stale(self, event_id):
+        """
+        True while a transaction that failed to add codes may still be open.
+        Once all of them have ended, rebuild the filter and clear the mark.
+        """
+        if self._pending_marks(event_id):
+            return True
+        with self._file_lock(event_id):
+            if self._pending_marks(event_id):
+                return True
+            if os.path.exists(self._stale_path(event_id)):
+                self._rebuild(event_id)
+                os.remove(self._stale_path(event_id))
+        return False
+
+    def _pending_marks(self, event_id):
+        try:
+            with open(self._stale_path(event_id)) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return False
+
+        pending = {}
+        for line in lines:
+            if line.startswith("+"):
+                token, deadline = line[1:].split()
+                pending[token] = float(deadline)
+            elif line.startswith("-"):
+                pending.pop(line[1:], None)
+        now = time.time()
+        return any(deadline > now for deadline in pending.values())
+
+    def _file_lock(self, event_id, shared=False):
+        return _FileLock(self._path(event_id) + ".lock", shared)
+
+
+def _stat(path):
+    """Identity of a file's current version; os.replace always gives a new inode."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _end_stale_marks(session, transaction):
+    """Once a transaction whose filter add failed is over, its passes are safe to rebuild from."""
+    if transaction.parent is not None:
+        return
+    for registry, event_id, token in session.info.pop(STALE_MARKS_KEY, ()):
+        try:
+            registry._end_stale(event_id, token)
+        except Exception:
+            logger.exception("Could not clear the stale mark on the ticket filter for event %s", event_id)
+
+
+class _FileLock:
+    """flock held across processes, exclusive unless `shared`; a no-op without fcntl."""
+
+    def __init__(self, path, shared=False):
+        self.path = path
+        self.shared = shared
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a")
+        if fcntl:
+            fcntl.flock(self._file, fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+ticket_filters = TicketFilterRegistry()
@@ -0,0 +1,116 @@
+# utils/timeseries.py
+from datetime import timedelta
+from sqlalchemy import func, select, DateTime
+from models import db, Event, SalesHourlyRollup, SalesHourlyOrders
+from utils.rollups import PLATFORM
+
+GRANULARITIES = ("hour", "day", "week", "month")
+MAX_POINTS = 10000
+
+# Range returned when the caller gives no start
+DEFAULT_SPAN = {
+    "hour": timedelta(hours=48),
+    "day": timedelta(days=30),
+    "week": timedelta(weeks=26),
+    "month": timedelta(days=365),
+}
+
+
+def bucket_start(value, granularity):
+    """Floor `value` to its bucket, matching Postgres date_trunc (weeks start on Monday)."""
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if granularity == "hour":
+        return value
+    value = value.replace(hour=0)
+    if granularity == "day":
+        return value
+    if granularity == "week":
+        return value - timedelta(days=value.weekday())
+    return value.replace(day=1)
+
+
+def next_bucket(value, granularity):
+    if granularity == "hour":
+        return value + timedelta(hours=1)
+    if granularity == "day":
+        return value + timedelta(days=1)
+    if granularity == "week":
+        return value + timedelta(weeks=1)
+    if value.month == 12:
+        return value.replace(year=value.year + 1, month=1)
+    return value.replace(month=value.month + 1)
+
+
+def bucket_count(start, end, granularity):
+    """Number of buckets in [start, end) without walking them."""
+    if granularity == "month":
+        months = (end.year - start.year) * 12 + end.month - start.month
+        return months + (1 if end > bucket_start(end, "month") else 0)
+    step = {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(weeks=1)}[granularity]
+    return -(-(end - start) // step)
+
+
+def sales_timeseries(granularity, start, end, event_id=None, organizer_id=None):
+    """
+    Paid ticket sales bucketed by purchase time over [start, end).
+
+    Sales and revenue come from sales_hourly_rollups, so their cost
+    depends on the number of hours with sales in the range, not on the
+    number of orders. Every bucket in the range is returned, with zeros
+    where nothing sold. `start` is floored to its bucket.
+
+    The rollup counts an order once for each event it has tickets for,
+    which is only right for a single event. Across events, orders come
+    from sales_hourly_orders, which counts each order once.
+    """
+    start = bucket_start(start, granularity)
+    bucket = func.date_trunc(granularity, SalesHourlyRollup.hour, type_=DateTime).label("bucket")
+
+    query = (
+        select(
+            bucket,
+            func.sum(SalesHourlyRollup.units),
+            func.sum(SalesHourlyRollup.revenue),
+            func.sum(SalesHourlyRollup.orders),
+        )
+        .where(SalesHourlyRollup.hour >= start, SalesHourlyRollup.hour < end)
+        .group_by(bucket)
+    )
+    if event_id is not None:
+        query = query.where(SalesHourlyRollup.event_id == event_id)
+    if organizer_id is not None:
+        query = query.join(Event, Event.id == SalesHourlyRollup.event_id).where(Event.organizer_id == organizer_id)
+
+    totals = {row[0]: row[1:] for row in db.session.execute(query)}
+    if event_id is None:
+        orders = paid_order_counts(granularity, start, end, organizer_id)
+    else:
+        orders = {key: event_orders for key, (_, _, event_orders) in totals.items()}
+
+    points = []
+    current = start
+    while current < end:
+        units, revenue, _ = totals.get(current, (0, 0, 0))
+        points.append({
+            "bucket": current.isoformat(),
+            "sales": int(units),
+            "revenue": float(revenue),
+            "orders": int(orders.get(current, 0)),
+        })
+        current = next_bucket(current, granularity)
+    return points
+
+
+def paid_order_counts(granularity, start, end, organizer_id=None):
+    """{bucket: paid orders} over [start, end), each order counted once however many events it spans."""
+    bucket = func.date_trunc(granularity, SalesHourlyOrders.hour, type_=DateTime).label("bucket")
+    query = (
+        select(bucket, func.sum(SalesHourlyOrders.orders))
+        .where(
+            SalesHourlyOrders.organizer_id == (PLATFORM if organizer_id is None else organizer_id),
+            SalesHourlyOrders.hour >= start,
+            SalesHourlyOrders.hour < end,
+        )
+        .group_by(bucket)
+    )
+    return dict(db.session.execute(query).all())